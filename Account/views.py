@@ -7,6 +7,8 @@ from werkzeug.security import check_password_hash
 from extensions import db
 from Models.mywitti_users import MyWittiUser
 from Models.mywitti_client import MyWittiClient
+from Services.identity import find_user_and_client, identity_claims
+from Services.password_hashing import PasswordHasherBusy, password_hasher
 
 # Définir le blueprint une seule fois
 accounts_bp = Blueprint('accounts', __name__)
@@ -46,6 +48,18 @@ admin_login_response_model = api.model('AdminLoginResponse', {
     'email': fields.String(description='Admin email')
 })
 
+def upgrade_password_hash(user, password):
+    """Réécrit un hash obsolète (werkzeug, autre coût bcrypt) après une connexion réussie"""
+    if not password_hasher.needs_rehash(user.password):
+        return
+    try:
+        user.rehash_password(password)
+        db.session.commit()
+        current_app.logger.info(f"Password hash upgraded for user {user.user_id}")
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Password rehash failed for user {user.user_id}: {str(e)}")
+
 @api.route('/login')
 class Login(Resource):
     @api.expect(login_model)
@@ -56,7 +70,7 @@ class Login(Resource):
         password = data.get('password')
 
         try:
-            user = db.session.query(MyWittiUser).filter_by(user_id=identifiant).first()
+            user, client = find_user_and_client(MyWittiUser.user_id == identifiant)
             if not user:
                 current_app.logger.warning(f"Login failed: User with identifiant {identifiant} not found")
                 return {"message": "Invalid identifiant or password"}, 401
@@ -65,10 +79,17 @@ class Login(Resource):
                 current_app.logger.warning(f"Login failed: Incorrect password for identifiant {identifiant}")
                 return {"message": "Invalid identifiant or password"}, 401
 
-            access_token = create_access_token(identity=identifiant)
+            upgrade_password_hash(user, password)
+
+            # Rôle et clés primaires embarqués : pas de recherche d'identité sur les routes protégées
+            access_token = create_access_token(identity=identifiant, additional_claims=identity_claims(user, client))
             current_app.logger.info(f"User {identifiant} logged in successfully")
             return {"access_token": access_token}, 200
 
+        except PasswordHasherBusy:
+            current_app.logger.warning(f"Login rejected for identifiant {identifiant}: password pool saturated")
+            return {"message": "Too many login attempts in progress, please retry"}, 503, {"Retry-After": "1"}
+
         except Exception as e:
             current_app.logger.error(f"Error during login: {str(e)}")
             return {"error": str(e)}, 500
@@ -92,12 +113,14 @@ class AdminLogin(Resource):
                 current_app.logger.warning(f"Admin login failed: Incorrect password for email {email}")
                 return {"message": "Invalid email or password"}, 401
 
+            upgrade_password_hash(admin, password)
+
             # Vérifier si l'utilisateur est un admin ou super admin
             if not (admin.is_admin or admin.is_superuser):
                 current_app.logger.warning(f"Admin login failed: User {email} is not an admin")
                 return {"message": "User is not an admin"}, 403
 
-            access_token = create_access_token(identity=admin.user_id)
+            access_token = create_access_token(identity=admin.user_id, additional_claims=identity_claims(admin))
             current_app.logger.info(f"Admin {email} logged in successfully")
             return {
                 "access_token": access_token,
@@ -106,6 +129,10 @@ class AdminLogin(Resource):
                 "email": admin.email
             }, 200
 
+        except PasswordHasherBusy:
+            current_app.logger.warning(f"Admin login rejected for email {email}: password pool saturated")
+            return {"message": "Too many login attempts in progress, please retry"}, 503, {"Retry-After": "1"}
+
         except Exception as e:
             current_app.logger.error(f"Error during admin login: {str(e)}")
             return {"error": str(e)}, 500
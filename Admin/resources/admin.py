@@ -1,11 +1,12 @@
 # admin/resources/admin.py (corrigé)
 from flask import request
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Models.mywitti_users import MyWittiUser
 from Admin.views import api
 from extensions import db
-from werkzeug.security import generate_password_hash
+from Services.password_hashing import PasswordHasherBusy
 from datetime import datetime
 
 admin_model = api.model('Admin', {
@@ -41,9 +42,8 @@ class AdminList(Resource):
     def get(self):
         try:
             # Vérification sécurisée des autorisations super admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_superuser:
+            identity = current_identity()
+            if not identity.is_superuser:
                 api.abort(403, "Accès interdit - Droits super administrateur requis")
             
             # Récupération sécurisée de tous les admins
@@ -71,9 +71,8 @@ class AdminList(Resource):
     def post(self):
         try:
             # Vérification sécurisée des autorisations super admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_superuser:
+            identity = current_identity()
+            if not identity.is_superuser:
                 api.abort(403, "Seuls les super admins peuvent créer des administrateurs")
 
             # Récupération et validation des données
@@ -104,18 +103,18 @@ class AdminList(Resource):
             if MyWittiUser.query.filter_by(user_id=data['user_id']).first():
                 api.abort(400, "Cet identifiant utilisateur est déjà utilisé")
 
-            # Création sécurisée du nouvel admin
+            # Création sécurisée du nouvel admin (rôle porté par user_type)
             new_admin = MyWittiUser(
                 first_name=data['first_name'],
                 last_name=data['last_name'],
                 email=email,
                 user_id=data['user_id'],
-                password_hash=generate_password_hash(password),
-                is_admin=data.get('is_admin', False),
-                is_superuser=data.get('is_superuser', False),
+                user_type='superadmin' if data.get('is_superuser') else 'admin',
                 is_active=True,
-                created_at=datetime.utcnow()
+                date_joined=datetime.utcnow()
             )
+            # Hash bcrypt calculé dans le pool borné, comme à la connexion
+            new_admin.set_password(password)
 
             db.session.add(new_admin)
             db.session.commit()
@@ -125,6 +124,9 @@ class AdminList(Resource):
                 'admin_id': new_admin.id
             }, 201
 
+        except PasswordHasherBusy:
+            db.session.rollback()
+            api.abort(503, "Trop de calculs de mot de passe en cours, veuillez réessayer")
         except Exception as e:
             db.session.rollback()
             api.abort(500, f"Erreur lors de la création de l'administrateur: {str(e)}")
@@ -135,9 +137,8 @@ class AdminList(Resource):
     def put(self):
         try:
             # Vérification sécurisée des autorisations super admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_superuser:
+            identity = current_identity()
+            if not identity.is_superuser:
                 api.abort(403, "Seuls les super admins peuvent modifier des administrateurs")
 
             # Récupération et validation des données
@@ -179,15 +180,15 @@ class AdminList(Resource):
             admin.last_name = data['last_name']
             admin.email = email
             admin.user_id = data['user_id']
-            admin.is_admin = data.get('is_admin', admin.is_admin)
-            admin.is_superuser = data.get('is_superuser', admin.is_superuser)
+            if 'is_superuser' in data:
+                admin.user_type = 'superadmin' if data['is_superuser'] else 'admin'
 
             # Mise à jour du mot de passe si fourni
             if data.get('password'):
                 password = data['password']
                 if len(password) < 6:
                     api.abort(400, "Le mot de passe doit contenir au moins 6 caractères")
-                admin.password_hash = generate_password_hash(password)
+                admin.set_password(password)
 
             admin.updated_at = datetime.utcnow()
             db.session.commit()
@@ -197,6 +198,9 @@ class AdminList(Resource):
                 'admin_id': admin.id
             }, 200
 
+        except PasswordHasherBusy:
+            db.session.rollback()
+            api.abort(503, "Trop de calculs de mot de passe en cours, veuillez réessayer")
         except Exception as e:
             db.session.rollback()
             api.abort(500, f"Erreur lors de la mise à jour de l'administrateur: {str(e)}")
@@ -206,13 +210,12 @@ class AdminList(Resource):
     def delete(self, admin_id):
         try:
             # Vérification sécurisée des autorisations super admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_superuser:
+            identity = current_identity()
+            if not identity.is_superuser:
                 api.abort(403, "Seuls les super admins peuvent supprimer des administrateurs")
 
             # Empêcher la suppression de soi-même
-            if int(admin_id) == user.id:
+            if int(admin_id) == identity.user_id:
                 api.abort(400, "Vous ne pouvez pas supprimer votre propre compte")
 
             # Récupération sécurisée de l'admin
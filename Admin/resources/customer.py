@@ -1,9 +1,11 @@
 # admin/resources/customer.py (version corrigée - import circulaire résolu)
 from flask import request
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
+from Services.tiers import tier_service
+from Services.jetons_history import jetons_history_response
 from Models.mywitti_client import MyWittiClient
-from Models.mywitti_users import MyWittiUser
 from Models.mywitti_comptes import MyWittiCompte
 from extensions import db
 from datetime import datetime
@@ -27,6 +29,8 @@ customer_model = api.model('Customer', {
     'street': fields.String(description='Street'),
     'jetons': fields.Integer(description='Jetons'),
     'category_name': fields.String(description='Nom de la catégorie'),
+    'percentage': fields.Float(description='Progression dans le palier (%)'),
+    'tokens_to_next_tier': fields.Integer(description='Jetons manquants pour le palier suivant'),
     'user_email': fields.String(description='Email de l\'utilisateur associé'),
     'numero_compte': fields.String(description='Numéro de compte'),
     'agence': fields.String(description='Agence'),
@@ -61,22 +65,36 @@ customer_response_model = api.model('CustomerResponse', {
     'customer_id': fields.Integer(description='ID du client créé')
 })
 
+jetons_point_model = api.model('AdminJetonsPoint', {
+    'date': fields.String(description='Jour (YYYY-MM-DD)'),
+    'jetons': fields.Integer(description='Solde de jetons en fin de journée')
+})
+
+jetons_history_model = api.model('AdminJetonsHistory', {
+    'period_start': fields.String(description='Début de la période (null pour period=all)'),
+    'period_end': fields.String(description='Fin de la période'),
+    'days': fields.Integer(description='Nombre de soldes quotidiens sur la période'),
+    'downsampled': fields.Boolean(description='Série réduite au nombre de points demandé'),
+    'series': fields.List(fields.Nested(jetons_point_model), description='Courbe du solde')
+})
+
 class CustomerList(Resource):
     @jwt_required()
     @api.marshal_with(customer_model, as_list=True)
     def get(self):
         try:
             # Vérification sécurisée des autorisations admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not (user.is_admin or user.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 api.abort(403, "Accès interdit - Droits administrateur requis")
             
             # Récupération sécurisée de tous les clients avec leurs relations
             customers = MyWittiClient.query.all()
             customer_list = []
+            # Progression de tous les clients en un seul passage sur les seuils
+            progresses = tier_service.resolve_many([customer.jetons for customer in customers])
             
-            for customer in customers:
+            for customer, progress in zip(customers, progresses):
                 # Récupérer les informations du compte
                 compte = MyWittiCompte.query.filter_by(customer_code=customer.customer_code).first()
                 
@@ -158,6 +176,8 @@ class CustomerList(Resource):
                     'street': customer.street or "N/A",
                     'jetons': customer.jetons or 0,
                     'category_name': category_name,
+                    'percentage': round(progress.percentage, 2),
+                    'tokens_to_next_tier': progress.tokens_to_next_tier,
                     'user_email': user_email,
                     'numero_compte': compte.numero_compte if compte else "N/A",
                     'agence': compte.agence if compte else "N/A",
@@ -184,9 +204,8 @@ class CustomerList(Resource):
     def post(self):
         try:
             # Vérification sécurisée des autorisations admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not (user.is_admin or user.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 api.abort(403, "Accès interdit - Droits administrateur requis")
 
             # Récupération et validation des données
@@ -251,9 +270,8 @@ class CustomerList(Resource):
     def put(self):
         try:
             # Vérification sécurisée des autorisations admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not (user.is_admin or user.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 api.abort(403, "Accès interdit - Droits administrateur requis")
 
             # Récupération et validation des données
@@ -324,9 +342,8 @@ class CustomerList(Resource):
     def delete(self, customer_id):
         try:
             # Vérification sécurisée des autorisations admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not (user.is_admin or user.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 api.abort(403, "Accès interdit - Droits administrateur requis")
 
             # Récupération sécurisée du client
@@ -345,4 +362,21 @@ class CustomerList(Resource):
 
         except Exception as e:
             db.session.rollback()
-            api.abort(500, f"Erreur lors de la suppression du client: {str(e)}") 
\ No newline at end of file
+            api.abort(500, f"Erreur lors de la suppression du client: {str(e)}") 
+
+class CustomerJetonsHistory(Resource):
+    @jwt_required()
+    @api.marshal_with(jetons_history_model)
+    def get(self, client_id):
+        """Courbe du solde de jetons d'un client (mêmes paramètres que /customer/jetons-history)"""
+        identity = current_identity()
+        if not identity.is_admin:
+            api.abort(403, "Accès interdit - Droits administrateur requis")
+
+        if db.session.get(MyWittiClient, client_id) is None:
+            api.abort(404, "Client non trouvé")
+
+        try:
+            return jetons_history_response(client_id, request.args)
+        except ValueError as e:
+            api.abort(400, str(e))
@@ -1,7 +1,7 @@
 # admin/resources/faq.py (adapté)
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Models.mywitti_faq import MyWittiFAQ
 from extensions import db
 from Admin.views import api  # Correction de "Admin" à "admin"
@@ -22,9 +22,8 @@ class FAQList(Resource):
     @jwt_required()
     @api.marshal_with(faq_model, as_list=True)
     def get(self):
-        user_id = get_jwt_identity()  # Retourne 'identifiant' (ex: 'superadmin_001')
-        user = MyWittiUser.query.filter_by(user_id=user_id).first()
-        if not user or not (user.is_admin or user.is_superuser):
+        identity = current_identity()
+        if not identity.is_admin:
             api.abort(403, "Accès interdit")
         faqs = MyWittiFAQ.query.all()
         return [faq.to_dict() for faq in faqs]
@@ -33,9 +32,8 @@ class FAQList(Resource):
     @api.expect(faq_input_model)
     @api.marshal_with(faq_model, code=201)
     def post(self):
-        user_id = get_jwt_identity()  # Retourne 'identifiant' (ex: 'superadmin_001')
-        user = MyWittiUser.query.filter_by(user_id=user_id).first()
-        if not user or not user.is_superuser:
+        identity = current_identity()
+        if not identity.is_superuser:
             api.abort(403, "Seuls les super admins peuvent créer des FAQs")
         data = request.get_json()
         faq = MyWittiFAQ(question=data['question'], answer=data['answer'])
@@ -47,9 +45,8 @@ class FAQDetail(Resource):
     @jwt_required()
     @api.marshal_with(faq_model)
     def get(self, faq_id):
-        user_id = get_jwt_identity()  # Retourne 'identifiant' (ex: 'superadmin_001')
-        user = MyWittiUser.query.filter_by(user_id=user_id).first()
-        if not user or not (user.is_admin or user.is_superuser):
+        identity = current_identity()
+        if not identity.is_admin:
             api.abort(403, "Accès interdit")
         faq = MyWittiFAQ.query.get_or_404(faq_id)
         return faq.to_dict()
@@ -58,9 +55,8 @@ class FAQDetail(Resource):
     @api.expect(faq_input_model)
     @api.marshal_with(faq_model)
     def put(self, faq_id):
-        user_id = get_jwt_identity()  # Retourne 'identifiant' (ex: 'superadmin_001')
-        user = MyWittiUser.query.filter_by(user_id=user_id).first()
-        if not user or not user.is_superuser:
+        identity = current_identity()
+        if not identity.is_superuser:
             api.abort(403, "Seuls les super admins peuvent modifier des FAQs")
         faq = MyWittiFAQ.query.get_or_404(faq_id)
         data = request.get_json()
@@ -71,9 +67,8 @@ class FAQDetail(Resource):
 
     @jwt_required()
     def delete(self, faq_id):
-        user_id = get_jwt_identity()  # Retourne 'identifiant' (ex: 'superadmin_001')
-        user = MyWittiUser.query.filter_by(user_id=user_id).first()
-        if not user or not user.is_superuser:
+        identity = current_identity()
+        if not identity.is_superuser:
             api.abort(403, "Seuls les super admins peuvent supprimer des FAQs")
         faq = MyWittiFAQ.query.get_or_404(faq_id)
         db.session.delete(faq)
@@ -1,9 +1,8 @@
 # admin/resources/logout.py
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from Models.mywitti_users import MyWittiUser
-from Models.token_blacklist import TokenBlacklist
-from extensions import db
+from flask_jwt_extended import jwt_required, get_jwt
+from Services.identity import current_identity
+from Services.token_revocation import token_revocation
 from flask import current_app
 from Admin.views import api  # Importer l'instance 'api' depuis views.py
 
@@ -15,16 +14,14 @@ class AdminLogout(Resource):
     @jwt_required()
     @api.marshal_with(logout_response_model)
     def post(self):
-        admin_identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-        if not admin or not (admin.is_admin or admin.is_superuser):
+        identity = current_identity()
+        if not identity.is_admin:
             return {"msg": "Utilisateur non autorisé"}, 403
         try:
-            jti = get_jwt()['jti']
-            blacklisted_token = TokenBlacklist(jti=jti)
-            db.session.add(blacklisted_token)
-            db.session.commit()
-            current_app.logger.info(f"Admin {admin_identifiant} logged out successfully, token JTI {jti} blacklisted")
+            jwt_payload = get_jwt()
+            jti = jwt_payload['jti']
+            token_revocation.revoke(jwt_payload)
+            current_app.logger.info(f"Admin {identity.identifiant} logged out successfully, token JTI {jti} blacklisted")
             return {"msg": "Déconnexion réussie"}, 200
         except Exception as e:
             current_app.logger.error(f"Error during admin logout: {str(e)}")
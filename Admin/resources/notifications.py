@@ -1,8 +1,9 @@
 # admin/resources/notifications.py
 from flask import request
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
+from Services.notification_stream import event_stream_response, last_event_id
 from Models.mywitti_notification import MyWittiNotification
 from Admin.views import api
 from extensions import db
@@ -29,14 +30,13 @@ class AdminNotifications(Resource):
     def get(self):
         try:
             # Vérification sécurisée des autorisations admin
-            admin_identifiant = get_jwt_identity()
-            admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-            if not admin or not (admin.is_admin or admin.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"msg": "Utilisateur non autorisé - Droits administrateur requis"}, 403
             
             # Récupération sécurisée des notifications de l'admin
             notifications = MyWittiNotification.query.filter_by(
-                user_id=admin.id
+                user_id=identity.user_id
             ).order_by(MyWittiNotification.created_at.desc()).all()
             
             notifications_data = [{
@@ -53,14 +53,28 @@ class AdminNotifications(Resource):
         except Exception as e:
             return {"msg": f"Erreur lors de la récupération des notifications: {str(e)}"}, 500
 
+class AdminNotificationStream(Resource):
+    @jwt_required()
+    def get(self):
+        """Flux Server-Sent Events des nouvelles notifications de l'admin (reprise par Last-Event-ID)"""
+        identity = current_identity()
+        if not identity.is_admin:
+            return {"msg": "Utilisateur non autorisé - Droits administrateur requis"}, 403
+
+        try:
+            last_id = last_event_id(request)
+        except ValueError:
+            return {"msg": "Last-Event-ID invalide"}, 400
+
+        return event_stream_response(identity.user_id, last_id)
+
 class AdminNotificationDetail(Resource):
     @jwt_required()
     def delete(self, notification_id):
         try:
             # Vérification sécurisée des autorisations admin
-            admin_identifiant = get_jwt_identity()
-            admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-            if not admin or not (admin.is_admin or admin.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"msg": "Utilisateur non autorisé - Droits administrateur requis"}, 403
 
             # Validation de l'ID de notification
@@ -72,7 +86,7 @@ class AdminNotificationDetail(Resource):
             # Récupération sécurisée de la notification
             notification = MyWittiNotification.query.filter_by(
                 id=notification_id, 
-                user_id=admin.id
+                user_id=identity.user_id
             ).first()
             
             if not notification:
@@ -93,9 +107,8 @@ class AdminNotificationDetail(Resource):
     def patch(self, notification_id):
         try:
             # Vérification sécurisée des autorisations admin
-            admin_identifiant = get_jwt_identity()
-            admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-            if not admin or not (admin.is_admin or admin.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"msg": "Utilisateur non autorisé - Droits administrateur requis"}, 403
 
             # Validation de l'ID de notification
@@ -107,7 +120,7 @@ class AdminNotificationDetail(Resource):
             # Récupération sécurisée de la notification
             notification = MyWittiNotification.query.filter_by(
                 id=notification_id, 
-                user_id=admin.id
+                user_id=identity.user_id
             ).first()
             
             if not notification:
@@ -1,16 +1,17 @@
 # admin/resources/orders.py
+from flask import request
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
-from Models.mywitti_lots import MyWittiLot
-from Models.mywitti_lots_favoris import MyWittiLotsFavoris
-from Models.mywitti_lots_claims import MyWittiLotsClaims
+from flask_jwt_extended import jwt_required
+from sqlalchemy import exists, func, or_
+from sqlalchemy.orm import selectinload
+from Services.identity import current_identity
+from Services.jetons_holds import HELD
+from Services.orders import CANCELLED_STATUS, PENDING_STATUS, VALIDATED_STATUS, OrderError, cancel_order, validate_order
 from Models.mywitti_client import MyWittiClient
-from Models.mywitti_notification import MyWittiNotification
-from Models.mywitti_comptes import MyWittiCompte
+from Models.mywitti_jetons_holds import MyWittiJetonsHold
+from Models.mywitti_order import MyWittiOrder
 from extensions import db
 from Admin.views import api
-from datetime import datetime
 
 # Modèles pour les réponses
 order_model = api.model('Order', {
@@ -34,51 +35,63 @@ order_update_response_model = api.model('OrderUpdateResponse', {
     'status': fields.String(description='Nouveau statut de la commande')
 })
 
+def _order_data(order):
+    """Commande et ses lignes au format order_model"""
+    return {
+        'id': str(order.id),
+        'user_id': order.client_id,
+        'customer_id': order.client_id,
+        'amount': float(order.amount),
+        'status': order.statut,
+        'contact': "N/A",
+        'date': order.created_at.strftime('%Y-%m-%d %H:%M:%S') if order.created_at else "Unknown",
+        'items': [{
+            'reward_id': line.lot_id,
+            'libelle': line.libelle,
+            'quantity': line.quantity,
+            'jeton': line.jetons
+        } for line in order.lines]
+    }
+
 class AdminOrders(Resource):
     @jwt_required()
     @api.marshal_with(orders_response_model)
     def get(self):
         try:
             # Vérification sécurisée des autorisations admin
-            admin_identifiant = get_jwt_identity()
-            admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-            if not admin or not (admin.is_admin or admin.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"msg": "Utilisateur non autorisé - Droits administrateur requis"}, 403
 
-            # Récupération sécurisée des commandes avec tri par statut et date
-            orders = MyWittiLotsClaims.query.filter(
-                MyWittiLotsClaims.statut.in_(['pending', 'validated', 'cancelled'])
-            ).order_by(
+            # Commandes et leurs lignes (une requête de plus pour toutes les lignes), triées par statut et date
+            query = MyWittiOrder.query.options(selectinload(MyWittiOrder.lines)).filter(
+                MyWittiOrder.statut.in_([PENDING_STATUS, VALIDATED_STATUS, CANCELLED_STATUS])
+            )
+            if request.args.get('include_unfunded', '').lower() != 'true':
+                # Commande en attente validable : jetons réservés, ou (commande antérieure aux
+                # réservations) solde disponible du client suffisant
+                held = exists().where(
+                    MyWittiJetonsHold.order_id == MyWittiOrder.id,
+                    MyWittiJetonsHold.statut == HELD
+                )
+                query = query.join(
+                    MyWittiClient, MyWittiClient.id == MyWittiOrder.client_id
+                ).filter(or_(
+                    MyWittiOrder.statut != PENDING_STATUS,
+                    held,
+                    func.coalesce(MyWittiClient.jetons, 0) - MyWittiClient.jetons_reserves >= MyWittiOrder.amount
+                ))
+            orders = query.order_by(
                 db.case(
-                    (MyWittiLotsClaims.statut == 'pending', 1),
-                    (MyWittiLotsClaims.statut == 'validated', 2),
-                    (MyWittiLotsClaims.statut == 'cancelled', 3),
+                    (MyWittiOrder.statut == PENDING_STATUS, 1),
+                    (MyWittiOrder.statut == VALIDATED_STATUS, 2),
+                    (MyWittiOrder.statut == CANCELLED_STATUS, 3),
                     else_=4
                 ),
-                MyWittiLotsClaims.date_reclamation.asc()
+                MyWittiOrder.created_at.asc()
             ).all()
 
-            orders_data = []
-            for order in orders:
-                # Récupération sécurisée des détails de la récompense
-                reward = MyWittiLot.query.get(order.lot_id)
-                if reward:
-                    items_data = [{
-                        'reward_id': reward.id,
-                        'libelle': reward.libelle or "Sans titre",
-                        'quantity': 1,  # Simplifié - supposant 1 par commande
-                        'jeton': reward.jetons or 0
-                    }]
-                    orders_data.append({
-                        'id': str(order.id),
-                        'user_id': order.client_id,
-                        'customer_id': order.client_id,
-                        'amount': float(reward.jetons or 0),
-                        'status': order.statut or "pending",
-                        'contact': "N/A",
-                        'date': order.date_reclamation.strftime('%Y-%m-%d %H:%M:%S') if order.date_reclamation else "Unknown",
-                        'items': items_data
-                    })
+            orders_data = [_order_data(order) for order in orders]
             return {'msg': 'Commandes récupérées avec succès', 'orders': orders_data}
         except Exception as e:
             return {"msg": f"Erreur lors de la récupération des commandes: {str(e)}"}, 500
@@ -89,39 +102,16 @@ class AdminOrderDetail(Resource):
     def get(self, order_id):
         try:
             # Vérification sécurisée des autorisations admin
-            admin_identifiant = get_jwt_identity()
-            admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-            if not admin or not (admin.is_admin or admin.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"msg": "Utilisateur non autorisé - Droits administrateur requis"}, 403
 
-            # Récupération sécurisée de la commande
-            order = MyWittiLotsClaims.query.get(order_id)
+            # Récupération sécurisée de la commande et de ses lignes
+            order = db.session.get(MyWittiOrder, order_id, options=[selectinload(MyWittiOrder.lines)])
             if not order:
                 return {"msg": "Commande non trouvée"}, 404
 
-            # Récupération sécurisée des détails de la récompense
-            reward = MyWittiLot.query.get(order.lot_id)
-            if not reward:
-                return {"msg": "Récompense non trouvée pour cette commande"}, 404
-
-            items_data = [{
-                'reward_id': reward.id,
-                'libelle': reward.libelle or "Sans titre",
-                'quantity': 1,  # Simplifié - supposant 1 par commande
-                'jeton': reward.jetons or 0
-            }]
-
-            order_data = {
-                'id': str(order.id),
-                'user_id': order.client_id,
-                'customer_id': order.client_id,
-                'amount': float(reward.jetons or 0),
-                'status': order.statut or "pending",
-                'contact': "N/A",
-                'date': order.date_reclamation.strftime('%Y-%m-%d %H:%M:%S') if order.date_reclamation else "Unknown",
-                'items': items_data
-            }
-            return order_data
+            return _order_data(order)
         except Exception as e:
             return {"msg": f"Erreur lors de la récupération des détails: {str(e)}"}, 500
 
@@ -131,72 +121,17 @@ class ValidateOrder(Resource):
     def put(self, order_id):
         try:
             # Vérification sécurisée des autorisations super admin
-            admin_identifiant = get_jwt_identity()
-            admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-            if not admin or not admin.is_superuser:
+            identity = current_identity()
+            if not identity.is_superuser:
                 return {"msg": "Seuls les super admins peuvent valider les commandes"}, 403
 
-            # Récupération sécurisée de la commande
-            order = MyWittiLotsClaims.query.get(order_id)
-            if not order:
-                return {"msg": "Commande non trouvée"}, 404
-            if order.statut == 'cancelled':
-                return {"msg": "Une commande annulée ne peut pas être validée"}, 400
-            if order.statut == 'validated':
-                return {"msg": "La commande est déjà validée"}, 400
-
-            # Récupération sécurisée de la récompense
-            reward = MyWittiLot.query.get(order.lot_id)
-            if not reward:
-                return {"msg": "Récompense non trouvée"}, 404
-
-            # Vérification sécurisée du stock
-            if not reward.stock or reward.stock < 1:
-                order.statut = 'cancelled'
-                db.session.commit()
-                # Création des notifications
-                notification_user = MyWittiNotification(
-                    user_id=order.client_id,
-                    message=f"Votre commande {order.id} a été annulée car l'article {reward.libelle} n'est pas disponible en stock."
-                )
-                notification_admin = MyWittiNotification(
-                    user_id=admin.id,
-                    message=f"La commande {order.id} a été annulée car l'article {reward.libelle} n'est pas disponible en stock."
-                )
-                db.session.add_all([notification_user, notification_admin])
-                db.session.commit()
+            # Toutes les lignes en une transaction : stocks, débit des jetons réservés, notifications
+            try:
+                order = validate_order(order_id, identity.user_id)
+            except OrderError as e:
+                return {"msg": e.message}, e.status_code
+            if order.statut == CANCELLED_STATUS:
                 return {"msg": f"Commande {order_id} annulée car stock insuffisant", "status": order.statut}, 200
-
-            # Récupération sécurisée du client
-            customer = MyWittiClient.query.filter_by(id=order.client_id).first()
-            if not customer:
-                return {"msg": "Client non trouvé"}, 404
-
-            # Vérification sécurisée du solde client
-            if customer.jetons < (reward.jetons or 0):
-                return {"msg": "Jetons insuffisants pour le client"}, 400
-
-            # Récupération de l'agence du client
-            compte = MyWittiCompte.query.filter_by(customer_code=customer.customer_code).first()
-            agence_name = compte.agence if compte and compte.agence else "votre agence"
-
-            # Validation sécurisée de la commande
-            order.statut = 'validated'
-            customer.jetons -= (reward.jetons or 0)  # Débit des jetons lors de la validation
-            # Mise à jour sécurisée du stock
-            reward.stock -= 1
-            # Création sécurisée des notifications
-            customer_name = f"{customer.first_name} {customer.short_name}" if customer.first_name and customer.short_name else "Client"
-            notification_user = MyWittiNotification(
-                user_id=customer.user_id,
-                message=f"Votre commande {order.id} de {reward.libelle} a été validée. Passez à l'agence {agence_name} pour la récupérer."
-            )
-            notification_admin = MyWittiNotification(
-                user_id=admin.id,
-                message=f"La commande {order.id} de {customer_name} pour {reward.libelle} a été validée."
-            )
-            db.session.add_all([notification_user, notification_admin])
-            db.session.commit()
             return {"msg": f"Commande {order_id} validée avec succès", "status": order.statut}
         except Exception as e:
             db.session.rollback()
@@ -208,37 +143,15 @@ class CancelOrder(Resource):
     def put(self, order_id):
         try:
             # Vérification sécurisée des autorisations super admin
-            admin_identifiant = get_jwt_identity()
-            admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-            if not admin or not admin.is_superuser:
+            identity = current_identity()
+            if not identity.is_superuser:
                 return {"msg": "Seuls les super admins peuvent annuler les commandes"}, 403
 
-            # Récupération sécurisée de la commande
-            order = MyWittiLotsClaims.query.get(order_id)
-            if not order:
-                return {"msg": "Commande non trouvée"}, 404
-            if order.statut == 'validated':
-                return {"msg": "Une commande validée ne peut pas être annulée"}, 400
-            if order.statut == 'cancelled':
-                return {"msg": "La commande est déjà annulée"}, 400
-
-            # Récupération de la récompense pour le message
-            reward = MyWittiLot.query.get(order.lot_id)
-            reward_name = reward.libelle if reward else "Article"
-
-            # Annulation sécurisée de la commande (pas de débit de jetons)
-            order.statut = 'cancelled'
-            # Création sécurisée des notifications
-            notification_user = MyWittiNotification(
-                user_id=order.client_id,
-                message=f"Votre commande {order.id} de {reward_name} a été annulée. Vos jetons n'ont pas été débités."
-            )
-            notification_admin = MyWittiNotification(
-                user_id=admin.id,
-                message=f"La commande {order.id} a été annulée."
-            )
-            db.session.add_all([notification_user, notification_admin])
-            db.session.commit()
+            # Annulation de la commande entière, jetons réservés libérés (pas de débit)
+            try:
+                order = cancel_order(order_id, identity.user_id)
+            except OrderError as e:
+                return {"msg": e.message}, e.status_code
             return {"msg": f"Commande {order_id} annulée avec succès", "status": order.statut}
         except Exception as e:
             db.session.rollback()
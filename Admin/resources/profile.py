@@ -1,7 +1,7 @@
 # admin/resources/profile.py
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Admin.views import api
 
 admin_profile_model = api.model('AdminProfile', {
@@ -20,8 +20,7 @@ class AdminProfile(Resource):
     @jwt_required()
     @api.marshal_with(admin_profile_model)
     def get(self):
-        user_id = get_jwt_identity()
-        user = MyWittiUser.query.filter_by(user_id=user_id).first()
+        user = current_identity().user
         if not (user.is_admin or user.is_superuser):
             api.abort(403, "Accès interdit")
         return {
@@ -1,10 +1,12 @@
 # Admin/resources/referral.py
-from flask import request
+from flask import current_app, request
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Models.mywitti_referral import MyWittiReferral
 from Models.mywitti_support_request import MyWittiSupportRequest
-from Models.mywitti_users import MyWittiUser
+from Services.pagination import InvalidCursor
+from Services.referrals import referral_link, referral_page
 from extensions import db
 
 # Définir les modèles sans dépendre de l'api
@@ -27,34 +29,37 @@ update_status_model = {
 class ReferralManagementResource(Resource):
     @jwt_required()
     def get(self):
-        identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=identifiant).first()
+        admin = current_identity().user
         if not admin:
             return {'message': 'Utilisateur non trouvé'}, 404
         if not (admin.is_admin or admin.is_superuser):
             return {'message': 'Accès réservé aux administrateurs'}, 403
         
+        limit = request.args.get('limit', current_app.config.get('REFERRALS_PAGE_SIZE', 50), type=int)
+        limit = max(1, min(limit, current_app.config.get('REFERRALS_MAX_PAGE_SIZE', 200)))
+
         try:
-            referrals = MyWittiReferral.query.all()
-            referral_data = []
-            
-            for referral in referrals:
-                # Vérifier que la relation existe
-                referrer_email = 'N/A'
-                if referral.referrer:
-                    referrer_email = referral.referrer.email
-                
-                referral_data.append({
-                    'id': referral.id,
-                    'referrer_id': referral.referrer_id,
-                    'referrer_email': referrer_email,
-                    'referred_email': referral.referred_email,
-                    'referral_link': f"http://127.0.0.1:5000/accounts/refer/{referral.referral_code}",
-                    'status': referral.status,
-                    'created_at': referral.created_at.isoformat() if referral.created_at else None
-                })
-            
-            return referral_data, 200
+            # Page demandée seulement (filtre status optionnel), email du parrain par jointure
+            try:
+                referrals, next_cursor = referral_page(
+                    limit, request.args.get('cursor'), status=request.args.get('status')
+                )
+            except InvalidCursor:
+                return {'message': 'Curseur invalide'}, 400
+
+            referral_data = [{
+                'id': referral.id,
+                'referrer_id': referral.referrer_id,
+                'referrer_email': referral.referrer_email or 'N/A',
+                'referred_email': referral.referred_email,
+                'referral_link': referral_link(referral.referral_code),
+                'status': referral.status,
+                'created_at': referral.created_at.isoformat() if referral.created_at else None
+            } for referral in referrals]
+
+            # La réponse reste une liste : le curseur de la page suivante passe par un en-tête
+            headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+            return referral_data, 200, headers
             
         except Exception as e:
             print(f"Erreur lors de la récupération des parrainages: {str(e)}")
@@ -62,8 +67,7 @@ class ReferralManagementResource(Resource):
 
     @jwt_required()
     def put(self, referral_id):
-        identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=identifiant).first()
+        admin = current_identity().user
         if not admin:
             return {'message': 'Utilisateur non trouvé'}, 404
         if not (admin.is_admin or admin.is_superuser):
@@ -81,8 +85,7 @@ class ReferralManagementResource(Resource):
 
     @jwt_required()
     def delete(self, referral_id):
-        identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=identifiant).first()
+        admin = current_identity().user
         if not admin:
             return {'message': 'Utilisateur non trouvé'}, 404
         if not (admin.is_admin or admin.is_superuser):
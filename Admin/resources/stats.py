@@ -1,11 +1,12 @@
 from flask_restx import Resource, fields, Namespace
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Models.mywitti_client import MyWittiClient
 from Models.mywitti_lots import MyWittiLot
-from Models.mywitti_lots_claims import MyWittiLotsClaims
+from Models.mywitti_order import MyWittiOrder
+from Models.mywitti_order_line import MyWittiOrderLine
 from Models.mywitti_jetons_transactions import MyWittiJetonsTransactions
-from Models.page_visit import PageVisit
+from Services.page_visit_rollup import most_visited_paths
 from extensions import db
 from sqlalchemy.sql import desc, func
 
@@ -38,42 +39,34 @@ class Stats(Resource):
     @stats_ns.marshal_with(stats_model)
     def get(self):
         try:
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not (user.is_admin or user.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 stats_ns.abort(403, "Accès interdit - Droits administrateur requis")
             total_customers = MyWittiClient.query.count()
             top_customer = MyWittiClient.query.order_by(MyWittiClient.jetons.desc()).first()
             top_customer_tokens = f"{top_customer.first_name} {top_customer.short_name} ({top_customer.jetons} tokens)" if top_customer and top_customer.first_name and top_customer.short_name else "N/A"
-            pending_orders = MyWittiLotsClaims.query.filter_by(statut='pending').count()
-            cancelled_orders = MyWittiLotsClaims.query.filter_by(statut='cancelled').count()
-            validated_orders = MyWittiLotsClaims.query.filter_by(statut='validated').count()
-            most_visited = db.session.query(
-                PageVisit.path, 
-                func.count(PageVisit.path).label('visit_count')
-            ).filter(
-                ~PageVisit.path.like('/admin/%')
-            ).filter(
-                PageVisit.path != '/admin/notifications'
-            ).filter(
-                PageVisit.path != '/accounts/login'
-            ).group_by(PageVisit.path).order_by(
-                desc(func.count(PageVisit.path))
-            ).limit(3).all()
+            pending_orders = MyWittiOrder.query.filter_by(statut='pending').count()
+            cancelled_orders = MyWittiOrder.query.filter_by(statut='cancelled').count()
+            validated_orders = MyWittiOrder.query.filter_by(statut='validated').count()
+            # Lecture du cumul horaire : coût indépendant du volume de visites brutes
+            most_visited = most_visited_paths(limit=3)
             most_visited_pages = ", ".join([page[0] for page in most_visited]) if most_visited else "Aucune donnée"
             most_purchased_reward_query = db.session.query(
                 MyWittiLot.libelle,
-                func.count(MyWittiLotsClaims.lot_id).label('purchase_count')
+                func.sum(MyWittiOrderLine.quantity).label('purchase_count')
+            ).join(
+                MyWittiOrderLine, 
+                MyWittiLot.id == MyWittiOrderLine.lot_id
             ).join(
-                MyWittiLotsClaims, 
-                MyWittiLot.id == MyWittiLotsClaims.lot_id
+                MyWittiOrder,
+                MyWittiOrder.id == MyWittiOrderLine.order_id
             ).filter(
-                MyWittiLotsClaims.statut == 'validated'
+                MyWittiOrder.statut == 'validated'
             ).group_by(
                 MyWittiLot.id, 
                 MyWittiLot.libelle
             ).order_by(
-                desc(func.count(MyWittiLotsClaims.lot_id))
+                desc(func.sum(MyWittiOrderLine.quantity))
             ).first()
             most_purchased_reward_name = most_purchased_reward_query[0] if most_purchased_reward_query else "N/A"
             return {
@@ -93,9 +86,8 @@ class RewardsChart(Resource):
     @stats_ns.marshal_with(rewards_chart_model)
     def get(self):
         try:
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not (user.is_admin or user.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 stats_ns.abort(403, "Accès interdit - Droits administrateur requis")
             rewards_data = db.session.query(
                 MyWittiLot.libelle,
@@ -133,9 +125,8 @@ class StockChart(Resource):
     @stats_ns.marshal_with(stock_chart_model)
     def get(self):
         try:
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not (user.is_admin or user.is_superuser):
+            identity = current_identity()
+            if not identity.is_admin:
                 stats_ns.abort(403, "Accès interdit - Droits administrateur requis")
             stock_data = db.session.query(
                 MyWittiLot.libelle,
@@ -2,10 +2,11 @@
 import os
 from flask import request
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Models.mywitti_lots import MyWittiLot
-from Models.mywitti_lots_claims import MyWittiLotsClaims
+from Models.mywitti_order import MyWittiOrder
+from Models.mywitti_order_line import MyWittiOrderLine
 from extensions import db
 from datetime import datetime
 from Admin.views import api
@@ -55,10 +56,9 @@ class StockList(Resource):
     def get(self):
         try:
             # Vérification sécurisée des autorisations admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
+            identity = current_identity()
 
-            if not user or not (user.is_admin or user.is_superuser):
+            if not identity.is_admin:
                 api.abort(403, "Accès interdit - Droits administrateur requis")
             
             # Récupération sécurisée de tous les stocks
@@ -81,10 +81,9 @@ class StockList(Resource):
     def post(self):
         try:
             # Vérification sécurisée des autorisations super admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
+            identity = current_identity()
 
-            if not user or not user.is_superuser:
+            if not identity.is_superuser:
                 api.abort(403, "Seuls les super admins peuvent ajouter du stock")
 
             # Récupération et validation des données
@@ -170,10 +169,9 @@ class StockDetail(Resource):
     def put(self, stock_id):
         try:
             # Vérification sécurisée des autorisations super admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
+            identity = current_identity()
 
-            if not user or not user.is_superuser:
+            if not identity.is_superuser:
                 api.abort(403, "Seuls les super admins peuvent modifier le stock")
             
             # Récupération sécurisée du stock
@@ -275,20 +273,21 @@ class StockDetail(Resource):
     def delete(self, stock_id):
         try:
             # Vérification sécurisée des autorisations super admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
+            identity = current_identity()
 
-            if not user or not user.is_superuser:
+            if not identity.is_superuser:
                 api.abort(403, "Seuls les super admins peuvent supprimer le stock")
             
             # Récupération sécurisée du stock
             stock = MyWittiLot.query.get_or_404(stock_id)
             
             # Vérification si le stock a des commandes en cours
-            pending_orders = db.session.query(MyWittiLotsClaims).filter_by(
-                lot_id=stock.id, 
-                statut='pending'
-            ).count()
+            pending_orders = db.session.query(MyWittiOrder).join(
+                MyWittiOrderLine, MyWittiOrderLine.order_id == MyWittiOrder.id
+            ).filter(
+                MyWittiOrderLine.lot_id == stock.id,
+                MyWittiOrder.statut == 'pending'
+            ).distinct().count()
             
             if pending_orders > 0:
                 api.abort(400, f"Impossible de supprimer le stock. Il a {pending_orders} commande(s) en attente.")
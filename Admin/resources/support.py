@@ -1,7 +1,7 @@
 # admin/resources/support.py
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Models.mywitti_support_request import MyWittiSupportRequest
 from Admin.views import api
 
@@ -19,9 +19,8 @@ class SupportRequestList(Resource):
     @jwt_required()
     @api.marshal_with(support_request_model, as_list=True)
     def get(self):
-        user_id = get_jwt_identity()
-        user = MyWittiUser.query.filter_by(user_id=user_id).first()
-        if not user or not (user.is_admin or user.is_superuser):
+        identity = current_identity()
+        if not identity.is_admin:
             api.abort(403, "Accès interdit")
         support_requests = MyWittiSupportRequest.query.all()
         return [request.to_dict() for request in support_requests]
\ No newline at end of file
@@ -1,8 +1,8 @@
 # admin/resources/surveys.py
 from flask import request
 from flask_restx import Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Models.mywitti_survey import MyWittiSurvey, MyWittiSurveyOption, MyWittiSurveyResponse
 from Models.mywitti_client import MyWittiClient
 from extensions import db
@@ -58,9 +58,8 @@ class AdminSurveys(Resource):
     @api.expect(survey_input_model)
     @api.marshal_with(survey_response_model, code=201)
     def post(self):
-        admin_identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-        if not admin or not admin.is_superuser:
+        identity = current_identity()
+        if not identity.is_superuser:
             api.abort(403, "Seuls les super admins peuvent créer des sondages")
         
         data = request.get_json()
@@ -99,9 +98,8 @@ class AdminSurveys(Resource):
     @jwt_required()
     @api.marshal_with(survey_model, as_list=True)
     def get(self):
-        admin_identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-        if not admin or not (admin.is_admin or admin.is_superuser):
+        identity = current_identity()
+        if not identity.is_admin:
             api.abort(403, "Utilisateur non autorisé")
         surveys = MyWittiSurvey.query.all()
         surveys_data = []
@@ -121,9 +119,8 @@ class AdminSurvey(Resource):
     @api.expect(survey_input_model)
     @api.marshal_with(survey_response_model)
     def put(self, survey_id):
-        admin_identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-        if not admin or not admin.is_superuser:
+        identity = current_identity()
+        if not identity.is_superuser:
             api.abort(403, "Seuls les super admins peuvent modifier des sondages")
         survey = MyWittiSurvey.query.get(survey_id)
         if not survey:
@@ -138,9 +135,8 @@ class AdminSurvey(Resource):
     @jwt_required()
     @api.marshal_with(survey_response_model)
     def delete(self, survey_id):
-        admin_identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-        if not admin or not admin.is_superuser:
+        identity = current_identity()
+        if not identity.is_superuser:
             api.abort(403, "Seuls les super admins peuvent supprimer des sondages")
         survey = MyWittiSurvey.query.get(survey_id)
         if not survey:
@@ -155,9 +151,8 @@ class SurveyResults(Resource):
     @jwt_required()
     @api.marshal_with(survey_result_model, as_list=True)
     def get(self, survey_id):
-        admin_identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-        if not admin or not (admin.is_admin or admin.is_superuser):
+        identity = current_identity()
+        if not identity.is_admin:
             api.abort(403, "Utilisateur non autorisé")
         survey = MyWittiSurvey.query.get(survey_id)
         if not survey:
@@ -180,9 +175,8 @@ class SurveyResponses(Resource):
     @jwt_required()
     @api.marshal_with(survey_response_detail_model, as_list=True)
     def get(self, survey_id):
-        admin_identifiant = get_jwt_identity()
-        admin = MyWittiUser.query.filter_by(user_id=admin_identifiant).first()
-        if not admin or not (admin.is_admin or admin.is_superuser):
+        identity = current_identity()
+        if not identity.is_admin:
             api.abort(403, "Utilisateur non autorisé")
         survey = MyWittiSurvey.query.get(survey_id)
         if not survey:
@@ -15,7 +15,7 @@ api = Api(admin_bp, version='1.0', title='Admin API', description='API for admin
 from .resources.faq import FAQList, FAQDetail
 from .resources.logout import AdminLogout
 from .resources.admin import AdminList
-from .resources.customer import CustomerList
+from .resources.customer import CustomerList, CustomerJetonsHistory
 from .resources.stock import StockList, StockDetail
 from .resources.profile import AdminProfile
 from .resources.stats import Stats, RewardsChart, StockChart, stats_ns, stats_model, rewards_chart_model, stock_chart_model
@@ -32,10 +32,10 @@ update_status_model_def = referral_ns.model('UpdateStatus', update_status_model)
 ReferralManagementResource.get = referral_ns.marshal_list_with(referral_model_def)(ReferralManagementResource.get)
 ReferralManagementResource.put = referral_ns.expect(update_status_model_def)(ReferralManagementResource.put)
 
-# Importation différée de AdminNotifications et AdminNotificationDetail
+# Importation différée de AdminNotifications, AdminNotificationStream et AdminNotificationDetail
 def import_notifications():
-    from .resources.notifications import AdminNotifications, AdminNotificationDetail
-    return AdminNotifications, AdminNotificationDetail
+    from .resources.notifications import AdminNotifications, AdminNotificationStream, AdminNotificationDetail
+    return AdminNotifications, AdminNotificationStream, AdminNotificationDetail
 
 # Enregistrer les ressources
 api.add_resource(AdminLogin, '/login')
@@ -44,6 +44,7 @@ api.add_resource(AdminLogout, '/logout')
 api.add_resource(FAQDetail, '/faqs/<int:faq_id>')
 api.add_resource(AdminList, '/admins')
 api.add_resource(CustomerList, '/customers')
+api.add_resource(CustomerJetonsHistory, '/customers/<int:client_id>/jetons-history')
 api.add_resource(StockList, '/stock')
 api.add_resource(StockDetail, '/stock/<int:stock_id>')
 api.add_resource(AdminProfile, '/profile')
@@ -57,8 +58,9 @@ api.add_resource(ValidateOrder, '/orders/<int:order_id>/validate')
 api.add_resource(CancelOrder, '/orders/<int:order_id>/cancel')
 
 # Utiliser la fonction pour l'importation différée
-AdminNotifications, AdminNotificationDetail = import_notifications()
+AdminNotifications, AdminNotificationStream, AdminNotificationDetail = import_notifications()
 api.add_resource(AdminNotifications, '/notifications')
+api.add_resource(AdminNotificationStream, '/notifications/stream')
 api.add_resource(AdminNotificationDetail, '/notifications/<int:notification_id>')  # Supporte maintenant DELETE et PATCH
 
 api.add_resource(AdminSurveys, '/surveys')
@@ -1,8 +1,8 @@
 # Advertisement/views.py
 from flask import Blueprint, current_app, request, jsonify
 from flask_restx import Api, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
+from Services.identity import current_identity
 from Models.mywitti_advertisement import MyWittiAdvertisement
 from extensions import db
 from datetime import datetime
@@ -54,9 +54,8 @@ class AdvertisementList(Resource):
         """Récupérer toutes les publicités (admin seulement)"""
         try:
             # Vérification des droits admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_admin:
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"message": "Accès refusé. Droits administrateur requis."}, 403
 
             # Récupération de toutes les publicités
@@ -79,9 +78,8 @@ class AdvertisementList(Resource):
         """Créer une nouvelle publicité (admin seulement)"""
         try:
             # Vérification des droits admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_admin:
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"message": "Accès refusé. Droits administrateur requis."}, 403
 
             # Validation des données d'entrée
@@ -102,7 +100,7 @@ class AdvertisementList(Resource):
                 image_url=data['image_url'],
                 country=data.get('country'),
                 is_active=data.get('is_active', True),
-                created_by=user.id
+                created_by=identity.user_id
             )
             
             db.session.add(new_advertisement)
@@ -122,9 +120,8 @@ class AdvertisementDetail(Resource):
         """Récupérer une publicité spécifique (admin seulement)"""
         try:
             # Vérification des droits admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_admin:
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"message": "Accès refusé. Droits administrateur requis."}, 403
 
             # Récupération de la publicité
@@ -144,9 +141,8 @@ class AdvertisementDetail(Resource):
         """Modifier une publicité (admin seulement)"""
         try:
             # Vérification des droits admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_admin:
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"message": "Accès refusé. Droits administrateur requis."}, 403
 
             # Récupération de la publicité
@@ -190,9 +186,8 @@ class AdvertisementDetail(Resource):
         """Supprimer une publicité (admin seulement)"""
         try:
             # Vérification des droits admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_admin:
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"message": "Accès refusé. Droits administrateur requis."}, 403
 
             # Récupération de la publicité
@@ -254,9 +249,8 @@ class ToggleAdvertisement(Resource):
         """Activer/Désactiver une publicité (admin seulement)"""
         try:
             # Vérification des droits admin
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user or not user.is_admin:
+            identity = current_identity()
+            if not identity.is_admin:
                 return {"message": "Accès refusé. Droits administrateur requis."}, 403
 
             # Récupération de la publicité
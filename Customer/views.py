@@ -1,30 +1,29 @@
-from flask import Blueprint, current_app, request
+from flask import Blueprint, Response, current_app, request, stream_with_context
 from flask_restx import Api, Resource, fields
-import uuid
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from Models.mywitti_client import MyWittiClient
+from flask_jwt_extended import jwt_required, get_jwt
 from Models.mywitti_category import MyWittiCategory
-from Models.mywitti_jetons_transactions import MyWittiJetonsTransactions
-from Models.mywitti_users import MyWittiUser
-from Models.token_blacklist import TokenBlacklist
+from Services.token_revocation import token_revocation
 from extensions import db
 from datetime import datetime, timedelta
-from Models.mywitti_referral import MyWittiReferral
-from Models.mywitti_notification import MyWittiNotification
+from Services.referrals import (
+    ALREADY_INVITED, INVALID, INVITED, invite_emails, referral_link, referral_page, referral_status_counts
+)
+from Services.identity import current_identity
+from Services.tiers import tier_service
+from Services.customer_dashboard import customer_dashboard
+from Services.jetons_history import jetons_history_response
+from Services.jetons_holds import available_jetons
+from Services.notifications import mark_all_read, notification_page, unread_count
+from Services.notification_stream import event_stream_response, last_event_id
+from Services.pagination import InvalidCursor
+from Services.resource_versions import client_resources, conditional
+from Services.transaction_history import stream_transactions, transaction_page, transaction_trends
 
 
 customer_bp = Blueprint('customer', __name__)
 reward_bp = Blueprint('reward', __name__)
 api = Api(customer_bp, version='1.0', title='Customer API', description='API for customer operations')
 
-# Define category ranges
-CATEGORIES = [
-    {"name": "Eco Premium", "code": "A", "min": 0, "max": 100},
-    {"name": "Executive", "code": "B", "min": 100, "max": 1000},
-    {"name": "Executive +", "code": "C", "min": 1000, "max": 3000},
-    {"name": "First Class", "code": "D", "min": 3000, "max": float('inf')}
-]
-
 # Define response models for dashboard
 dashboard_model = api.model('Dashboard', {
     'category': fields.String(description='Customer category'),
@@ -52,19 +51,52 @@ transactions_response_model = api.model('TransactionsResponse', {
     'total_transactions': fields.Integer(description='Total number of transactions'),
     'period_start': fields.String(description='Start of the period'),
     'period_end': fields.String(description='End of the period'),
-    'trends': fields.Nested(trends_model, description='Transaction trends (deposit and withdrawal percentages)')
+    'trends': fields.Nested(trends_model, description='Transaction trends (deposit and withdrawal percentages)'),
+    'next_cursor': fields.String(description='Cursor of the next page (null on the last page)')
 })
 
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
 # Define response model for notifications
 notification_model = api.model('Notification', {
     'id': fields.Integer(description='Notification ID'),
     'message': fields.String(description='Notification message'),
-    'created_at': fields.String(description='Creation date')
+    'created_at': fields.String(description='Creation date'),
+    'is_read': fields.Boolean(description='Whether the notification is read')
 })
 
 notifications_response_model = api.model('NotificationsResponse', {
     'msg': fields.String(description='Success message'),
-    'notifications': fields.List(fields.Nested(notification_model), description='List of notifications')
+    'notifications': fields.List(fields.Nested(notification_model), description='List of notifications'),
+    'unread_count': fields.Integer(description='Number of unread notifications'),
+    'next_cursor': fields.String(description='Cursor of the next page (null on the last page)')
+})
+
+unread_count_model = api.model('UnreadCount', {
+    'unread_count': fields.Integer(description='Number of unread notifications')
+})
+
+mark_read_response_model = api.model('MarkReadResponse', {
+    'msg': fields.String(description='Success message'),
+    'marked': fields.Integer(description='Number of notifications marked as read'),
+    'unread_count': fields.Integer(description='Number of unread notifications')
+})
+
+# Define response model for jetons history
+jetons_point_model = api.model('JetonsPoint', {
+    'date': fields.String(description='Day (YYYY-MM-DD)'),
+    'jetons': fields.Integer(description='Jetons balance at the end of the day')
+})
+
+jetons_history_model = api.model('JetonsHistory', {
+    'period_start': fields.String(description='Start of the period (null for period=all)'),
+    'period_end': fields.String(description='End of the period'),
+    'days': fields.Integer(description='Number of daily balances in the period'),
+    'downsampled': fields.Boolean(description='Whether the series was reduced to the requested number of points'),
+    'series': fields.List(fields.Nested(jetons_point_model), description='Balance series')
 })
 
 # Define response model for profile
@@ -73,6 +105,7 @@ profile_model = api.model('Profile', {
     'short_name': fields.String(description='Customer short name'),
     'agency': fields.String(description='Customer agency'),
     'jetons': fields.Integer(description='Total jetons'),
+    'available_jetons': fields.Integer(description='Jetons not held by pending orders'),
     'category': fields.String(description='Customer category'),
     'percentage': fields.Float(description='Percentage within category range'),
     'tokens_to_next_tier': fields.Integer(description='Jetons needed to reach next tier')
@@ -94,224 +127,246 @@ logout_response_model = api.model('LogoutResponse', {
 @api.route('/dashboard')
 class CustomerDashboard(Resource):
     @jwt_required()
+    @conditional(client_resources)
     @api.marshal_with(dashboard_model)
     def get(self):
         try:
-            identifiant = get_jwt_identity()
-            current_app.logger.info(f"JWT Identity: {identifiant}")
+            identity = current_identity()
 
-            # Récupération sécurisée du client avec le customer_code issu du JWT
-            customer = db.session.query(MyWittiClient).filter_by(customer_code=identifiant).first()
-            if not customer:
-                current_app.logger.warning(f"No customer found for identifiant/customer_code: {identifiant}")
+            # Servi depuis le cache mémoire ; sinon client, catégorie et 5 dernières
+            # transactions en une seule requête
+            dashboard = customer_dashboard.get(identity.client_id) if identity.client_id else None
+            if dashboard is None:
+                current_app.logger.warning(f"No customer found for identifiant/customer_code: {identity.identifiant}")
                 return {"message": "Customer not found"}, 404
 
-            current_app.logger.info(f"Customer found: ID={customer.id}, jetons={customer.jetons}")
-
-            # Calcul sécurisé de la catégorie
-            category = customer.category
-            jetons = customer.jetons or 0
-            category_name = category.category_name if category else "Unknown"
-            current_app.logger.info(f"Category: {category_name}, Jetons: {jetons}")
-
-            # Calcul du pourcentage et des jetons pour le niveau suivant
-            percentage = 0
-            tokens_to_next_tier = 0
-            for i, cat in enumerate(CATEGORIES):
-                if cat['min'] <= jetons < cat['max']:
-                    range_width = cat['max'] - cat['min']
-                    position_in_range = jetons - cat['min']
-                    percentage = (position_in_range / range_width) * 100 if range_width > 0 else 0
-                    if i + 1 < len(CATEGORIES):
-                        tokens_to_next_tier = CATEGORIES[i + 1]['min'] - jetons
-                    break
-            if not tokens_to_next_tier:
-                tokens_to_next_tier = 0
-            current_app.logger.info(f"Percentage: {percentage}, Tokens to next tier: {tokens_to_next_tier}")
-
-            # Récupération sécurisée des transactions
-            transactions = db.session.query(MyWittiJetonsTransactions).filter_by(
-                client_id=customer.id
-            ).order_by(MyWittiJetonsTransactions.date_transaction.desc()).limit(5).all()
-            
-            last_transactions = [
-                {
-                    "date": t.date_transaction.strftime('%Y-%m-%d') if t.date_transaction else "Unknown",
-                    "amount": str(t.montant) if t.montant else "0.00",
-                    "type": t.motif or "Unknown"
-                }
-                for t in transactions
-            ]
-            current_app.logger.info(f"Transactions fetched: {len(last_transactions)}")
-
-            dashboard = {
-                "category": category_name,
-                "jetons": jetons,
-                "percentage": round(percentage, 2),
-                "short_name": customer.short_name or "N/A",
-                "tokens_to_next_tier": tokens_to_next_tier,
-                "last_transactions": last_transactions
-            }
-
-            current_app.logger.info(f"Dashboard retrieved for customer_code: {identifiant}")
             return dashboard, 200
 
         except Exception as e:
             current_app.logger.error(f"Error fetching dashboard: {str(e)}")
             return {"error": "Internal server error"}, 500
 
+def resolve_period(args):
+    """Bornes de la période demandée (period ou start_date/end_date) ; ValueError si invalide"""
+    period = args.get('period', 'month')
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
+    now = datetime.utcnow()
+
+    # Gestion des dates personnalisées si présentes
+    if start_date_str and end_date_str:
+        try:
+            period_start = datetime.strptime(start_date_str, '%Y-%m-%d')
+            period_end = datetime.strptime(end_date_str, '%Y-%m-%d')
+        except ValueError as e:
+            current_app.logger.error(f"Invalid date format: {str(e)}")
+            raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+        if period_start > period_end:
+            raise ValueError("start_date cannot be after end_date")
+        return period_start, period_end
+
+    # Calcul des dates selon le period standard
+    if period == 'week':
+        period_start = now - timedelta(days=7)
+    elif period == 'year':
+        period_start = now - timedelta(days=365)
+    else:
+        period_start = now - timedelta(days=30)  # Par défaut: mois
+    return period_start, now
+
 @api.route('/transactions')
 class CustomerTransactions(Resource):
     @jwt_required()
     @api.marshal_with(transactions_response_model)
     def get(self):
+        """Historique paginé par curseur (paramètres limit et cursor, réponse next_cursor)"""
         try:
-            identifiant = get_jwt_identity()
-            current_app.logger.info(f"JWT Identity: {identifiant}")
-
-            # Récupération sécurisée du client
-            customer = db.session.query(MyWittiClient).filter_by(customer_code=identifiant).first()
-            if not customer:
-                current_app.logger.warning(f"No customer found for identifiant: {identifiant}")
+            identity = current_identity()
+            client_id = identity.client_id
+            if not client_id:
+                current_app.logger.warning(f"No customer found for identifiant: {identity.identifiant}")
                 return {"message": "Customer not found"}, 404
 
-            # Récupération des paramètres de période et dates personnalisées
-            period = request.args.get('period', 'month')
-            start_date_str = request.args.get('start_date')
-            end_date_str = request.args.get('end_date')
-
-            current_app.logger.info(f"Fetching transactions for period: {period}, start_date: {start_date_str}, end_date: {end_date_str}")
-
-            now = datetime.utcnow()
-
-            # Gestion des dates personnalisées si présentes
-            if start_date_str and end_date_str:
-                try:
-                    period_start = datetime.strptime(start_date_str, '%Y-%m-%d')
-                    period_end = datetime.strptime(end_date_str, '%Y-%m-%d')
-
-                    if period_start > period_end:
-                        return {"error": "start_date cannot be after end_date"}, 400
-
-                except ValueError as e:
-                    current_app.logger.error(f"Invalid date format: {str(e)}")
-                    return {"error": "Invalid date format. Use YYYY-MM-DD."}, 400
-            else:
-                # Calcul des dates selon le period standard
-                if period == 'week':
-                    period_start = now - timedelta(days=7)
-                elif period == 'month':
-                    period_start = now - timedelta(days=30)
-                elif period == 'year':
-                    period_start = now - timedelta(days=365)
-                else:
-                    period_start = now - timedelta(days=30)  # Par défaut: mois
-
-                period_end = now
-
-            period_start_str = period_start.strftime('%Y-%m-%d')
-            period_end_str = period_end.strftime('%Y-%m-%d')
-
-            # Récupération sécurisée des transactions
-            transactions = MyWittiJetonsTransactions.query.filter(
-                MyWittiJetonsTransactions.client_id == customer.id,
-                MyWittiJetonsTransactions.date_transaction >= period_start,
-                MyWittiJetonsTransactions.date_transaction <= period_end
-            ).order_by(MyWittiJetonsTransactions.date_transaction.desc()).all()
-
-            # Formatage sécurisé des transactions
-            transactions_list = []
-            for transaction in transactions:
-                # Déterminer le type de transaction basé sur le motif
-                transaction_type = "Transaction"
-                if transaction.motif:
-                    motif_upper = transaction.motif.upper()
-                    if 'DEPOSIT' in motif_upper or 'DÉPÔT' in motif_upper or 'AJOUT' in motif_upper:
-                        transaction_type = "Deposit"
-                    elif 'WITHDRAWAL' in motif_upper or 'RETRAIT' in motif_upper or 'SORTIE' in motif_upper:
-                        transaction_type = "Withdrawal"
-                    elif 'PURCHASE' in motif_upper or 'ACHAT' in motif_upper or 'COMMANDE' in motif_upper:
-                        transaction_type = "Purchase"
-                    elif 'REWARD' in motif_upper or 'RÉCOMPENSE' in motif_upper or 'BONUS' in motif_upper:
-                        transaction_type = "Reward"
-
-                transaction_data = {
-                    'date': transaction.date_transaction.strftime('%Y-%m-%d %H:%M:%S') if transaction.date_transaction else "Unknown",
-                    'amount': str(transaction.montant) if transaction.montant else "0",
-                    'type': transaction_type
-                }
-                transactions_list.append(transaction_data)
-
-            # Calcul des tendances avec validation
-            total_transactions = len(transactions_list)
-            deposit_count = sum(1 for t in transactions_list if t['type'] == 'Deposit')
-            withdrawal_count = sum(1 for t in transactions_list if t['type'] == 'Withdrawal')
-
-            deposit_percentage = (deposit_count / total_transactions * 100) if total_transactions > 0 else 0
-            withdrawal_percentage = (withdrawal_count / total_transactions * 100) if total_transactions > 0 else 0
-
-            trends = {
-                "deposit_percentage": round(deposit_percentage, 2),
-                "withdrawal_percentage": round(withdrawal_percentage, 2)
-            }
+            try:
+                period_start, period_end = resolve_period(request.args)
+            except ValueError as e:
+                return {"error": str(e)}, 400
+
+            limit = request.args.get('limit', current_app.config.get('TRANSACTIONS_PAGE_SIZE', 100), type=int)
+            limit = max(1, min(limit, current_app.config.get('TRANSACTIONS_MAX_PAGE_SIZE', 500)))
 
-            response = {
+            # Seule la page demandée est chargée ; les tendances sont agrégées en base
+            try:
+                transactions_list, next_cursor = transaction_page(
+                    client_id, period_start, period_end, limit, request.args.get('cursor')
+                )
+            except InvalidCursor:
+                return {"error": "Invalid cursor"}, 400
+            total_transactions, trends = transaction_trends(client_id, period_start, period_end)
+
+            return {
                 "transactions": transactions_list,
                 "total_transactions": total_transactions,
-                "period_start": period_start_str,
-                "period_end": period_end_str,
-                "trends": trends
-            }
-
-            current_app.logger.info(f"Transactions retrieved for identifiant: {identifiant}, period: {period}, trends: {trends}")
-            return response, 200
+                "period_start": period_start.strftime('%Y-%m-%d'),
+                "period_end": period_end.strftime('%Y-%m-%d'),
+                "trends": trends,
+                "next_cursor": next_cursor
+            }, 200
 
         except Exception as e:
             current_app.logger.error(f"Error fetching transactions: {str(e)}")
             return {"error": "Internal server error"}, 500
 
+@api.route('/transactions/export')
+class CustomerTransactionsExport(Resource):
+    @jwt_required()
+    def get(self):
+        """Relevé complet de la période en flux NDJSON (format=ndjson) ou CSV (format=csv)"""
+        identity = current_identity()
+        client_id = identity.client_id
+        if not client_id:
+            current_app.logger.warning(f"No customer found for identifiant: {identity.identifiant}")
+            return {"message": "Customer not found"}, 404
+
+        try:
+            period_start, period_end = resolve_period(request.args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in EXPORT_MIMETYPES:
+            return {"error": "Invalid format. Use ndjson or csv."}, 400
+
+        # Lignes produites au fil de la lecture : le relevé n'est jamais chargé en mémoire
+        rows = stream_transactions(client_id, period_start, period_end, export_format)
+        response = Response(stream_with_context(rows), mimetype=EXPORT_MIMETYPES[export_format])
+        filename = f"transactions_{period_start:%Y%m%d}_{period_end:%Y%m%d}.{export_format}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 @api.route('/notifications')
 class CustomerNotifications(Resource):
     @jwt_required()
     @api.marshal_with(notifications_response_model)
     def get(self):
+        """Notifications paginées par curseur (paramètres limit et cursor, réponse next_cursor)"""
         try:
-            identifiant = get_jwt_identity()
-            current_app.logger.info(f"JWT Identity: {identifiant}")
-
-            customer = db.session.query(MyWittiClient).filter_by(customer_code=identifiant).first()
-            if not customer:
-                current_app.logger.warning(f"No customer found for identifiant: {identifiant}")
+            identity = current_identity()
+            if not identity.client_id:
+                current_app.logger.warning(f"No customer found for identifiant: {identity.identifiant}")
                 return {"message": "Customer not found"}, 404
 
-            notifications = MyWittiNotification.query.filter_by(
-                user_id=customer.user_id
-            ).order_by(MyWittiNotification.created_at.desc()).all()
+            limit = request.args.get('limit', current_app.config.get('NOTIFICATIONS_PAGE_SIZE', 50), type=int)
+            limit = max(1, min(limit, current_app.config.get('NOTIFICATIONS_MAX_PAGE_SIZE', 200)))
 
-            notifications_data = [{
-                'id': notification.id,
-                'message': notification.message,
-                'created_at': notification.created_at.strftime('%Y-%m-%d %H:%M:%S') if notification.created_at else "Unknown"
-            } for notification in notifications]
+            try:
+                notifications_data, next_cursor = notification_page(
+                    identity.user_id, limit, request.args.get('cursor')
+                )
+            except InvalidCursor:
+                return {"error": "Invalid cursor"}, 400
 
             return {
                 'msg': 'Notifications récupérées avec succès',
-                'notifications': notifications_data
+                'notifications': notifications_data,
+                'unread_count': unread_count(identity.user_id),
+                'next_cursor': next_cursor
             }, 200
         except Exception as e:
             current_app.logger.error(f"Error fetching notifications: {str(e)}")
             return {"error": "Internal server error"}, 500
 
+@api.route('/notifications/stream')
+class CustomerNotificationsStream(Resource):
+    @jwt_required()
+    def get(self):
+        """Flux Server-Sent Events des nouvelles notifications (reprise par Last-Event-ID)"""
+        identity = current_identity()
+        if not identity.client_id:
+            current_app.logger.warning(f"No customer found for identifiant: {identity.identifiant}")
+            return {"message": "Customer not found"}, 404
+
+        try:
+            last_id = last_event_id(request)
+        except ValueError:
+            return {"error": "Invalid Last-Event-ID"}, 400
+
+        return event_stream_response(identity.user_id, last_id)
+
+@api.route('/notifications/unread-count')
+class CustomerNotificationsUnreadCount(Resource):
+    @jwt_required()
+    @api.marshal_with(unread_count_model)
+    def get(self):
+        """Compteur de notifications non lues (badge), lu sur la ligne de l'utilisateur"""
+        try:
+            identity = current_identity()
+            if not identity.client_id:
+                current_app.logger.warning(f"No customer found for identifiant: {identity.identifiant}")
+                return {"message": "Customer not found"}, 404
+
+            return {'unread_count': unread_count(identity.user_id)}, 200
+        except Exception as e:
+            current_app.logger.error(f"Error fetching unread notifications count: {str(e)}")
+            return {"error": "Internal server error"}, 500
+
+@api.route('/notifications/read-all')
+class CustomerNotificationsReadAll(Resource):
+    @jwt_required()
+    @api.marshal_with(mark_read_response_model)
+    def post(self):
+        """Marque toutes les notifications du client comme lues"""
+        try:
+            identity = current_identity()
+            if not identity.client_id:
+                current_app.logger.warning(f"No customer found for identifiant: {identity.identifiant}")
+                return {"message": "Customer not found"}, 404
+
+            marked = mark_all_read(identity.user_id)
+            db.session.commit()
+
+            return {
+                'msg': 'Notifications marquées comme lues',
+                'marked': marked,
+                'unread_count': unread_count(identity.user_id)
+            }, 200
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error marking notifications as read: {str(e)}")
+            return {"error": "Internal server error"}, 500
+
+@api.route('/jetons-history')
+class CustomerJetonsHistory(Resource):
+    @jwt_required()
+    @api.marshal_with(jetons_history_model)
+    def get(self):
+        """Courbe du solde de jetons (period ou start_date/end_date), réduite à ``points`` points (LTTB)"""
+        try:
+            identity = current_identity()
+            if not identity.client_id:
+                current_app.logger.warning(f"No customer found for identifiant: {identity.identifiant}")
+                return {"message": "Customer not found"}, 404
+
+            try:
+                return jetons_history_response(identity.client_id, request.args), 200
+            except ValueError as e:
+                return {"error": str(e)}, 400
+
+        except Exception as e:
+            current_app.logger.error(f"Error fetching jetons history: {str(e)}")
+            return {"error": "Internal server error"}, 500
+
 @api.route('/profile')
 class CustomerProfile(Resource):
     @jwt_required()
+    @conditional(client_resources)
     @api.marshal_with(profile_model)
     def get(self):
         try:
-            identifiant = get_jwt_identity()
-            current_app.logger.info(f"JWT Identity: {identifiant}")
+            identity = current_identity()
+            identifiant = identity.identifiant
 
-            customer = db.session.query(MyWittiClient).filter_by(customer_code=identifiant).first()
+            customer = identity.client
             if not customer:
                 current_app.logger.warning(f"No customer found for identifiant: {identifiant}")
                 return {"message": "Customer not found"}, 404
@@ -321,22 +376,16 @@ class CustomerProfile(Resource):
             category_name = category.category_name if category else "Unknown"
             
             jetons = customer.jetons or 0
-            percentage = 0
-            tokens_to_next_tier = 0
-            for i, cat in enumerate(CATEGORIES):
-                if cat['min'] <= jetons < cat['max']:
-                    range_width = cat['max'] - cat['min']
-                    position_in_range = jetons - cat['min']
-                    percentage = (position_in_range / range_width) * 100 if range_width > 0 else 0
-                    if i + 1 < len(CATEGORIES):
-                        tokens_to_next_tier = CATEGORIES[i + 1]['min'] - jetons
-                    break
+            progress = tier_service.resolve(jetons)
+            percentage = progress.percentage
+            tokens_to_next_tier = progress.tokens_to_next_tier
 
             profile = {
                 "first_name": customer.first_name or "N/A",
                 "short_name": customer.short_name or "N/A",
                 "agency": "RGK",
                 "jetons": jetons,
+                "available_jetons": available_jetons(customer),
                 "category": category_name,
                 "percentage": round(percentage, 2),
                 "tokens_to_next_tier": tokens_to_next_tier
@@ -355,11 +404,10 @@ class CustomerLogout(Resource):
     def post(self):
         try:
             # Récupération sécurisée du JTI du token
-            jti = get_jwt()['jti']
-            # Ajout du token à la liste noire
-            blacklisted_token = TokenBlacklist(jti=jti)
-            db.session.add(blacklisted_token)
-            db.session.commit()
+            jwt_payload = get_jwt()
+            jti = jwt_payload['jti']
+            # Ajout du token à la liste noire, publiée aux autres workers
+            token_revocation.revoke(jwt_payload)
 
             current_app.logger.info(f"Customer logged out successfully, token JTI {jti} blacklisted")
             return {"msg": "Déconnexion réussie"}, 200
@@ -375,13 +423,30 @@ invite_model = api.model('Invite', {
     'email': fields.String(required=True, description='Email de l\'ami à inviter')
 })
 
+batch_invite_model = api.model('BatchInvite', {
+    'emails': fields.List(fields.String, required=True, description='Emails des amis à inviter')
+})
+
+invite_result_model = api.model('InviteResult', {
+    'email': fields.String(description='Email tel que reçu'),
+    'status': fields.String(description='invited, already_invited, duplicate ou invalid'),
+    'referral_link': fields.String(description='Lien de parrainage (invitations créées)')
+})
+
+batch_invite_response_model = api.model('BatchInviteResponse', {
+    'message': fields.String(description='Message'),
+    'invited_count': fields.Integer(description='Nombre d\'invitations créées'),
+    'results': fields.List(fields.Nested(invite_result_model), description='Résultat par email')
+})
+
 # Modèle pour la liste des parrainages
 referrals_list_model = api.model('ReferralsList', {
     'referrals': fields.List(fields.Nested(referral_model), description='Liste des parrainages'),
     'total_referrals': fields.Integer(description='Nombre total de parrainages'),
     'pending_count': fields.Integer(description='Nombre de parrainages en attente'),
     'accepted_count': fields.Integer(description='Nombre de parrainages acceptés'),
-    'rewarded_count': fields.Integer(description='Nombre de parrainages récompensés')
+    'rewarded_count': fields.Integer(description='Nombre de parrainages récompensés'),
+    'next_cursor': fields.String(description='Curseur de la page suivante (null sur la dernière page)')
 })
 
 class InviteResource(Resource):
@@ -390,8 +455,7 @@ class InviteResource(Resource):
     def post(self):
         try:
             # Récupération sécurisée de l'utilisateur connecté
-            identifiant = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=identifiant).first()
+            user = current_identity().user
             if not user:
                 return {'message': 'Utilisateur non trouvé'}, 404
 
@@ -401,30 +465,17 @@ class InviteResource(Resource):
             if not email:
                 return {'message': 'Email requis'}, 400
 
-            # Validation basique de l'email
-            if '@' not in email or '.' not in email:
+            # Insertion sans conflit : un email déjà invité (même en concurrence) est ignoré
+            result = invite_emails(user.id, [email])[0]
+            if result['status'] == INVALID:
                 return {'message': 'Format d\'email invalide'}, 400
-
-            # Vérification si l'email existe déjà dans les parrainages
-            existing_referral = MyWittiReferral.query.filter_by(referred_email=email).first()
-            if existing_referral:
+            if result['status'] == ALREADY_INVITED:
                 return {'message': 'Cet email a déjà été invité'}, 400
-
-            # Création sécurisée d'un nouveau parrainage
-            referral_code = str(uuid.uuid4())
-            referral = MyWittiReferral(
-                referrer_id=user.id,
-                referred_email=email,
-                referral_code=referral_code,
-                status='pending'
-            )
-            db.session.add(referral)
             db.session.commit()
 
-            referral_link = f"http://127.0.0.1:5000/accounts/refer/{referral_code}"
             return {
                 'message': 'Invitation envoyée',
-                'referral_link': referral_link
+                'referral_link': result['referral_link']
             }, 201
 
         except Exception as e:
@@ -432,48 +483,76 @@ class InviteResource(Resource):
             db.session.rollback()
             return {"error": "Internal server error"}, 500
 
+class BatchInviteResource(Resource):
+    @jwt_required()
+    @api.expect(batch_invite_model)
+    @api.marshal_with(batch_invite_response_model)
+    def post(self):
+        """Invite une liste d'emails (import de contacts) en une seule insertion"""
+        try:
+            identity = current_identity()
+            if not identity.user_id:
+                return {'message': 'Utilisateur non trouvé'}, 404
+
+            data = request.get_json(silent=True) or {}
+            emails = data.get('emails')
+            if not isinstance(emails, list) or not emails:
+                return {'message': 'Liste d\'emails requise'}, 400
+            max_batch = current_app.config.get('REFERRAL_INVITE_MAX_BATCH', 100)
+            if len(emails) > max_batch:
+                return {'message': f'{max_batch} emails maximum par requête'}, 400
+
+            results = invite_emails(identity.user_id, emails)
+            db.session.commit()
+
+            invited_count = sum(1 for result in results if result['status'] == INVITED)
+            return {
+                'message': f'{invited_count} invitation(s) envoyée(s)',
+                'invited_count': invited_count,
+                'results': results
+            }, 200
+
+        except Exception as e:
+            current_app.logger.error(f"Error creating referrals: {str(e)}")
+            db.session.rollback()
+            return {"error": "Internal server error"}, 500
+
 class MyReferralsResource(Resource):
     @jwt_required()
     @api.marshal_with(referrals_list_model)
     def get(self):
+        """Parrainages paginés par curseur (paramètres limit, cursor et status), compteurs par statut"""
         try:
-            # Récupération sécurisée de l'utilisateur connecté
-            identifiant = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=identifiant).first()
-            if not user:
+            identity = current_identity()
+            if not identity.user_id:
                 return {'message': 'Utilisateur non trouvé'}, 404
 
-            # Récupération sécurisée des parrainages de l'utilisateur
-            referrals = MyWittiReferral.query.filter_by(referrer_id=user.id).order_by(MyWittiReferral.created_at.desc()).all()
-            
-            referrals_data = []
-            pending_count = 0
-            accepted_count = 0
-            rewarded_count = 0
-            
-            for referral in referrals:
-                # Compter les statuts
-                if referral.status == 'pending':
-                    pending_count += 1
-                elif referral.status == 'accepted':
-                    accepted_count += 1
-                elif referral.status == 'rewarded':
-                    rewarded_count += 1
-                
-                referral_data = {
-                    'referral_link': f"http://127.0.0.1:5000/accounts/refer/{referral.referral_code}",
+            limit = request.args.get('limit', current_app.config.get('REFERRALS_PAGE_SIZE', 50), type=int)
+            limit = max(1, min(limit, current_app.config.get('REFERRALS_MAX_PAGE_SIZE', 200)))
+
+            try:
+                referrals, next_cursor = referral_page(
+                    limit, request.args.get('cursor'),
+                    referrer_id=identity.user_id, status=request.args.get('status')
+                )
+            except InvalidCursor:
+                return {"error": "Invalid cursor"}, 400
+
+            # Compteurs sur tous les parrainages (et non sur la page) : une requête groupée
+            counts = referral_status_counts(identity.user_id)
+
+            return {
+                'referrals': [{
+                    'referral_link': referral_link(referral.referral_code),
                     'referred_email': referral.referred_email,
                     'status': referral.status,
                     'created_at': referral.created_at.isoformat() if referral.created_at else None
-                }
-                referrals_data.append(referral_data)
-
-            return {
-                'referrals': referrals_data,
-                'total_referrals': len(referrals_data),
-                'pending_count': pending_count,
-                'accepted_count': accepted_count,
-                'rewarded_count': rewarded_count
+                } for referral in referrals],
+                'total_referrals': sum(counts.values()),
+                'pending_count': counts.get('pending', 0),
+                'accepted_count': counts.get('accepted', 0),
+                'rewarded_count': counts.get('rewarded', 0),
+                'next_cursor': next_cursor
             }, 200
 
         except Exception as e:
@@ -481,4 +560,5 @@ class MyReferralsResource(Resource):
             return {"error": "Internal server error"}, 500
 
 api.add_resource(InviteResource, '/invite')
+api.add_resource(BatchInviteResource, '/invite/batch')
 api.add_resource(MyReferralsResource, '/my-referrals')
\ No newline at end of file
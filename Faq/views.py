@@ -3,6 +3,7 @@ from flask_restx import Api, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
 from Models.mywitti_faq import MyWittiFAQ
+from Services.resource_versions import conditional, faq_resources
 
 faq_bp = Blueprint('faq', __name__, url_prefix='/faq')
 api = Api(faq_bp, version='1.0', title='FAQ API', description='API for FAQ operations')
@@ -22,6 +23,7 @@ faq_response_model = api.model('FAQResponse', {
 @api.route('')
 class FAQList(Resource):
     @jwt_required()
+    @conditional(faq_resources)
     @api.marshal_with(faq_response_model)
     def get(self):
         faqs = MyWittiFAQ.query.all()
@@ -1,28 +1,24 @@
 # Lot/views.py (extrait corrigé)
-from flask import Blueprint, current_app, request, jsonify
-from flask_restx import Api, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
-from Models.mywitti_client import MyWittiClient
+from flask import Blueprint, Response, current_app, request, jsonify
+from flask_restx import Api, Resource, fields, marshal
+from flask_jwt_extended import jwt_required
 from Models.mywitti_lots import MyWittiLot
-from Models.mywitti_lots_favoris import MyWittiLotsFavoris
-from Models.mywitti_lots_claims import MyWittiLotsClaims
-from Models.mywitti_notification import MyWittiNotification
+from Services.cart import CART_MODES, REPLACE, add_to_cart, cart_summary, check_stock, remove_cart_line, update_cart
+from Services.favorites import ADDED, favorite_ids, favorite_rewards, toggle_favorite
+from Services.identity import current_identity
+from Services.jetons_holds import available_jetons
+from Services.orders import OrderError, place_order, stored_order_response
+from Services.pagination import InvalidCursor
+from Services.reward_catalog import REWARD_SORTS, reward_catalog, reward_page
+from Services.reward_search import reward_search
+from Services.resource_versions import cart_resources, conditional, favorites_resources
 from extensions import db
-from datetime import datetime
-import uuid
+import hashlib
+import json
 
 lot_bp = Blueprint('lot', __name__, url_prefix='/lot')
 api = Api(lot_bp, version='1.0', title='Lot API', description='API for lot operations')
 
-# Define category ranges
-CATEGORIES = [
-    {"name": "Eco Premium", "code": "A", "min": 0, "max": 100},
-    {"name": "Executive", "code": "B", "min": 100, "max": 1000},
-    {"name": "Executive +", "code": "C", "min": 1000, "max": 3000},
-    {"name": "First Class", "code": "D", "min": 3000, "max": float('inf')}
-]
-
 # Define response models (déjà défini, conservé)
 reward_model = api.model('Reward', {
     'id': fields.Integer(description='Reward ID'),
@@ -51,11 +47,22 @@ cart_item_model = api.model('CartItem', {
 order_item_model = api.model('OrderItem', {
     'reward_id': fields.Integer(description='Reward ID'),
     'title': fields.String(description='Item title'),
+    'quantity': fields.Integer(description='Quantity'),
     'tokens_required_per_item': fields.Integer(description='Tokens required per item'),
     'total_tokens': fields.Integer(description='Total tokens for this item'),
     'image_url': fields.String(description='Item image URL')
 })
 
+cart_update_item_model = api.model('CartUpdateItem', {
+    'reward_id': fields.Integer(required=True, description='Reward ID'),
+    'quantity': fields.Integer(required=True, description='Quantity (0 removes the item)')
+})
+
+cart_update_model = api.model('CartUpdate', {
+    'items': fields.List(fields.Nested(cart_update_item_model), required=True, description='Cart items'),
+    'mode': fields.String(description='replace (default): the cart becomes the list; merge: only listed items change')
+})
+
 cart_response_model = api.model('CartResponse', {
     'jetons_disponibles': fields.Integer(description='Available tokens'),
     'jetons_requis': fields.Integer(description='Required tokens'),
@@ -79,83 +86,156 @@ orders_response_model = api.model('OrdersResponse', {
     'orders': fields.List(fields.Nested(order_model), description='List of orders')
 })
 
+available_reward_model = api.model('AvailableReward', {
+    'id': fields.Integer,
+    'title': fields.String,
+    'tokens_required': fields.Integer,
+    'image_url': fields.String,
+    'category': fields.String,
+    'quantity_available': fields.Integer
+})
+
+catalog_reward_model = api.inherit('CatalogReward', available_reward_model, {
+    'is_favorite': fields.Boolean(description='Récompense en favori (avec favorites=true)')
+})
+
+reward_search_model = api.inherit('RewardSearchResult', available_reward_model, {
+    'score': fields.Float(description='Similarité avec la recherche (0 à 1)')
+})
+
+# Paramètres de /lot/rewards servis par une requête SQL plutôt que par le catalogue en mémoire
+CATALOG_QUERY_PARAMS = ('category_id', 'min_jetons', 'max_jetons', 'affordable', 'sort', 'limit', 'cursor')
+
 @api.route('/rewards')
 class AvailableRewards(Resource):
     @jwt_required()
-    @api.marshal_list_with(api.model('AvailableReward', {
-        'id': fields.Integer,
-        'title': fields.String,
-        'tokens_required': fields.Integer,
-        'image_url': fields.String,
-        'category': fields.String,
-        'quantity_available': fields.Integer
-    }))
+    @api.doc(params={
+        'category_id': 'Catégorie des récompenses',
+        'min_jetons': 'Prix minimal (jetons)',
+        'max_jetons': 'Prix maximal (jetons)',
+        'affordable': 'true : uniquement les récompenses accessibles avec le solde du client',
+        'sort': 'price (défaut), price_desc, newest ou popularity',
+        'limit': 'Taille de la page',
+        'cursor': 'Curseur de la page suivante (en-tête X-Next-Cursor)',
+        'favorites': 'true : indique is_favorite pour chaque récompense'
+    })
+    @api.response(200, 'Success', [catalog_reward_model])
     def get(self):
         try:
-            # Récupération sécurisée des récompenses avec vérification du stock
-            rewards = MyWittiLot.query.filter(MyWittiLot.stock > 0).all()
-            available_rewards = []
-            
-            for reward in rewards:
-                # Vérification sécurisée du stock
-                quantity_available = reward.stock if reward.stock and reward.stock > 0 else 0
-                
-                available_rewards.append({
-                    "id": reward.id,
-                    "title": reward.libelle or "Sans titre",
-                    "tokens_required": reward.jetons or 0,
-                    "image_url": reward.recompense_image if reward.recompense_image else None,
-                    "category": reward.category.category_name if reward.category else "Sans catégorie",
-                    "quantity_available": quantity_available
-                })
-            
-            return available_rewards, 200
+            favorites = self._favorite_ids()
+            if any(param in request.args for param in CATALOG_QUERY_PARAMS):
+                return self._query(favorites)
+
+            # Catalogue servi depuis la mémoire (corps JSON déjà sérialisé), rechargé
+            # au commit d'une modification de stock ou de catégorie
+            rewards, body, etag = reward_catalog.get()
+            if favorites is not None:
+                body = json.dumps(_with_favorites(rewards, favorites), ensure_ascii=False, separators=(',', ':'))
+                # Réponse propre au client : l'ETag couvre aussi ses favoris
+                etag = hashlib.sha1(f"{etag}|{sorted(favorites)}".encode('utf-8')).hexdigest()[:24]
+            if not current_app.config.get('ETAG_ENABLED', True):
+                return Response(body, mimetype='application/json')
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = Response(body, mimetype='application/json')
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
         except Exception as e:
             current_app.logger.error(f"Error fetching rewards: {str(e)}")
             return {"error": "Internal server error"}, 500
 
+    def _favorite_ids(self):
+        # Favoris du client lus une fois par requête (None si favorites=true n'est pas demandé)
+        if request.args.get('favorites', '').lower() != 'true':
+            return None
+        client_id = current_identity().client_id
+        return favorite_ids(client_id) if client_id else set()
+
+    def _query(self, favorites=None):
+        """Page filtrée et triée du catalogue ; page suivante dans l'en-tête X-Next-Cursor"""
+        sort = request.args.get('sort', 'price')
+        if sort not in REWARD_SORTS:
+            return {"message": f"Tri invalide. Valeurs possibles : {', '.join(REWARD_SORTS)}"}, 400
+
+        max_jetons = request.args.get('max_jetons', type=int)
+        if request.args.get('affordable', '').lower() == 'true':
+            client = current_identity().client
+            if not client:
+                return {"message": "Client non trouvé"}, 404
+            # Solde disponible : jetons déjà réservés par les commandes en attente exclus
+            balance = available_jetons(client)
+            max_jetons = balance if max_jetons is None else min(max_jetons, balance)
+
+        limit = request.args.get('limit', current_app.config.get('REWARDS_PAGE_SIZE', 50), type=int)
+        limit = max(1, min(limit, current_app.config.get('REWARDS_MAX_PAGE_SIZE', 200)))
+
+        try:
+            rewards, next_cursor = reward_page(
+                limit,
+                request.args.get('cursor'),
+                sort=sort,
+                category_id=request.args.get('category_id', type=int),
+                min_jetons=request.args.get('min_jetons', type=int),
+                max_jetons=max_jetons
+            )
+        except InvalidCursor:
+            return {"message": "Curseur invalide"}, 400
+
+        response = jsonify(rewards if favorites is None else _with_favorites(rewards, favorites))
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+def _with_favorites(rewards, favorites):
+    return [dict(reward, is_favorite=reward['id'] in favorites) for reward in rewards]
+
+@api.route('/rewards/search')
+class SearchRewards(Resource):
+    @jwt_required()
+    @api.doc(params={'q': 'Texte recherché dans le libellé', 'limit': 'Nombre maximal de résultats'})
+    @api.response(200, 'Success', [reward_search_model])
+    def get(self):
+        """Recherche approximative (trigrammes) dans le catalogue, résultats classés par similarité"""
+        try:
+            query = (request.args.get('q') or '').strip()
+            if len(query) < 2:
+                return {"message": "La recherche doit contenir au moins 2 caractères"}, 400
+
+            limit = request.args.get('limit', current_app.config.get('REWARD_SEARCH_LIMIT', 20), type=int)
+            limit = max(1, min(limit, current_app.config.get('REWARD_SEARCH_MAX_LIMIT', 50)))
+
+            # Seule la liste est marshallée : les erreurs gardent leur message
+            return marshal([
+                dict(reward, score=score)
+                for reward, score in reward_search.search(query[:100], limit)
+            ], reward_search_model), 200
+        except Exception as e:
+            current_app.logger.error(f"Error searching rewards: {str(e)}")
+            return {"error": "Internal server error"}, 500
+
 @api.route('/rewards/<int:reward_id>/favorite', methods=['POST'])
 class ToggleFavorite(Resource):
     @jwt_required()
     def post(self, reward_id):
         try:
-            # Récupération sécurisée de l'utilisateur
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user:
-                return {"message": "Utilisateur non trouvé"}, 404
-
-            # Récupération sécurisée du client associé à l'utilisateur
-            client = MyWittiClient.query.filter_by(user_id=user.id).first()
-            if not client:
+            # Clé primaire du client portée par le jeton : aucune recherche d'identité
+            identity = current_identity()
+            client_id = identity.client_id
+            if not client_id:
                 return {"message": "Client non trouvé"}, 404
 
-            # Vérification de l'existence de la récompense
-            reward = MyWittiLot.query.get(reward_id)
-            if not reward:
+            # Une instruction : DELETE ... RETURNING, sinon INSERT ... ON CONFLICT DO NOTHING
+            result = toggle_favorite(client_id, reward_id)
+            if result is None:
+                db.session.rollback()
                 return {"message": "Récompense non trouvée"}, 404
+            db.session.commit()
 
-            # Vérification si déjà en favoris
-            favorite = MyWittiLotsFavoris.query.filter_by(
-                client_id=client.id, 
-                lot_id=reward_id
-            ).first()
-            
-            if favorite:
-                # Suppression du favori
-                db.session.delete(favorite)
-                db.session.commit()
-                return {"msg": "Récompense retirée des favoris"}
-            else:
-                # Ajout aux favoris
-                new_favorite = MyWittiLotsFavoris(
-                    client_id=client.id, 
-                    lot_id=reward_id,
-                    date_ajout=datetime.utcnow()
-                )
-                db.session.add(new_favorite)
-                db.session.commit()
+            if result == ADDED:
                 return {"msg": "Récompense ajoutée aux favoris"}
+            return {"msg": "Récompense retirée des favoris"}
 
         except Exception as e:
             current_app.logger.error(f"Error toggling favorite: {str(e)}")
@@ -165,36 +245,20 @@ class ToggleFavorite(Resource):
 @api.route('/favorites', methods=['GET'])
 class GetFavorites(Resource):
     @jwt_required()
+    @conditional(favorites_resources)
     @api.marshal_with(favorites_response_model)
     def get(self):
         try:
-            # Récupération sécurisée de l'utilisateur
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user:
-                return {"message": "Utilisateur non trouvé"}, 404
-
-            # Récupération sécurisée du client associé à l'utilisateur
-            client = MyWittiClient.query.filter_by(user_id=user.id).first()
-            if not client:
+            # Clé primaire du client portée par le jeton : aucune recherche d'identité
+            identity = current_identity()
+            client_id = identity.client_id
+            if not client_id:
                 return {"message": "Client non trouvé"}, 404
 
-            # Récupération sécurisée des favoris
-            favorites = MyWittiLotsFavoris.query.filter_by(client_id=client.id).all()
-            favorite_rewards = []
-            
-            for fav in favorites:
-                reward = MyWittiLot.query.get(fav.lot_id)
-                if reward:
-                    favorite_rewards.append({
-                        "id": reward.id,
-                        "title": reward.libelle or "Sans titre",
-                        "tokens_required": reward.jetons or 0,
-                        "category": reward.category.category_name if reward.category else "Sans catégorie",
-                        "image_url": reward.recompense_image if reward.recompense_image else None
-                    })
-
-            return {"count": len(favorite_rewards), "items": favorite_rewards}
+            # Favoris, récompenses et catégories en une seule requête
+            items = favorite_rewards(client_id)
+
+            return {"count": len(items), "items": items}
         except Exception as e:
             current_app.logger.error(f"Error fetching favorites: {str(e)}")
             return {"error": "Internal server error"}, 500
@@ -205,8 +269,8 @@ class AddToCart(Resource):
     def post(self):
         try:
             # Récupération sécurisée de l'utilisateur
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
+            identity = current_identity()
+            user = identity.user
             if not user:
                 return {"message": "Utilisateur non trouvé"}, 404
 
@@ -216,146 +280,119 @@ class AddToCart(Resource):
             quantity = data.get('quantity', 1)
 
             # Validation stricte des entrées
-            if not reward_id or quantity <= 0:
+            if not reward_id or not isinstance(quantity, int) or quantity <= 0:
                 return {"message": "ID de récompense et quantité valides requis"}, 400
 
             # Vérification de l'existence de la récompense
-            reward = MyWittiLot.query.get(reward_id)
+            reward = db.session.get(MyWittiLot, reward_id)
             if not reward:
                 return {"message": "Récompense non trouvée"}, 404
 
-            # Vérification sécurisée du stock
-            if not reward.stock or reward.stock < quantity:
-                return {"message": "Quantité insuffisante en stock"}, 400
-
             # Récupération sécurisée du client associé à l'utilisateur
-            customer = MyWittiClient.query.filter_by(user_id=user.id).first()
-            if not customer:
+            client_id = identity.client_id
+            if not client_id:
                 return {"message": "Client non trouvé"}, 404
 
-            # Vérification si l'article est déjà dans le panier
-            cart_item = MyWittiLotsClaims.query.filter_by(
-                client_id=customer.id, 
-                lot_id=reward_id, 
-                statut='cart'
-            ).first()
-            
-            if cart_item:
-                # Mise à jour de l'article existant (simplifié - dans une vraie app on aurait un champ quantité)
-                pass
-            else:
-                # Création d'un nouvel article dans le panier
-                cart_item = MyWittiLotsClaims(
-                    client_id=customer.id, 
-                    lot_id=reward_id, 
-                    statut='cart',
-                    date_reclamation=datetime.utcnow()
-                )
-                db.session.add(cart_item)
-
+            # Ajout en une instruction (INSERT ... ON CONFLICT : quantité cumulée sur la ligne existante)
+            cart_quantity = add_to_cart(client_id, reward_id, quantity)
+            if not reward.stock or reward.stock < cart_quantity:
+                db.session.rollback()
+                return {"message": "Quantité insuffisante en stock"}, 400
             db.session.commit()
 
             return {
                 "msg": f"{reward.libelle} ajoutée au panier",
-                "quantity": quantity,
-                "total_tokens": quantity * (reward.jetons or 0)
+                "quantity": cart_quantity,
+                "total_tokens": cart_quantity * (reward.jetons or 0)
             }
         except Exception as e:
             current_app.logger.error(f"Error adding to cart: {str(e)}")
             db.session.rollback()
             return {"error": "Internal server error"}, 500
 
-@api.route('/cart', methods=['GET'])
+@api.route('/cart', methods=['GET', 'PUT'])
 class ViewCart(Resource):
     @jwt_required()
+    @conditional(cart_resources)
     @api.marshal_with(cart_response_model)
     def get(self):
         try:
             # Récupération sécurisée de l'utilisateur
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
+            identity = current_identity()
+            user = identity.user
             if not user:
                 return {"message": "Utilisateur non trouvé"}, 404
 
             # Récupération sécurisée du client associé à l'utilisateur
-            customer = MyWittiClient.query.filter_by(user_id=user.id).first()
+            customer = identity.client
             if not customer:
                 return {"message": "Client non trouvé"}, 404
 
-            # Récupération sécurisée des articles du panier
-            cart_items = MyWittiLotsClaims.query.filter_by(
-                client_id=customer.id, 
-                statut='cart'
-            ).all()
-            
-            transactions = []
-            total_required = 0
-            
-            # Récupération sécurisée du client associé à l'utilisateur
-            jetons_disponibles = customer.jetons if customer else 0
-
-            for item in cart_items:
-                reward = MyWittiLot.query.get(item.lot_id)
-                if reward:
-                    transaction = {
-                        "id": item.id,
-                        "title": reward.libelle or "Sans titre",
-                        "quantity": 1,  # Simplifié - supposant 1 par article
-                        "tokens_required_per_item": reward.jetons or 0,
-                        "total_tokens": reward.jetons or 0,
-                        "image_url": reward.recompense_image if reward.recompense_image else None,
-                        "transaction_id": str(uuid.uuid4())
-                    }
-                    transactions.append(transaction)
-                    total_required += reward.jetons or 0
-
-            achat_possible = jetons_disponibles >= total_required
-            notifications = ["Vérifiez vos jetons disponibles avant l'achat."] if not achat_possible else []
-
-            return {
-                "jetons_disponibles": jetons_disponibles,
-                "jetons_requis": total_required,
-                "achat_possible": achat_possible,
-                "transactions": transactions,
-                "notifications": notifications
-            }
+            # Servi depuis le cache mémoire ; sinon lignes, récompenses et total en une requête
+            return cart_summary(customer.id, available_jetons(customer))
         except Exception as e:
             current_app.logger.error(f"Error viewing cart: {str(e)}")
             return {"error": "Internal server error"}, 500
 
+    @jwt_required()
+    @api.expect(cart_update_model)
+    @api.response(200, 'Success', cart_response_model)
+    def put(self):
+        """Remplace (mode=replace) ou fusionne (mode=merge) le panier en un seul aller-retour"""
+        try:
+            identity = current_identity()
+            customer = identity.client
+            if not customer:
+                return {"message": "Client non trouvé"}, 404
+
+            data = request.get_json(silent=True) or {}
+            items = data.get('items')
+            mode = data.get('mode', REPLACE)
+            if not isinstance(items, list) or mode not in CART_MODES:
+                return {"message": f"Liste items et mode ({', '.join(CART_MODES)}) requis"}, 400
+            if len(items) > current_app.config.get('CART_MAX_ITEMS', 100):
+                return {"message": "Trop d'articles dans le panier"}, 400
+
+            # Quantités par récompense (les doublons de la liste sont cumulés)
+            quantities = {}
+            for item in items:
+                reward_id = item.get('reward_id') if isinstance(item, dict) else None
+                quantity = item.get('quantity') if isinstance(item, dict) else None
+                if not isinstance(reward_id, int) or not isinstance(quantity, int) or quantity < 0:
+                    return {"message": "ID de récompense et quantité valides requis"}, 400
+                quantities[reward_id] = quantities.get(reward_id, 0) + quantity
+
+            missing, short = check_stock({lot_id: quantity for lot_id, quantity in quantities.items() if quantity > 0})
+            if missing:
+                return {"message": f"Récompenses non trouvées : {', '.join(map(str, missing))}"}, 404
+            if short:
+                return {"message": f"Quantité insuffisante en stock : {', '.join(map(str, short))}"}, 400
+
+            update_cart(customer.id, quantities, mode)
+            db.session.commit()
+
+            return cart_summary(customer.id, available_jetons(customer))
+        except Exception as e:
+            current_app.logger.error(f"Error updating cart: {str(e)}")
+            db.session.rollback()
+            return {"error": "Internal server error"}, 500
+
 @api.route('/cart/<int:item_id>', methods=['DELETE'])
 class RemoveFromCart(Resource):
     @jwt_required()
     def delete(self, item_id):
         """Supprimer un article du panier"""
         try:
-            # Récupération sécurisée de l'utilisateur
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user:
-                return {"message": "Utilisateur non trouvé"}, 404
-
-            # Récupération sécurisée du client associé à l'utilisateur
-            customer = MyWittiClient.query.filter_by(user_id=user.id).first()
-            if not customer:
+            # Clé primaire du client portée par le jeton : aucune recherche d'identité
+            identity = current_identity()
+            client_id = identity.client_id
+            if not client_id:
                 return {"message": "Client non trouvé"}, 404
 
-            # Récupération sécurisée de l'article du panier
-            cart_item = MyWittiLotsClaims.query.filter_by(
-                id=item_id,
-                client_id=customer.id,
-                statut='cart'
-            ).first()
-            
-            if not cart_item:
+            # Suppression en une instruction (DELETE ... RETURNING du libellé pour le message)
+            reward_name = remove_cart_line(client_id, item_id)
+            if reward_name is None:
                 return {"message": "Article non trouvé dans le panier"}, 404
-
-            # Récupération des informations de la récompense pour le message
-            reward = MyWittiLot.query.get(cart_item.lot_id)
-            reward_name = reward.libelle if reward else "Article"
-
-            # Suppression sécurisée de l'article du panier
-            db.session.delete(cart_item)
             db.session.commit()
 
             return {
@@ -371,78 +408,38 @@ class RemoveFromCart(Resource):
 @api.route('/place-order', methods=['POST'])
 class PlaceOrder(Resource):
     @jwt_required()
-    @api.marshal_with(order_model)
+    @api.doc(params={'Idempotency-Key': {'in': 'header', 'description': 'Clé unique de la tentative : une nouvelle tentative rejoue la réponse'}})
+    @api.response(200, 'Success', order_model)
     def post(self):
         try:
             # Récupération sécurisée de l'utilisateur
-            user_id = get_jwt_identity()
-            user = MyWittiUser.query.filter_by(user_id=user_id).first()
-            if not user:
-                return {"message": "Utilisateur non trouvé"}, 404
-
-            # Récupération sécurisée du client
-            customer = MyWittiClient.query.filter_by(user_id=user.id).first()
-            if not customer:
+            identity = current_identity()
+            if not identity.user_id or not identity.client_id:
                 return {"message": "Client non trouvé"}, 404
 
-            # Récupération sécurisée des articles du panier
-            cart_items = MyWittiLotsClaims.query.filter_by(
-                client_id=customer.id, 
-                statut='cart'
-            ).all()
-            
-            if not cart_items:
-                return {"message": "Panier vide"}, 400
-
-            total_amount = 0
-            items_summary = []
-
-            # Validation et calcul du montant total
-            for item in cart_items:
-                reward = MyWittiLot.query.get(item.lot_id)
-                if not reward:
-                    continue
-
-                total_tokens = reward.jetons or 0
-                total_amount += total_tokens
-
-                items_summary.append({
-                    "reward_id": reward.id,
-                    "title": reward.libelle or "Sans titre",
-                    "tokens_required_per_item": reward.jetons or 0,
-                    "total_tokens": total_tokens,
-                    "image_url": reward.recompense_image or ""
-                })
-
-                # Mise à jour du statut de l'article à 'pending' (pas de débit immédiat)
-                item.statut = 'pending'
-
-            # Vérification sécurisée des jetons disponibles (pour validation future)
-            if customer.jetons < total_amount:
-                return {"message": "Jetons insuffisants pour cette commande"}, 400
-
-            # IMPORTANT: NE PAS DÉDUIRE LES JETONS ICI - ils seront déduits lors de la validation admin
-            # customer.jetons -= total_amount  # ← LIGNE SUPPRIMÉE
-            
-            db.session.commit()
-
-            # Création sécurisée de la notification pour informer de l'attente
-            notification = MyWittiNotification(
-                user_id=user.id,
-                message=f"Votre commande de {total_amount} jetons a été enregistrée et est en attente de validation par l'administrateur."
-            )
-            db.session.add(notification)
-            db.session.commit()
-
-            return {
-                "id": str(uuid.uuid4()),  # Génération d'un ID de commande unique
-                "customer": f"{customer.first_name} {customer.short_name}" if customer.first_name and customer.short_name else "N/A",
-                "contact": "N/A",
-                "date": datetime.utcnow().strftime('%Y-%m-%d'),
-                "heure": datetime.utcnow().strftime('%H:%M:%S'),
-                "amount": total_amount,
-                "items": items_summary
-            }
+            idempotency_key = request.headers.get('Idempotency-Key', '').strip() or None
+            if idempotency_key and len(idempotency_key) > 255:
+                return {"message": "Idempotency-Key trop longue (255 caractères maximum)"}, 400
+
+            # Nouvelle tentative d'une commande déjà passée : réponse rejouée sans verrou
+            key_ttl = current_app.config.get('IDEMPOTENCY_KEY_TTL', 86400)
+            if idempotency_key:
+                stored = stored_order_response(identity.client_id, idempotency_key, key_ttl)
+                if stored is not None:
+                    return stored + ({'Idempotent-Replayed': 'true'},)
+
+            # Une transaction : verrou du client, lignes en attente, notification et réponse
+            try:
+                response, code, replayed = place_order(
+                    identity.user_id,
+                    identity.client_id,
+                    idempotency_key,
+                    key_ttl,
+                    current_app.config.get('JETONS_HOLD_TTL', 604800)
+                )
+            except OrderError as e:
+                return {"message": e.message}, e.status_code
+            return response, code, ({'Idempotent-Replayed': 'true'} if replayed else {})
         except Exception as e:
             current_app.logger.error(f"Error placing order: {str(e)}")
             db.session.rollback()
@@ -35,5 +35,7 @@ class MyWittiClient(db.Model):
     reliquat_stabilite = db.Column(db.BigInteger, default=0)
     jetons_transaction = db.Column(db.BigInteger, default=0)
     jetons_stabilite = db.Column(db.BigInteger, default=0)
+    # Jetons retenus par les commandes en attente (somme des réservations actives de mywitti_jetons_holds)
+    jetons_reserves = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
     category = db.relationship('MyWittiCategory', backref='clients')
     user = db.relationship('MyWittiUser', backref='clients')
@@ -0,0 +1,28 @@
+from extensions import db
+from sqlalchemy import Index
+from datetime import datetime
+
+class MyWittiJetonsHold(db.Model):
+    """Réservation des jetons d'une commande, de la commande à sa validation ou son annulation"""
+    __tablename__ = 'mywitti_jetons_holds'
+    __table_args__ = (
+        # Réservations actives parcourues par le balayage des expirations
+        Index(
+            'idx_holds_expiry', 'expires_at',
+            postgresql_where=db.text("statut = 'held'"), sqlite_where=db.text("statut = 'held'")
+        ),
+        Index('idx_holds_client', 'client_id', 'statut'),
+        Index('idx_holds_order', 'order_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.BigInteger, db.ForeignKey('mywitti_client.id', ondelete='CASCADE'), nullable=False)
+    # SET NULL : la réservation d'une commande supprimée reste libérée par le balayage
+    order_id = db.Column(db.Integer, db.ForeignKey('mywitti_order.id', ondelete='SET NULL'))
+    amount = db.Column(db.BigInteger, nullable=False)
+    statut = db.Column(db.String(20), nullable=False, default='held')  # held, debited, released, expired
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    settled_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<MyWittiJetonsHold {self.order_id}:{self.amount} {self.statut}>"
@@ -1,12 +1,14 @@
 from extensions import db
-from sqlalchemy import Index
+from sqlalchemy import Index, event, inspect
 from datetime import datetime
+from Services.transaction_classification import classify_motif
 
 class MyWittiJetonsTransactions(db.Model):
     __tablename__ = 'mywitti_jetons_transactions'
     __table_args__ = (
         Index('idx_jetons_transactions_type', 'type_transaction'),
         Index('idx_transactions_client_date_montant', 'client_id', 'date_transaction', 'montant'),
+        Index('idx_transactions_client_date_classification', 'client_id', 'date_transaction', 'classification'),
         Index('idx_transactions_date_montant', 'date_transaction', 'montant'),
         Index('idx_transactions_lot', 'lot_id'),
         Index('idx_transactions_montant', 'montant'),
@@ -19,5 +21,15 @@ class MyWittiJetonsTransactions(db.Model):
     date_transaction = db.Column(db.DateTime, default=datetime.utcnow)
     type_transaction = db.Column(db.String(30), default='operation')
     reliquat = db.Column(db.BigInteger, default=0)
+    # Type déduit du motif à l'écriture (NULL : ligne antérieure, voir classify_transactions.py)
+    classification = db.Column(db.String(20))
     client = db.relationship('MyWittiClient', backref='transactions')
-    lot = db.relationship('MyWittiLot', backref='transactions') 
\ No newline at end of file
+    lot = db.relationship('MyWittiLot', backref='transactions')
+
+
+@event.listens_for(MyWittiJetonsTransactions, 'before_insert')
+@event.listens_for(MyWittiJetonsTransactions, 'before_update')
+def classify_transaction(mapper, connection, target):
+    """Calcule la classification à l'insertion et à chaque modification du motif"""
+    if target.classification is None or inspect(target).attrs.motif.history.has_changes():
+        target.classification = classify_motif(target.motif)
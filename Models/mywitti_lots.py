@@ -1,5 +1,5 @@
 from extensions import db
-from sqlalchemy import Index
+from sqlalchemy import DDL, Index, event
 from datetime import datetime
 
 class MyWittiLot(db.Model):
@@ -11,6 +11,8 @@ class MyWittiLot(db.Model):
         Index('idx_lots_category_jetons', 'category_id', 'jetons'),
         Index('idx_lots_jetons', 'jetons'),
         Index('idx_lots_libelle', 'libelle'),
+        # Recherche approximative (/lot/rewards/search) : GIN pg_trgm sous PostgreSQL
+        Index('idx_lots_libelle_trgm', 'libelle', postgresql_using='gin', postgresql_ops={'libelle': 'gin_trgm_ops'}),
         Index('idx_lots_stock', 'stock'),
     )
     id = db.Column(db.Integer, primary_key=True)
@@ -21,4 +23,11 @@ class MyWittiLot(db.Model):
     stock = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     category_id = db.Column(db.Integer, db.ForeignKey('mywitti_category.id', ondelete='SET NULL'))
-    category = db.relationship('MyWittiCategory', backref='lots') 
\ No newline at end of file
+    category = db.relationship('MyWittiCategory', backref='lots') 
+
+# Opérateurs gin_trgm_ops de idx_lots_libelle_trgm (db.create_all sous PostgreSQL)
+event.listen(
+    MyWittiLot.__table__,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
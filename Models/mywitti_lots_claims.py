@@ -6,6 +6,11 @@ class MyWittiLotsClaims(db.Model):
     __tablename__ = 'mywitti_lots_claims'
     __table_args__ = (
         Index('idx_claims_client_lot', 'client_id', 'lot_id'),
+        # Une ligne de panier par récompense : cible des upserts de Services/cart.py
+        Index(
+            'idx_claims_cart_unique', 'client_id', 'lot_id', unique=True,
+            postgresql_where=db.text("statut = 'cart'"), sqlite_where=db.text("statut = 'cart'")
+        ),
         Index('idx_claims_client_statut', 'client_id', 'statut'),
         Index('idx_claims_date', 'date_reclamation'),
         Index('idx_claims_pending', 'client_id', 'date_reclamation', postgresql_where=db.text("statut = 'en_attente'")),
@@ -16,5 +21,6 @@ class MyWittiLotsClaims(db.Model):
     lot_id = db.Column(db.Integer, db.ForeignKey('mywitti_lots.id', ondelete='CASCADE'), nullable=False)
     date_reclamation = db.Column(db.DateTime, default=datetime.utcnow)
     statut = db.Column(db.String(50), default='en_attente')
+    quantity = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     client = db.relationship('MyWittiClient', backref='claims')
     lot = db.relationship('MyWittiLot', backref='claims') 
\ No newline at end of file
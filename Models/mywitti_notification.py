@@ -1,12 +1,48 @@
 from extensions import db
 from datetime import datetime
+from sqlalchemy import Index, event, inspect, update
+from Models.mywitti_users import MyWittiUser
 
 class MyWittiNotification(db.Model):
     __tablename__ = 'mywitti_notification'
+    __table_args__ = (
+        Index('idx_notification_user_id', 'user_id', 'id'),
+        Index('idx_notification_user_unread', 'user_id', postgresql_where=db.text('is_read = false')),
+    )
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)    
     user_id = db.Column(db.Integer, db.ForeignKey('mywitti_users.id'), nullable=False)
     message = db.Column(db.String, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    is_read = db.Column(db.Boolean, default=False)
+    is_read = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
-    user = db.relationship('MyWittiUser', backref='notifications') 
\ No newline at end of file
+    user = db.relationship('MyWittiUser', backref='notifications')
+
+
+def adjust_unread_notifications(connection, user_id, delta):
+    """Ajoute ``delta`` au compteur de notifications non lues de l'utilisateur (dans la transaction en cours)"""
+    if user_id is None or not delta:
+        return
+    connection.execute(
+        update(MyWittiUser.__table__).where(
+            MyWittiUser.__table__.c.id == user_id
+        ).values(unread_notifications=MyWittiUser.__table__.c.unread_notifications + delta)
+    )
+
+
+@event.listens_for(MyWittiNotification, 'after_insert')
+def count_new_notification(mapper, connection, target):
+    if not target.is_read:
+        adjust_unread_notifications(connection, target.user_id, 1)
+
+
+@event.listens_for(MyWittiNotification, 'after_update')
+def count_read_change(mapper, connection, target):
+    history = inspect(target).attrs.is_read.history
+    if history.deleted and bool(history.deleted[0]) != bool(target.is_read):
+        adjust_unread_notifications(connection, target.user_id, 1 if history.deleted[0] else -1)
+
+
+@event.listens_for(MyWittiNotification, 'after_delete')
+def count_deleted_notification(mapper, connection, target):
+    if not target.is_read:
+        adjust_unread_notifications(connection, target.user_id, -1)
@@ -0,0 +1,24 @@
+from extensions import db
+from sqlalchemy import Index
+from datetime import datetime
+
+class MyWittiOrder(db.Model):
+    """Commande d'un client : validée ou annulée d'un bloc par un administrateur"""
+    __tablename__ = 'mywitti_order'
+    __table_args__ = (
+        Index('idx_orders_client', 'client_id', 'statut'),
+        Index('idx_orders_statut_date', 'statut', 'created_at'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.BigInteger, db.ForeignKey('mywitti_client.id', ondelete='CASCADE'), nullable=False)
+    statut = db.Column(db.String(50), nullable=False, default='pending')  # pending, validated, cancelled
+    amount = db.Column(db.BigInteger, nullable=False, default=0)  # Jetons retenus à la commande, débités à la validation
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)  # Validation ou annulation
+    client = db.relationship('MyWittiClient', backref='orders')
+    lines = db.relationship(
+        'MyWittiOrderLine', backref='order', order_by='MyWittiOrderLine.id', cascade='all, delete-orphan'
+    )
+
+    def __repr__(self):
+        return f"<MyWittiOrder {self.id} {self.statut}>"
@@ -0,0 +1,21 @@
+from extensions import db
+from sqlalchemy import Index
+
+class MyWittiOrderLine(db.Model):
+    """Ligne d'une commande : récompense, quantité et prix unitaire figés à la commande"""
+    __tablename__ = 'mywitti_order_line'
+    __table_args__ = (
+        Index('idx_order_lines_order', 'order_id'),
+        Index('idx_order_lines_lot', 'lot_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('mywitti_order.id', ondelete='CASCADE'), nullable=False)
+    # SET NULL : la commande garde libellé et prix d'une récompense supprimée depuis
+    lot_id = db.Column(db.Integer, db.ForeignKey('mywitti_lots.id', ondelete='SET NULL'))
+    libelle = db.Column(db.String(100), nullable=False)
+    jetons = db.Column(db.Integer, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    lot = db.relationship('MyWittiLot', backref='order_lines')
+
+    def __repr__(self):
+        return f"<MyWittiOrderLine {self.order_id}:{self.lot_id} x{self.quantity}>"
@@ -1,9 +1,18 @@
 # models/mywitti_referral.py
 from extensions import db
+from sqlalchemy import Index
 from datetime import datetime
 
 class MyWittiReferral(db.Model):
     __tablename__ = 'mywitti_referral'
+    __table_args__ = (
+        # Emails stockés normalisés (Services/referrals.py) : un seul parrainage par adresse
+        Index('idx_referral_referred_email', 'referred_email', unique=True),
+        Index('idx_referral_referrer_created', 'referrer_id', 'created_at', 'id'),
+        Index('idx_referral_referrer_status', 'referrer_id', 'status'),
+        Index('idx_referral_status_created', 'status', 'created_at', 'id'),
+        Index('idx_referral_created', 'created_at', 'id'),
+    )
     id = db.Column(db.BigInteger, primary_key=True, autoincrement=True)
     referrer_id = db.Column(db.BigInteger, db.ForeignKey('mywitti_users.id'), nullable=False)
     referred_email = db.Column(db.String(255), nullable=False)
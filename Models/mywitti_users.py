@@ -2,8 +2,9 @@
 
 from extensions import db
 from datetime import datetime
-import bcrypt
-from sqlalchemy import Index, CheckConstraint
+from sqlalchemy import Index, CheckConstraint, event, inspect, update
+from sqlalchemy.orm.attributes import set_committed_value
+from Services.password_hashing import password_hasher
 
 class MyWittiUser(db.Model):
     __tablename__ = 'mywitti_users'
@@ -15,6 +16,7 @@ class MyWittiUser(db.Model):
         Index('idx_users_last_login', 'last_login'),
         Index('idx_users_type_active', 'user_type', 'is_active'),
         Index('idx_users_user_type', 'user_type'),
+        Index('idx_users_token_version', 'id', 'token_version', postgresql_where=db.text('token_version > 0')),
         CheckConstraint("user_type IN ('client', 'admin', 'superadmin')", name='users_user_type_check'),
     )
     id = db.Column(db.Integer, primary_key=True)
@@ -30,16 +32,45 @@ class MyWittiUser(db.Model):
     must_change_password = db.Column(db.Boolean, default=True)
     user_type_id = db.Column(db.Integer, db.ForeignKey('mywitti_user_type.id'))
     email = db.Column(db.String(255))
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Incrémenté pour invalider les jetons émis
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Tenu à jour par Models/mywitti_notification.py
     user_type_rel = db.relationship('MyWittiUserType', backref='users')
 
     def check_password(self, password):
-        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+        """Vérifie le mot de passe dans le pool bcrypt (peut lever PasswordHasherBusy)"""
+        return password_hasher.verify(self.password, password)
+
+    def set_password(self, password):
+        """Hache le mot de passe dans le pool bcrypt (peut lever PasswordHasherBusy)"""
+        self.password = password_hasher.hash(password)
+
+    def rehash_password(self, password):
+        """Remplace un hash obsolète (autre schéma ou autre coût) sans invalider les jetons émis"""
+        new_hash = password_hasher.hash(password)
+        # UPDATE direct : le mot de passe est inchangé, token_version ne doit pas bouger
+        db.session.execute(
+            update(MyWittiUser).where(MyWittiUser.id == self.id).values(password=new_hash),
+            execution_options={'synchronize_session': False}
+        )
+        set_committed_value(self, 'password', new_hash)
 
     @property
     def is_admin(self):
         """Retourne True si l'utilisateur est un admin"""
+        return self.user_type == 'admin'
 
     @property
     def is_superuser(self):
         """Retourne True si l'utilisateur est un super admin"""
         return self.user_type == 'superadmin'
+
+
+# Champs portés (ou garantis) par les claims du jeton : leur modification invalide les jetons émis
+TOKEN_BOUND_FIELDS = ('password', 'user_type', 'is_active')
+
+@event.listens_for(MyWittiUser, 'before_update')
+def bump_token_version(mapper, connection, target):
+    """Incrémente token_version lors d'un changement de mot de passe, de rôle ou d'activation"""
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in TOKEN_BOUND_FIELDS):
+        target.token_version = (target.token_version or 0) + 1
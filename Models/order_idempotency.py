@@ -0,0 +1,14 @@
+from extensions import db
+from datetime import datetime
+
+class OrderIdempotency(db.Model):
+    """Réponse d'une commande passée avec un en-tête Idempotency-Key, rejouée aux nouvelles tentatives"""
+    __tablename__ = 'order_idempotency'
+    client_id = db.Column(db.BigInteger, db.ForeignKey('mywitti_client.id', ondelete='CASCADE'), primary_key=True)
+    idempotency_key = db.Column(db.String(255), primary_key=True)
+    status_code = db.Column(db.Integer, nullable=False)
+    response = db.Column(db.Text, nullable=False)  # Corps JSON de la réponse
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<OrderIdempotency {self.client_id}:{self.idempotency_key}>"
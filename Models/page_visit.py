@@ -2,17 +2,23 @@
 
 # models/page_visit.py
 from extensions import db
+from sqlalchemy import Index
 from datetime import datetime
 
 # Models/page_visit.py
 class PageVisit(db.Model):
     __tablename__ = 'page_visit'  # <- IMPORTANT : ce nom doit correspondre à la requête
+    __table_args__ = (
+        Index('idx_page_visit_not_rolled_up', 'id', postgresql_where=db.text('rolled_up = false')),
+        Index('idx_page_visit_timestamp', 'timestamp'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     path = db.Column(db.String(255), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer)
     user_type = db.Column(db.String(50))  # 'admin' ou 'customer'
+    rolled_up = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # déjà compté dans page_visit_hourly
 
     def __repr__(self):
         return f"<PageVisit path={self.path} timestamp={self.timestamp}>"
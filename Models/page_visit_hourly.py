@@ -0,0 +1,17 @@
+from extensions import db
+from sqlalchemy import Index
+
+class PageVisitHourly(db.Model):
+    __tablename__ = 'page_visit_hourly'
+    __table_args__ = (
+        db.UniqueConstraint('path', 'hour', 'user_type', name='page_visit_hourly_ukey'),
+        Index('idx_page_visit_hourly_hour', 'hour'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(255), nullable=False)
+    hour = db.Column(db.DateTime, nullable=False)  # début de l'heure (UTC)
+    user_type = db.Column(db.String(50), nullable=False, default='anonymous')  # 'admin', 'customer' ou 'anonymous'
+    visit_count = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<PageVisitHourly path={self.path} hour={self.hour} count={self.visit_count}>"
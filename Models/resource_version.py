@@ -0,0 +1,11 @@
+from extensions import db
+
+class ResourceVersion(db.Model):
+    """Compteur de version d'une ressource servie avec un ETag (voir Services/resource_versions.py)"""
+    __tablename__ = 'resource_version'
+    scope = db.Column(db.String(30), primary_key=True)  # 'client', 'favorites', 'cart', 'lots', 'categories' ou 'faq'
+    entity_id = db.Column(db.BigInteger, primary_key=True)  # id du client, 0 pour une ressource globale
+    version = db.Column(db.BigInteger, nullable=False, default=1)
+
+    def __repr__(self):
+        return f"<ResourceVersion {self.scope}:{self.entity_id} v{self.version}>"
@@ -7,6 +7,7 @@ class TokenBlacklist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, unique=True, index=True)  # JTI (JWT ID) du token
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)  # Expiration du token (claim exp), purge ensuite
 
     def __repr__(self):
         return f'<TokenBlacklist {self.jti}>'
\ No newline at end of file
@@ -0,0 +1,262 @@
+# Services/cart.py
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, inspect, select, text
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from Models.mywitti_lots import MyWittiLot
+from Models.mywitti_lots_claims import MyWittiLotsClaims
+from Services.resource_versions import CART, bump_resource_versions
+from utils import dialect_insert
+
+# Statut des lignes de mywitti_lots_claims encore dans le panier
+CART_STATUS = 'cart'
+
+# Modes de PUT /lot/cart : le panier devient la liste reçue, ou seules les lignes reçues changent
+REPLACE = 'replace'
+MERGE = 'merge'
+CART_MODES = (REPLACE, MERGE)
+
+# Champs des lots affichés dans les paniers : seule leur modification vide le cache
+CART_LOT_FIELDS = ('libelle', 'jetons', 'recompense_image')
+
+# Prédicat littéral de idx_claims_cart_unique (inférence de l'index partiel par ON CONFLICT)
+_CART_INDEX_WHERE = text("statut = 'cart'")
+
+
+class CartCache:
+    """Lignes et total du panier conservés en mémoire par client.
+
+    L'entrée d'un client est supprimée au commit d'une modification de son panier (ORM
+    ou fonctions de ce module) ; toutes le sont quand un lot change (prix, libellé).
+    ``ttl`` borne la durée de vie des paniers modifiés par un autre worker.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 300
+        self.max_entries = 10000
+        self._entries = OrderedDict()
+        self._epoch = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('CART_CACHE_TTL', 300)
+        self.max_entries = app.config.get('CART_CACHE_SIZE', 10000)
+        app.extensions['cart'] = self
+
+    def get(self, client_id):
+        """(lignes, jetons requis) du panier du client"""
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(client_id)
+                return entry[0]
+            epoch = self._epoch
+
+        cart = load_cart(client_id)
+        with self._lock:
+            # Une invalidation pendant la lecture rend ce résultat douteux : pas de mise en cache
+            if epoch == self._epoch:
+                self._entries[client_id] = (cart, time.monotonic())
+                self._entries.move_to_end(client_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return cart
+
+    def invalidate(self, client_ids=None):
+        """Supprime les paniers des clients donnés (tous si ``client_ids`` est None)"""
+        with self._lock:
+            self._epoch += 1
+            if client_ids is None:
+                self._entries.clear()
+                return
+            for client_id in client_ids:
+                self._entries.pop(client_id, None)
+
+
+def load_cart(client_id):
+    """Lignes du panier jointes à leur récompense et total (SUM fenêtré) en une seule requête"""
+    line_total = func.coalesce(MyWittiLot.jetons, 0) * MyWittiLotsClaims.quantity
+    rows = db.session.execute(
+        select(
+            MyWittiLotsClaims.id,
+            MyWittiLotsClaims.quantity,
+            MyWittiLot.libelle,
+            MyWittiLot.jetons,
+            MyWittiLot.recompense_image,
+            line_total.label('total_tokens'),
+            func.sum(line_total).over().label('cart_total')
+        ).join(
+            MyWittiLot, MyWittiLot.id == MyWittiLotsClaims.lot_id
+        ).where(
+            MyWittiLotsClaims.client_id == client_id,
+            MyWittiLotsClaims.statut == CART_STATUS
+        ).order_by(MyWittiLotsClaims.id)
+    ).all()
+    lines = tuple({
+        "id": row.id,
+        "title": row.libelle or "Sans titre",
+        "quantity": row.quantity,
+        "tokens_required_per_item": row.jetons or 0,
+        "total_tokens": row.total_tokens,
+        "image_url": row.recompense_image or None,
+        # Identifiant stable de la ligne (réponse identique d'un appel à l'autre)
+        "transaction_id": str(row.id)
+    } for row in rows)
+    return lines, (rows[0].cart_total if rows else 0)
+
+
+def cart_summary(client_id, jetons_disponibles):
+    """Contenu du panier (cart_response_model) : quantités, jetons requis et achat possible"""
+    transactions, total_required = cart_cache.get(client_id)
+    achat_possible = jetons_disponibles >= total_required
+    return {
+        "jetons_disponibles": jetons_disponibles,
+        "jetons_requis": total_required,
+        "achat_possible": achat_possible,
+        "transactions": list(transactions),
+        "notifications": [] if achat_possible else ["Vérifiez vos jetons disponibles avant l'achat."]
+    }
+
+
+def check_stock(quantities):
+    """Récompenses inconnues et en stock insuffisant pour ``quantities`` ({lot_id: quantité})"""
+    stocks = dict(db.session.execute(
+        select(MyWittiLot.id, MyWittiLot.stock).where(MyWittiLot.id.in_(quantities))
+    ).all())
+    missing = sorted(lot_id for lot_id in quantities if lot_id not in stocks)
+    short = sorted(
+        lot_id for lot_id, quantity in quantities.items()
+        if lot_id in stocks and (stocks[lot_id] or 0) < quantity
+    )
+    return missing, short
+
+
+def _cart_upsert(client_id, quantities, increment):
+    connection = db.session.connection()
+    now = datetime.utcnow()
+    stmt = dialect_insert(MyWittiLotsClaims, connection.dialect.name).values([
+        {
+            'client_id': client_id,
+            'lot_id': lot_id,
+            'quantity': quantity,
+            'statut': CART_STATUS,
+            'date_reclamation': now
+        }
+        for lot_id, quantity in sorted(quantities.items())
+    ])
+    quantity = stmt.excluded.quantity
+    if increment:
+        quantity = MyWittiLotsClaims.quantity + stmt.excluded.quantity
+    return stmt.on_conflict_do_update(
+        index_elements=['client_id', 'lot_id'],
+        index_where=_CART_INDEX_WHERE,
+        set_={'quantity': quantity}
+    )
+
+
+def add_to_cart(client_id, lot_id, quantity):
+    """Ajoute ``quantity`` exemplaires au panier (sans commit) ; retourne la quantité de la ligne"""
+    stmt = _cart_upsert(client_id, {lot_id: quantity}, increment=True).returning(MyWittiLotsClaims.quantity)
+    total = db.session.execute(stmt).scalar_one()
+    mark_cart_changed(client_id)
+    return total
+
+
+def update_cart(client_id, quantities, mode=REPLACE):
+    """Met à jour le panier en une instruction ensembliste (sans commit).
+
+    ``quantities`` ({lot_id: quantité}) fixe la quantité de chaque ligne ; une quantité
+    nulle retire la ligne. En mode REPLACE, les lignes absentes de ``quantities`` sont
+    aussi retirées ; en mode MERGE, elles sont conservées.
+    """
+    kept = {lot_id: quantity for lot_id, quantity in quantities.items() if quantity > 0}
+    if kept:
+        db.session.execute(_cart_upsert(client_id, kept, increment=False))
+
+    removal = delete(MyWittiLotsClaims).where(
+        MyWittiLotsClaims.client_id == client_id,
+        MyWittiLotsClaims.statut == CART_STATUS
+    )
+    if mode == REPLACE:
+        db.session.execute(removal.where(MyWittiLotsClaims.lot_id.not_in(kept)))
+    else:
+        removed = [lot_id for lot_id, quantity in quantities.items() if quantity <= 0]
+        if removed:
+            db.session.execute(removal.where(MyWittiLotsClaims.lot_id.in_(removed)))
+    mark_cart_changed(client_id)
+
+
+def remove_cart_line(client_id, line_id):
+    """Retire une ligne du panier (sans commit) ; retourne le libellé de la récompense, None si absente"""
+    libelle = select(MyWittiLot.libelle).where(MyWittiLot.id == MyWittiLotsClaims.lot_id).scalar_subquery()
+    removed = db.session.execute(
+        delete(MyWittiLotsClaims).where(
+            MyWittiLotsClaims.id == line_id,
+            MyWittiLotsClaims.client_id == client_id,
+            MyWittiLotsClaims.statut == CART_STATUS
+        ).returning(libelle.label('libelle'))
+    ).first()
+    if removed is None:
+        return None
+    mark_cart_changed(client_id)
+    return removed.libelle or "Article"
+
+
+def mark_cart_changed(client_id):
+    """Version (ETag) et cache du panier après une écriture hors ORM, que les événements de mapper ne voient pas"""
+    bump_resource_versions(db.session.connection(), [(CART, client_id)])
+    db.session.info.setdefault('cart_clients', set()).add(client_id)
+
+
+@event.listens_for(MyWittiLotsClaims, 'after_insert')
+@event.listens_for(MyWittiLotsClaims, 'after_update')
+@event.listens_for(MyWittiLotsClaims, 'after_delete')
+def _flag_claim_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('cart_clients', set()).add(target.client_id)
+
+
+def _flag_all_carts(target):
+    session = object_session(target)
+    if session is not None:
+        session.info['cart_all'] = True
+
+
+@event.listens_for(MyWittiLot, 'after_update')
+def _flag_lot_change(mapper, connection, target):
+    # Prix, libellé et image affichés dans tous les paniers (pas le stock, décrémenté à chaque validation)
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in CART_LOT_FIELDS):
+        _flag_all_carts(target)
+
+
+@event.listens_for(MyWittiLot, 'after_delete')
+def _flag_lot_delete(mapper, connection, target):
+    # Lignes de panier supprimées en cascade par la base, hors ORM
+    _flag_all_carts(target)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_carts(session):
+    client_ids = session.info.pop('cart_clients', None)
+    if session.info.pop('cart_all', False):
+        cart_cache.invalidate()
+    elif client_ids:
+        cart_cache.invalidate(client_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_cart_changes(session):
+    session.info.pop('cart_clients', None)
+    session.info.pop('cart_all', None)
+
+
+cart_cache = CartCache()
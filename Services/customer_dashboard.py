@@ -0,0 +1,179 @@
+# Services/customer_dashboard.py
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect, select, true
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from Models.mywitti_category import MyWittiCategory
+from Models.mywitti_client import MyWittiClient
+from Models.mywitti_jetons_transactions import MyWittiJetonsTransactions
+from Services.tiers import tier_service
+
+LAST_TRANSACTIONS = 5
+
+# Colonnes du client affichées par le tableau de bord : leur modification invalide le cache
+DASHBOARD_CLIENT_FIELDS = ('jetons', 'short_name', 'category_id')
+
+
+class CustomerDashboardCache:
+    """Tableau de bord client composé en une requête et conservé en mémoire par client.
+
+    L'entrée d'un client est supprimée au commit d'une transaction de jetons le
+    concernant ou d'un changement de ses jetons ; ``ttl`` borne la durée de vie des
+    entrées modifiées par un autre worker ou par un script (UPDATE en masse).
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 300
+        self.max_entries = 10000
+        self._entries = OrderedDict()
+        self._epoch = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('DASHBOARD_CACHE_TTL', 300)
+        self.max_entries = app.config.get('DASHBOARD_CACHE_SIZE', 10000)
+        app.extensions['customer_dashboard'] = self
+
+    def get(self, client_id):
+        """Tableau de bord du client (None si le client n'existe pas)"""
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(client_id)
+                data = entry[0]
+            else:
+                data = None
+            epoch = self._epoch
+
+        if data is None:
+            data = load_dashboard_data(client_id)
+            if data is None:
+                return None
+            with self._lock:
+                # Une invalidation pendant la lecture rend ce résultat douteux : pas de mise en cache
+                if epoch == self._epoch:
+                    self._entries[client_id] = (data, time.monotonic())
+                    self._entries.move_to_end(client_id)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+        # La progression dépend des paliers (cache distinct) : calculée à chaque appel
+        progress = tier_service.resolve(data['jetons'])
+        return dict(
+            data,
+            percentage=round(progress.percentage, 2),
+            tokens_to_next_tier=progress.tokens_to_next_tier
+        )
+
+    def invalidate(self, client_ids=None):
+        """Supprime les entrées des clients donnés (toutes si ``client_ids`` est None)"""
+        with self._lock:
+            self._epoch += 1
+            if client_ids is None:
+                self._entries.clear()
+                return
+            for client_id in client_ids:
+                self._entries.pop(client_id, None)
+
+
+def load_dashboard_data(client_id):
+    """Client, catégorie et dernières transactions en un seul aller-retour SQL"""
+    last_transactions = select(
+        MyWittiJetonsTransactions.date_transaction,
+        MyWittiJetonsTransactions.montant,
+        MyWittiJetonsTransactions.motif
+    ).where(
+        MyWittiJetonsTransactions.client_id == client_id
+    ).order_by(
+        MyWittiJetonsTransactions.date_transaction.desc()
+    ).limit(LAST_TRANSACTIONS).subquery()
+
+    rows = db.session.execute(
+        select(
+            MyWittiClient.jetons,
+            MyWittiClient.short_name,
+            MyWittiCategory.category_name,
+            last_transactions.c.date_transaction,
+            last_transactions.c.montant,
+            last_transactions.c.motif
+        ).outerjoin(
+            MyWittiCategory, MyWittiCategory.id == MyWittiClient.category_id
+        ).outerjoin(
+            last_transactions, true()
+        ).where(
+            MyWittiClient.id == client_id
+        ).order_by(
+            last_transactions.c.date_transaction.desc()
+        )
+    ).all()
+    if not rows:
+        return None
+
+    first = rows[0]
+    return {
+        "category": first.category_name or "Unknown",
+        "jetons": first.jetons or 0,
+        "short_name": first.short_name or "N/A",
+        "last_transactions": [
+            {
+                "date": row.date_transaction.strftime('%Y-%m-%d') if row.date_transaction else "Unknown",
+                "amount": str(row.montant) if row.montant else "0.00",
+                "type": row.motif or "Unknown"
+            }
+            # Client sans transaction : une seule ligne, colonnes de transaction à NULL
+            for row in rows if row.montant is not None
+        ]
+    }
+
+
+def _flag_client(target, client_id):
+    session = object_session(target)
+    if session is not None and client_id is not None:
+        session.info.setdefault('dashboard_clients', set()).add(client_id)
+
+
+@event.listens_for(MyWittiJetonsTransactions, 'after_insert')
+@event.listens_for(MyWittiJetonsTransactions, 'after_update')
+@event.listens_for(MyWittiJetonsTransactions, 'after_delete')
+def _flag_transaction_change(mapper, connection, target):
+    _flag_client(target, target.client_id)
+
+
+@event.listens_for(MyWittiClient, 'after_update')
+def _flag_client_change(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in DASHBOARD_CLIENT_FIELDS):
+        _flag_client(target, target.id)
+
+
+@event.listens_for(MyWittiCategory, 'after_update')
+@event.listens_for(MyWittiCategory, 'after_delete')
+def _flag_category_change(mapper, connection, target):
+    # Nom de catégorie affiché par tous les tableaux de bord
+    session = object_session(target)
+    if session is not None:
+        session.info['dashboard_all'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_dashboards(session):
+    client_ids = session.info.pop('dashboard_clients', None)
+    if session.info.pop('dashboard_all', False):
+        customer_dashboard.invalidate()
+    elif client_ids:
+        customer_dashboard.invalidate(client_ids)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dashboard_changes(session):
+    session.info.pop('dashboard_clients', None)
+    session.info.pop('dashboard_all', None)
+
+
+customer_dashboard = CustomerDashboardCache()
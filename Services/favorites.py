@@ -0,0 +1,79 @@
+# Services/favorites.py
+from datetime import datetime
+
+from sqlalchemy import delete, literal, select
+
+from extensions import db
+from Models.mywitti_category import MyWittiCategory
+from Models.mywitti_lots import MyWittiLot
+from Models.mywitti_lots_favoris import MyWittiLotsFavoris
+from Services.resource_versions import FAVORITES, bump_resource_versions
+from utils import dialect_insert
+
+ADDED = 'added'
+REMOVED = 'removed'
+
+
+def favorite_rewards(client_id):
+    """Récompenses favorites du client et nom de leur catégorie en une seule requête"""
+    rows = db.session.execute(
+        select(
+            MyWittiLot.id,
+            MyWittiLot.libelle,
+            MyWittiLot.jetons,
+            MyWittiLot.recompense_image,
+            MyWittiCategory.category_name
+        ).join(
+            MyWittiLotsFavoris, MyWittiLotsFavoris.lot_id == MyWittiLot.id
+        ).outerjoin(
+            MyWittiCategory, MyWittiCategory.id == MyWittiLot.category_id
+        ).where(
+            MyWittiLotsFavoris.client_id == client_id
+        ).order_by(MyWittiLotsFavoris.date_ajout.desc(), MyWittiLotsFavoris.id.desc())
+    ).all()
+    return [{
+        "id": row.id,
+        "title": row.libelle or "Sans titre",
+        "tokens_required": row.jetons or 0,
+        "category": row.category_name or "Sans catégorie",
+        "image_url": row.recompense_image or None
+    } for row in rows]
+
+
+def favorite_ids(client_id):
+    """Ids des récompenses favorites du client (lecture seule de unique_client_lot_favoris)"""
+    return set(db.session.scalars(
+        select(MyWittiLotsFavoris.lot_id).where(MyWittiLotsFavoris.client_id == client_id)
+    ))
+
+
+def toggle_favorite(client_id, lot_id):
+    """Ajoute ou retire la récompense des favoris du client (sans commit).
+
+    DELETE ... RETURNING retire le favori s'il existe ; sinon INSERT ... SELECT ... ON
+    CONFLICT DO NOTHING l'ajoute si la récompense existe, sans erreur si une requête
+    concurrente l'a déjà ajouté. Retourne ADDED, REMOVED ou None (récompense introuvable).
+    """
+    connection = db.session.connection()
+    removed = db.session.execute(
+        delete(MyWittiLotsFavoris).where(
+            MyWittiLotsFavoris.client_id == client_id,
+            MyWittiLotsFavoris.lot_id == lot_id
+        ).returning(MyWittiLotsFavoris.id)
+    ).first()
+    if removed is not None:
+        bump_resource_versions(connection, [(FAVORITES, client_id)])
+        return REMOVED
+
+    stmt = dialect_insert(MyWittiLotsFavoris, connection.dialect.name).from_select(
+        ['client_id', 'lot_id', 'date_ajout'],
+        select(literal(client_id), MyWittiLot.id, literal(datetime.utcnow())).where(MyWittiLot.id == lot_id)
+    ).on_conflict_do_nothing(index_elements=['client_id', 'lot_id']).returning(MyWittiLotsFavoris.id)
+    if db.session.execute(stmt).first() is not None:
+        bump_resource_versions(connection, [(FAVORITES, client_id)])
+        return ADDED
+
+    # Aucune ligne insérée : récompense inexistante, ou favori ajouté entre-temps
+    if db.session.get(MyWittiLot, lot_id) is None:
+        return None
+    return ADDED
@@ -0,0 +1,151 @@
+# Services/identity.py
+from flask import current_app, g, request
+from flask_jwt_extended import decode_token, get_current_user
+from sqlalchemy import case, or_
+from sqlalchemy.orm import joinedload
+
+from extensions import db, jwt
+from Models.mywitti_users import MyWittiUser
+from Models.mywitti_client import MyWittiClient
+
+
+# Version du format des claims ajoutés au jeton d'accès ; les jetons d'une autre
+# version (ou sans claims) retombent sur la recherche en base
+CLAIMS_VERSION = 1
+
+
+def identity_claims(user, client=None):
+    """Claims additionnels émis à la connexion : PK utilisateur et client, rôle, version du jeton"""
+    return {
+        'ver': CLAIMS_VERSION,
+        'uid': user.id,
+        'cid': client.id if client else None,
+        'role': user.user_type,
+        'tv': user.token_version or 0,
+    }
+
+
+class Identity:
+    """Identité de la requête : utilisateur, client associé et rôle, résolus une seule fois.
+
+    Avec des claims à jour, rôle et clés primaires viennent du jeton : ``user`` et
+    ``client`` ne sont chargés (par clé primaire) qu'au premier accès.
+    """
+
+    __slots__ = ('identifiant', 'claims', '_user', '_client', '_loaded')
+
+    def __init__(self, identifiant, user=None, client=None, claims=None):
+        self.identifiant = identifiant
+        self.claims = claims
+        self._user = user
+        self._client = client
+        self._loaded = claims is None
+
+    @property
+    def user(self):
+        if not self._loaded:
+            self._load()
+        return self._user
+
+    @property
+    def client(self):
+        if not self._loaded:
+            self._load()
+        return self._client
+
+    def _load(self):
+        self._user = db.session.get(MyWittiUser, self.claims['uid'])
+        if self.claims.get('cid') is not None:
+            self._client = db.session.get(MyWittiClient, self.claims['cid'])
+        self._loaded = True
+
+    @property
+    def role(self):
+        """'client', 'admin' ou 'superadmin' (None si l'utilisateur est inconnu)"""
+        if self.claims is not None:
+            return self.claims['role']
+        return self._user.user_type if self._user else None
+
+    @property
+    def user_id(self):
+        if self.claims is not None:
+            return self.claims['uid']
+        return self._user.id if self._user else None
+
+    @property
+    def client_id(self):
+        if self.claims is not None:
+            return self.claims.get('cid')
+        return self._client.id if self._client else None
+
+    @property
+    def is_admin(self):
+        return self.role in ('admin', 'superadmin')
+
+    @property
+    def is_superuser(self):
+        return self.role == 'superadmin'
+
+    def __repr__(self):
+        return f"<Identity {self.identifiant} role={self.role}>"
+
+
+def find_user_and_client(*criteria):
+    """Utilisateur correspondant à ``criteria`` et son client éventuel, en une seule requête.
+
+    Le client lié par user_id l'emporte sur celui retrouvé par customer_code, puis le plus
+    ancien : le même utilisateur résout toujours le même client.
+    """
+    row = db.session.query(MyWittiUser, MyWittiClient).outerjoin(
+        MyWittiClient,
+        or_(MyWittiClient.user_id == MyWittiUser.id, MyWittiClient.customer_code == MyWittiUser.user_id)
+    ).options(
+        joinedload(MyWittiUser.user_type_rel)
+    ).filter(*criteria).order_by(
+        MyWittiUser.id,
+        case((MyWittiClient.user_id == MyWittiUser.id, 0), else_=1),
+        MyWittiClient.id
+    ).first()
+    return row if row else (None, None)
+
+
+@jwt.user_lookup_loader
+def load_identity(jwt_header, jwt_data):
+    """Construit l'identité de la requête.
+
+    Appelé par flask_jwt_extended lors de la vérification du jeton (@jwt_required) ;
+    le résultat est conservé dans ``g.identity`` pour le reste de la requête. Les
+    jetons portant des claims à jour ne déclenchent aucune requête ici.
+    """
+    identifiant = jwt_data[current_app.config.get('JWT_IDENTITY_CLAIM', 'sub')]
+    if jwt_data.get('ver') == CLAIMS_VERSION:
+        g.identity = Identity(identifiant, claims=jwt_data)
+    else:
+        user, client = find_user_and_client(MyWittiUser.user_id == identifiant)
+        g.identity = Identity(identifiant, user, client)
+    return g.identity
+
+
+def current_identity():
+    """Identité de la requête courante (nécessite @jwt_required)"""
+    return get_current_user()
+
+
+def identity_from_token():
+    """Identité lue dans les claims du jeton Bearer présent, sans requête en base.
+
+    Pour les routes sans @jwt_required (suivi des visites) : la signature et l'expiration
+    sont vérifiées, pas la révocation. None sans jeton d'accès valide portant des claims
+    à jour (les jetons plus anciens ne sont pas attribués).
+    """
+    header_type = current_app.config.get('JWT_HEADER_TYPE', 'Bearer')
+    header = request.headers.get(current_app.config.get('JWT_HEADER_NAME', 'Authorization'), '')
+    if not header.startswith(f"{header_type} "):
+        return None
+    try:
+        claims = decode_token(header[len(header_type) + 1:])
+    except Exception:
+        return None
+    if claims.get('type') != 'access' or claims.get('ver') != CLAIMS_VERSION:
+        return None
+    return Identity(claims[current_app.config.get('JWT_IDENTITY_CLAIM', 'sub')], claims=claims)
@@ -0,0 +1,159 @@
+# Services/jetons_history.py
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select
+
+from extensions import db
+from Models.mywitti_client_jetons_daily import MyWittiClientJetonsDaily
+
+# Période par défaut des courbes (jours) ; None : tout l'historique
+HISTORY_PERIODS = {
+    'month': 30,
+    'quarter': 90,
+    'year': 365,
+    'all': None
+}
+
+
+def resolve_history_range(args, today=None):
+    """Bornes (dates) demandées par start_date/end_date ou period ; ValueError si invalides.
+
+    Le début vaut None pour period=all (tout l'historique du client).
+    """
+    today = today or datetime.utcnow().date()
+    start_date_str = args.get('start_date')
+    end_date_str = args.get('end_date')
+    if start_date_str and end_date_str:
+        try:
+            start = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+            end = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValueError("Invalid date format. Use YYYY-MM-DD.")
+        if start > end:
+            raise ValueError("start_date cannot be after end_date")
+        return start, end
+
+    period = args.get('period', 'year')
+    if period not in HISTORY_PERIODS:
+        raise ValueError(f"Invalid period. Use {', '.join(HISTORY_PERIODS)}.")
+    days = HISTORY_PERIODS[period]
+    return (today - timedelta(days=days) if days else None), today
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets : ``threshold`` points conservant l'allure de la courbe.
+
+    ``points`` est une liste de (x, y) triée par x ; le premier et le dernier point sont
+    toujours conservés. Chaque seau retient le point formant le plus grand triangle avec
+    le point retenu précédent et la moyenne du seau suivant (pics et creux préservés).
+    """
+    length = len(points)
+    if threshold >= length or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (length - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Moyenne du seau suivant (dernier point pour le dernier seau)
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, length)
+        next_count = next_end - next_start
+        avg_x = sum(x for x, _ in points[next_start:next_end]) / next_count
+        avg_y = sum(y for _, y in points[next_start:next_end]) / next_count
+
+        prev_x, prev_y = points[previous]
+        best_area = -1
+        best = start
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((prev_x - avg_x) * (y - prev_y) - (prev_x - x) * (avg_y - prev_y))
+            if area > best_area:
+                best_area = area
+                best = index
+        sampled.append(points[best])
+        previous = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+def load_jetons_series(client_id, start, end):
+    """Soldes quotidiens (date, solde) du client sur la période, lus sur idx_daily_client_date_solde"""
+    query = select(MyWittiClientJetonsDaily.date_jour, MyWittiClientJetonsDaily.solde_jetons).where(
+        MyWittiClientJetonsDaily.client_id == client_id,
+        MyWittiClientJetonsDaily.date_jour <= end
+    )
+    if start is not None:
+        query = query.where(MyWittiClientJetonsDaily.date_jour >= start)
+    return db.session.execute(query.order_by(MyWittiClientJetonsDaily.date_jour)).all()
+
+
+class JetonsHistoryCache:
+    """Courbes de solde déjà réduites, conservées en mémoire par (client, période, résolution).
+
+    mywitti_client_jetons_daily est alimentée par le calcul quotidien des jetons, hors de
+    l'application : les entrées expirent après ``ttl`` secondes.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 900
+        self.max_entries = 2000
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('JETONS_HISTORY_CACHE_TTL', 900)
+        self.max_entries = app.config.get('JETONS_HISTORY_CACHE_SIZE', 2000)
+        app.extensions['jetons_history'] = self
+
+    def get(self, client_id, start, end, max_points):
+        """Série [{'date', 'jetons'}] réduite à ``max_points`` points au plus, et nombre de jours lus"""
+        key = (client_id, start, end, max_points)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                return entry[0]
+
+        rows = load_jetons_series(client_id, start, end)
+        # Abscisse : numéro du jour, pour des seaux proportionnels au temps écoulé
+        sampled = lttb([(row.date_jour.toordinal(), row.solde_jetons) for row in rows], max_points)
+        result = (
+            [{'date': date.fromordinal(x).isoformat(), 'jetons': y} for x, y in sampled],
+            len(rows)
+        )
+        with self._lock:
+            self._entries[key] = (result, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+
+jetons_history = JetonsHistoryCache()
+
+
+def jetons_history_response(client_id, args):
+    """Courbe du solde du client pour les paramètres de la requête (period ou start_date/end_date, points)"""
+    start, end = resolve_history_range(args)
+    points = args.get('points', current_app.config.get('JETONS_HISTORY_POINTS', 300), type=int)
+    # Au moins 3 points : premier, dernier et un seau intermédiaire
+    points = max(3, min(points, current_app.config.get('JETONS_HISTORY_MAX_POINTS', 1000)))
+    series, days = jetons_history.get(client_id, start, end, points)
+    return {
+        'period_start': start.isoformat() if start else None,
+        'period_end': end.isoformat(),
+        'days': days,
+        'downsampled': len(series) < days,
+        'series': series
+    }
@@ -0,0 +1,116 @@
+# Services/jetons_holds.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from extensions import db
+from Models.mywitti_client import MyWittiClient
+from Models.mywitti_jetons_holds import MyWittiJetonsHold
+from Services.resource_versions import CLIENT, bump_resource_versions
+
+# Statuts d'une réservation : active, convertie en débit, libérée (annulation), échue
+HELD = 'held'
+DEBITED = 'debited'
+RELEASED = 'released'
+EXPIRED = 'expired'
+
+_clients = MyWittiClient.__table__
+
+
+def available_jetons(client):
+    """Jetons utilisables pour une nouvelle commande : solde moins les réservations actives"""
+    return (client.jetons or 0) - (client.jetons_reserves or 0)
+
+
+def hold_jetons(client_id, order_id, amount, ttl):
+    """Réserve ``amount`` jetons pour la commande ``order_id`` (sans commit).
+
+    jetons_reserves n'augmente que si le solde disponible couvre le montant (UPDATE
+    conditionnel, sûr sans verrou de ligne) ; retourne False sinon, sans rien écrire.
+    """
+    reserved = db.session.execute(
+        update(_clients).where(
+            _clients.c.id == client_id,
+            func.coalesce(_clients.c.jetons, 0) - _clients.c.jetons_reserves >= amount
+        ).values(jetons_reserves=_clients.c.jetons_reserves + amount)
+    )
+    if reserved.rowcount != 1:
+        return False
+
+    now = datetime.utcnow()
+    db.session.execute(insert(MyWittiJetonsHold).values(
+        client_id=client_id,
+        order_id=order_id,
+        amount=amount,
+        statut=HELD,
+        created_at=now,
+        expires_at=now + timedelta(seconds=ttl)
+    ))
+    bump_resource_versions(db.session.connection(), [(CLIENT, client_id)])
+    return True
+
+
+def held_amount(order_id):
+    """Jetons réservés par la commande, None sans réservation active"""
+    return db.session.scalar(
+        select(func.sum(MyWittiJetonsHold.amount)).where(
+            MyWittiJetonsHold.order_id == order_id,
+            MyWittiJetonsHold.statut == HELD
+        )
+    )
+
+
+def settle_holds(order_ids, statut):
+    """Clôt les réservations actives des commandes ``order_ids`` et libère leurs jetons (sans commit).
+
+    ``statut`` vaut DEBITED (commande validée, le débit du solde reste à l'appelant) ou
+    RELEASED (commande annulée). Retourne {order_id: jetons} des réservations closes.
+    """
+    if not order_ids:
+        return {}
+    settled = {}
+    for row in _close_holds(statut, MyWittiJetonsHold.order_id.in_(order_ids)):
+        settled[row.order_id] = settled.get(row.order_id, 0) + row.amount
+    return settled
+
+
+def expire_holds(client_id=None, now=None):
+    """Clôt en masse les réservations échues (d'un client ou de tous) et libère leurs jetons (sans commit).
+
+    Retourne les réservations expirées (client_id, order_id, amount) ; order_id est
+    None si la commande a été supprimée depuis.
+    """
+    condition = MyWittiJetonsHold.expires_at <= (now or datetime.utcnow())
+    if client_id is not None:
+        condition = condition & (MyWittiJetonsHold.client_id == client_id)
+    return _close_holds(EXPIRED, condition)
+
+
+def _close_holds(statut, condition):
+    rows = db.session.execute(
+        update(MyWittiJetonsHold).where(
+            MyWittiJetonsHold.statut == HELD,
+            condition
+        ).values(
+            statut=statut,
+            settled_at=datetime.utcnow()
+        ).returning(
+            MyWittiJetonsHold.client_id,
+            MyWittiJetonsHold.order_id,
+            MyWittiJetonsHold.amount
+        ).execution_options(synchronize_session=False)
+    ).all()
+
+    released = {}
+    for row in rows:
+        released[row.client_id] = released.get(row.client_id, 0) + row.amount
+    if released:
+        # Une instruction exécutée pour tous les clients concernés (executemany)
+        db.session.execute(
+            update(_clients).where(
+                _clients.c.id == bindparam('b_client_id')
+            ).values(jetons_reserves=_clients.c.jetons_reserves - bindparam('b_amount')),
+            [{'b_client_id': client_id, 'b_amount': amount} for client_id, amount in sorted(released.items())]
+        )
+        bump_resource_versions(db.session.connection(), [(CLIENT, client_id) for client_id in released])
+    return rows
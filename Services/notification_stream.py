@@ -0,0 +1,227 @@
+# Services/notification_stream.py
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+from flask import Response, stream_with_context
+from sqlalchemy import event, select as sql_select, text
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from Models.mywitti_notification import MyWittiNotification
+from Services.notifications import format_notification
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'notification_created'
+# Limite de charge utile de pg_notify (8000 octets) : au-delà, seul l'id est publié
+MAX_NOTIFY_PAYLOAD = 7500
+
+
+class NotificationStream:
+    """Diffusion des nouvelles notifications aux clients connectés en Server-Sent Events.
+
+    Chaque flux ouvert s'abonne à une file en mémoire du worker. Sous PostgreSQL, les
+    insertions sont publiées par NOTIFY (émis au commit) et un thread LISTEN par worker
+    les distribue à ses abonnés ; sinon la diffusion reste locale au processus. Un client
+    qui se reconnecte avec Last-Event-ID reçoit d'abord les notifications manquées.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.heartbeat = 15
+        self.queue_size = 100
+        self.retry_ms = 5000
+        self.replay_limit = 200
+        self.listen = True
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listener_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.heartbeat = app.config.get('NOTIFICATION_STREAM_HEARTBEAT', 15)
+        self.queue_size = app.config.get('NOTIFICATION_STREAM_QUEUE_SIZE', 100)
+        self.retry_ms = app.config.get('NOTIFICATION_STREAM_RETRY_MS', 5000)
+        self.replay_limit = app.config.get('NOTIFICATIONS_MAX_PAGE_SIZE', 200)
+        self.listen = app.config.get('NOTIFICATION_STREAM_LISTEN', True)
+        app.extensions['notification_stream'] = self
+
+    def uses_listen(self, dialect_name):
+        """True si la diffusion passe par LISTEN/NOTIFY pour ce dialecte"""
+        return self.listen and dialect_name == 'postgresql'
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        subscription = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscribers[user_id]
+
+    def publish(self, notification):
+        """Remet une notification (dict de format_notification + user_id) aux flux ouverts du destinataire"""
+        with self._lock:
+            subscriptions = tuple(self._subscribers.get(notification['user_id'], ()))
+        for subscription in subscriptions:
+            try:
+                subscription.put_nowait(notification)
+            except queue.Full:
+                # Client trop lent : fermeture du flux, il reprendra via Last-Event-ID
+                with subscription.mutex:
+                    subscription.queue.clear()
+                subscription.put_nowait(None)
+
+    def events(self, user_id, last_event_id=None):
+        """Générateur du flux SSE de l'utilisateur (à servir avec stream_with_context)"""
+        subscription = self.subscribe(user_id)
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+            last_sent = last_event_id or 0
+            if last_event_id is not None:
+                for notification in self._missed(user_id, last_event_id):
+                    last_sent = notification['id']
+                    yield _format_event(notification)
+            # Aucune connexion à la base n'est gardée pendant l'attente
+            db.session.remove()
+
+            while True:
+                try:
+                    notification = subscription.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if notification is None:
+                    return
+                if notification['id'] <= last_sent:
+                    continue
+                last_sent = notification['id']
+                yield _format_event(notification)
+        finally:
+            self.unsubscribe(user_id, subscription)
+
+    def _missed(self, user_id, last_event_id):
+        rows = db.session.execute(
+            sql_select(
+                MyWittiNotification.id,
+                MyWittiNotification.message,
+                MyWittiNotification.created_at,
+                MyWittiNotification.is_read
+            ).where(
+                MyWittiNotification.user_id == user_id,
+                MyWittiNotification.id > last_event_id
+            ).order_by(MyWittiNotification.id).limit(self.replay_limit)
+        ).all()
+        return [format_notification(row) for row in rows]
+
+    def _on_notify(self, payload):
+        notification = json.loads(payload)
+        if 'message' not in notification:
+            # Message trop long pour NOTIFY : relu en base
+            with self.app.app_context():
+                row = db.session.get(MyWittiNotification, notification['id'])
+                if row is None:
+                    return
+                notification = dict(format_notification(row), user_id=row.user_id)
+        self.publish(notification)
+
+    def _ensure_listener(self):
+        # Thread LISTEN propre à chaque worker (démarré après le fork de gunicorn)
+        if not self.listen or self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            if db.engine.dialect.name != 'postgresql':
+                return
+            self._listener = threading.Thread(target=self._listen, name='notification-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    connection = db.engine.raw_connection()
+                try:
+                    pg = connection.driver_connection
+                    pg.set_session(autocommit=True)
+                    pg.cursor().execute(f"LISTEN {CHANNEL}")
+                    while True:
+                        if select.select([pg], [], [], 60) == ([], [], []):
+                            continue
+                        pg.poll()
+                        while pg.notifies:
+                            self._on_notify(pg.notifies.pop(0).payload)
+                finally:
+                    connection.invalidate()
+            except Exception as e:
+                # Les notifications perdues seront rejouées à la reconnexion des clients (Last-Event-ID)
+                logger.error(f"Notification listener error: {e}")
+                time.sleep(5)
+
+
+def last_event_id(request):
+    """Dernier id reçu par le client (en-tête Last-Event-ID ou paramètre last_event_id) ; ValueError si invalide"""
+    value = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    return int(value) if value else None
+
+
+def event_stream_response(user_id, last_id=None):
+    """Réponse text/event-stream du flux de notifications de l'utilisateur"""
+    response = Response(
+        stream_with_context(notification_stream.events(user_id, last_id)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    # Pas de mise en tampon par un reverse proxy (Nginx)
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _format_event(notification):
+    data = {key: value for key, value in notification.items() if key != 'user_id'}
+    return f"id: {notification['id']}\nevent: notification\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+notification_stream = NotificationStream()
+
+
+@event.listens_for(MyWittiNotification, 'after_insert')
+def publish_notification(mapper, connection, target):
+    """Publie la notification créée : NOTIFY (délivré au commit) ou diffusion locale au commit"""
+    notification = dict(format_notification(target), user_id=target.user_id)
+    if notification_stream.uses_listen(connection.dialect.name):
+        payload = json.dumps(notification, ensure_ascii=False)
+        if len(payload.encode('utf-8')) > MAX_NOTIFY_PAYLOAD:
+            payload = json.dumps({'id': target.id, 'user_id': target.user_id})
+        connection.execute(text("SELECT pg_notify(:channel, :payload)"), {'channel': CHANNEL, 'payload': payload})
+        return
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('created_notifications', []).append(notification)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_created_notifications(session):
+    for notification in session.info.pop('created_notifications', ()):
+        notification_stream.publish(notification)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_created_notifications(session):
+    session.info.pop('created_notifications', None)
@@ -0,0 +1,62 @@
+# Services/notifications.py
+from sqlalchemy import select, update
+
+from extensions import db
+from Models.mywitti_notification import MyWittiNotification, adjust_unread_notifications
+from Models.mywitti_users import MyWittiUser
+from Services.pagination import decode_cursor, encode_cursor
+
+
+def format_notification(row):
+    return {
+        'id': row.id,
+        'message': row.message,
+        'created_at': row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else "Unknown",
+        'is_read': row.is_read
+    }
+
+
+def notification_page(user_id, limit, cursor=None):
+    """Page de notifications (plus récentes d'abord) et curseur de la page suivante (ou None).
+
+    L'ordre des id est l'ordre de création : la page est lue sur idx_notification_user_id
+    (user_id, id) sans tri, même pour les lignes sans created_at.
+    """
+    stmt = select(
+        MyWittiNotification.id,
+        MyWittiNotification.message,
+        MyWittiNotification.created_at,
+        MyWittiNotification.is_read
+    ).where(
+        MyWittiNotification.user_id == user_id
+    )
+    if cursor:
+        stmt = stmt.where(MyWittiNotification.id < decode_cursor(cursor, int)[0])
+    rows = db.session.execute(stmt.order_by(MyWittiNotification.id.desc()).limit(limit + 1)).all()
+    next_cursor = encode_cursor(rows[limit - 1].id) if len(rows) > limit else None
+    return [format_notification(row) for row in rows[:limit]], next_cursor
+
+
+def unread_count(user_id):
+    """Compteur de notifications non lues (une lecture par clé primaire)"""
+    return db.session.execute(
+        select(MyWittiUser.unread_notifications).where(MyWittiUser.id == user_id)
+    ).scalar() or 0
+
+
+def mark_all_read(user_id):
+    """Marque toutes les notifications non lues comme lues en un seul UPDATE (sans commit).
+
+    Retourne le nombre de notifications marquées. Le compteur est décrémenté de ce
+    nombre (et non remis à zéro) pour ne pas effacer une notification créée entre-temps.
+    """
+    result = db.session.execute(
+        update(MyWittiNotification).where(
+            MyWittiNotification.user_id == user_id,
+            # Même prédicat que l'index partiel idx_notification_user_unread
+            MyWittiNotification.is_read == False
+        ).values(is_read=True).execution_options(synchronize_session=False)
+    )
+    # UPDATE en masse : les événements de Models/mywitti_notification.py ne sont pas déclenchés
+    adjust_unread_notifications(db.session.connection(), user_id, -result.rowcount)
+    return result.rowcount
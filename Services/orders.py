@@ -0,0 +1,334 @@
+# Services/orders.py
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+
+from extensions import db
+from Models.mywitti_client import MyWittiClient
+from Models.mywitti_comptes import MyWittiCompte
+from Models.mywitti_lots import MyWittiLot
+from Models.mywitti_lots_claims import MyWittiLotsClaims
+from Models.mywitti_notification import MyWittiNotification
+from Models.mywitti_order import MyWittiOrder
+from Models.mywitti_order_line import MyWittiOrderLine
+from Models.order_idempotency import OrderIdempotency
+from Services.cart import CART_STATUS, mark_cart_changed
+from Services.jetons_holds import DEBITED, RELEASED, available_jetons, expire_holds, held_amount, hold_jetons, settle_holds
+
+# Statuts d'une commande : en attente de validation par un administrateur, validée, annulée
+PENDING_STATUS = 'pending'
+VALIDATED_STATUS = 'validated'
+CANCELLED_STATUS = 'cancelled'
+
+
+class OrderError(Exception):
+    """Commande refusée (panier vide, jetons insuffisants) : message et code HTTP"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def stored_order_response(client_id, idempotency_key, key_ttl=86400):
+    """(corps, code) de la commande passée avec cette clé depuis moins de ``key_ttl`` secondes, ou None.
+
+    Une clé échue est ignorée même tant qu'elle n'a pas été purgée.
+    """
+    stored = db.session.get(OrderIdempotency, (client_id, idempotency_key))
+    if stored is None or stored.created_at < datetime.utcnow() - timedelta(seconds=key_ttl):
+        return None
+    return json.loads(stored.response), stored.status_code
+
+
+def place_order(user_id, client_id, idempotency_key=None, key_ttl=86400, hold_ttl=604800):
+    """Passe la commande du panier en une transaction (commit inclus).
+
+    La ligne du client est verrouillée (SELECT ... FOR UPDATE) : deux commandes du même
+    client s'exécutent l'une après l'autre et la seconde trouve le panier vide ou la
+    réponse de la première sous la même clé. Les lignes du panier deviennent une
+    commande en attente dont les jetons sont réservés pour ``hold_ttl`` secondes ; la
+    notification et la réponse à rejouer sont écrites dans le même commit. Retourne
+    (corps, code, rejouée) ; lève OrderError si la commande est refusée.
+    """
+    try:
+        customer = db.session.execute(
+            select(MyWittiClient).where(MyWittiClient.id == client_id)
+            .with_for_update().execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if customer is None:
+            raise OrderError("Client non trouvé", 404)
+
+        if idempotency_key:
+            # Clés expirées du client purgées ici (la clé primaire commence par client_id)
+            db.session.execute(delete(OrderIdempotency).where(
+                OrderIdempotency.client_id == client_id,
+                OrderIdempotency.created_at < datetime.utcnow() - timedelta(seconds=key_ttl)
+            ))
+            # Relu sous le verrou : une tentative concurrente a pu finir entre-temps
+            stored = stored_order_response(client_id, idempotency_key, key_ttl)
+            if stored is not None:
+                db.session.commit()
+                return stored + (True,)
+
+        # Réservations échues du client libérées avant de calculer son solde disponible
+        expire_orders(client_id)
+
+        lines = db.session.execute(
+            select(
+                MyWittiLotsClaims.id,
+                MyWittiLotsClaims.quantity,
+                MyWittiLot.id.label('lot_id'),
+                MyWittiLot.libelle,
+                MyWittiLot.jetons,
+                MyWittiLot.recompense_image
+            ).join(
+                MyWittiLot, MyWittiLot.id == MyWittiLotsClaims.lot_id
+            ).where(
+                MyWittiLotsClaims.client_id == client_id,
+                MyWittiLotsClaims.statut == CART_STATUS
+            ).order_by(MyWittiLotsClaims.id)
+        ).all()
+        if not lines:
+            raise OrderError("Panier vide")
+
+        items = [{
+            "reward_id": line.lot_id,
+            "title": line.libelle or "Sans titre",
+            "quantity": line.quantity,
+            "tokens_required_per_item": line.jetons or 0,
+            "total_tokens": (line.jetons or 0) * line.quantity,
+            "image_url": line.recompense_image or ""
+        } for line in lines]
+        total_amount = sum(item["total_tokens"] for item in items)
+
+        now = datetime.utcnow()
+        result = db.session.execute(
+            delete(MyWittiLotsClaims).where(
+                MyWittiLotsClaims.id.in_([line.id for line in lines]),
+                MyWittiLotsClaims.statut == CART_STATUS
+            ).execution_options(synchronize_session=False)
+        )
+        # Sans verrou de ligne (SQLite), une commande concurrente a pu prendre une partie du panier
+        if result.rowcount != len(lines):
+            raise OrderError("Le panier a changé pendant la commande, veuillez réessayer", 409)
+        mark_cart_changed(client_id)
+
+        # Lignes du panier recopiées dans la commande, libellé et prix figés
+        order = MyWittiOrder(
+            client_id=client_id,
+            statut=PENDING_STATUS,
+            amount=total_amount,
+            created_at=now,
+            lines=[
+                MyWittiOrderLine(
+                    lot_id=line.lot_id,
+                    libelle=item["title"],
+                    jetons=item["tokens_required_per_item"],
+                    quantity=line.quantity
+                )
+                for line, item in zip(lines, items)
+            ]
+        )
+        db.session.add(order)
+        db.session.flush()
+
+        # Jetons réservés jusqu'à la validation admin (débit) ou l'annulation (libération),
+        # si le solde moins les commandes déjà en attente les couvre
+        if not hold_jetons(client_id, order.id, total_amount, hold_ttl):
+            raise OrderError("Jetons insuffisants pour cette commande")
+
+        db.session.add(MyWittiNotification(
+            user_id=user_id,
+            message=f"Votre commande {order.id} de {total_amount} jetons a été enregistrée et est en attente de validation par l'administrateur."
+        ))
+
+        response = {
+            "id": str(order.id),
+            "customer": f"{customer.first_name} {customer.short_name}" if customer.first_name and customer.short_name else "N/A",
+            "contact": "N/A",
+            "date": now.strftime('%Y-%m-%d'),
+            "heure": now.strftime('%H:%M:%S'),
+            "amount": total_amount,
+            "items": items
+        }
+        if idempotency_key:
+            db.session.add(OrderIdempotency(
+                client_id=client_id,
+                idempotency_key=idempotency_key,
+                status_code=200,
+                response=json.dumps(response, ensure_ascii=False),
+                created_at=now
+            ))
+        db.session.commit()
+        return response, 200, False
+    except Exception:
+        # Refus ou erreur : rien n'est écrit et le verrou est libéré
+        db.session.rollback()
+        raise
+
+
+def _locked_order(order_id):
+    order = db.session.execute(
+        select(MyWittiOrder).where(MyWittiOrder.id == order_id)
+        .with_for_update().execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+    if order is None:
+        raise OrderError("Commande non trouvée", 404)
+    return order
+
+
+def _describe(lines):
+    return ", ".join(f"{line.quantity} × {line.libelle}" for line in lines)
+
+
+def validate_order(order_id, admin_user_id):
+    """Valide la commande entière en une transaction (commit inclus).
+
+    Le stock de chaque récompense est décrémenté et la réservation convertie en débit du
+    solde. Si une récompense manque de stock, la commande entière est annulée et ses
+    jetons libérés. Retourne la commande traitée (validée ou annulée) ; lève OrderError
+    si elle ne peut pas l'être.
+    """
+    try:
+        order = _locked_order(order_id)
+        if order.statut == CANCELLED_STATUS:
+            raise OrderError("Une commande annulée ne peut pas être validée")
+        if order.statut == VALIDATED_STATUS:
+            raise OrderError("La commande est déjà validée")
+
+        customer = db.session.execute(
+            select(MyWittiClient).where(MyWittiClient.id == order.client_id)
+            .with_for_update().execution_options(populate_existing=True)
+        ).scalar_one_or_none()
+        if customer is None:
+            raise OrderError("Client non trouvé", 404)
+
+        lots = {lot.id: lot for lot in db.session.scalars(
+            select(MyWittiLot).where(
+                MyWittiLot.id.in_([line.lot_id for line in order.lines if line.lot_id is not None])
+            ).with_for_update()
+        )}
+        unavailable = [
+            line for line in order.lines
+            if line.lot_id not in lots or (lots[line.lot_id].stock or 0) < line.quantity
+        ]
+        now = datetime.utcnow()
+        customer_name = f"{customer.first_name} {customer.short_name}" if customer.first_name and customer.short_name else "Client"
+
+        if unavailable:
+            order.statut = CANCELLED_STATUS
+            order.processed_at = now
+            settle_holds([order.id], RELEASED)
+            missing = ", ".join(line.libelle for line in unavailable)
+            _notify(
+                customer.user_id,
+                f"Votre commande {order.id} a été annulée car les articles suivants ne sont pas disponibles en stock : {missing}. Vos jetons n'ont pas été débités.",
+                admin_user_id,
+                f"La commande {order.id} de {customer_name} a été annulée car les articles suivants ne sont pas disponibles en stock : {missing}."
+            )
+            db.session.commit()
+            return order
+
+        # Une réservation active couvre déjà le montant ; sinon (commande antérieure aux
+        # réservations) le solde disponible doit le couvrir
+        spendable = (customer.jetons or 0) if held_amount(order.id) is not None else available_jetons(customer)
+        if spendable < order.amount:
+            raise OrderError("Jetons insuffisants pour le client")
+
+        settle_holds([order.id], DEBITED)  # Réservation convertie en débit
+        customer.jetons = (customer.jetons or 0) - order.amount
+        for line in order.lines:
+            lots[line.lot_id].stock -= line.quantity
+        order.statut = VALIDATED_STATUS
+        order.processed_at = now
+
+        # Récupération de l'agence du client
+        compte = MyWittiCompte.query.filter_by(customer_code=customer.customer_code).first()
+        agence_name = compte.agence if compte and compte.agence else "votre agence"
+        items = _describe(order.lines)
+        _notify(
+            customer.user_id,
+            f"Votre commande {order.id} ({items}) a été validée. Passez à l'agence {agence_name} pour la récupérer.",
+            admin_user_id,
+            f"La commande {order.id} de {customer_name} ({items}) a été validée."
+        )
+        db.session.commit()
+        return order
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def cancel_order(order_id, admin_user_id):
+    """Annule la commande entière et libère ses jetons réservés en une transaction (commit inclus)"""
+    try:
+        order = _locked_order(order_id)
+        if order.statut == VALIDATED_STATUS:
+            raise OrderError("Une commande validée ne peut pas être annulée")
+        if order.statut == CANCELLED_STATUS:
+            raise OrderError("La commande est déjà annulée")
+
+        order.statut = CANCELLED_STATUS
+        order.processed_at = datetime.utcnow()
+        settle_holds([order.id], RELEASED)
+        _notify(
+            order.client.user_id if order.client else None,
+            f"Votre commande {order.id} ({_describe(order.lines)}) a été annulée. Vos jetons n'ont pas été débités.",
+            admin_user_id,
+            f"La commande {order.id} a été annulée."
+        )
+        db.session.commit()
+        return order
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def _notify(customer_user_id, customer_message, admin_user_id, admin_message):
+    notifications = [
+        MyWittiNotification(user_id=user_id, message=message)
+        for user_id, message in ((customer_user_id, customer_message), (admin_user_id, admin_message))
+        if user_id is not None
+    ]
+    db.session.add_all(notifications)
+
+
+def expire_orders(client_id=None, now=None):
+    """Annule en masse les commandes en attente dont la réservation a expiré (sans commit).
+
+    Les jetons réservés sont libérés et le client est notifié. Sans ``client_id``, traite
+    tous les clients (expire_jetons_holds.py). Retourne le nombre de commandes annulées.
+    """
+    expired = expire_holds(client_id, now)
+    order_ids = [row.order_id for row in expired if row.order_id is not None]
+    if not order_ids:
+        return 0
+
+    cancelled = db.session.execute(
+        update(MyWittiOrder).where(
+            MyWittiOrder.id.in_(order_ids),
+            MyWittiOrder.statut == PENDING_STATUS
+        ).values(
+            statut=CANCELLED_STATUS,
+            processed_at=now or datetime.utcnow()
+        ).returning(
+            MyWittiOrder.id,
+            MyWittiOrder.client_id
+        ).execution_options(synchronize_session=False)
+    ).all()
+    if cancelled:
+        users = dict(db.session.execute(
+            select(MyWittiClient.id, MyWittiClient.user_id).where(
+                MyWittiClient.id.in_({row.client_id for row in cancelled})
+            )
+        ).all())
+        db.session.add_all([
+            MyWittiNotification(
+                user_id=users[row.client_id],
+                message=f"Votre commande {row.id} n'a pas été validée à temps et a été annulée. Vos jetons réservés sont de nouveau disponibles."
+            )
+            for row in cancelled if users.get(row.client_id)
+        ])
+    return len(cancelled)
@@ -0,0 +1,135 @@
+# Services/page_visit_buffer.py
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+class PageVisitBuffer:
+    """Tampon en mémoire des visites de pages, vidé en base par un thread de fond.
+
+    Les requêtes se contentent d'empiler la visite dans une file bornée ; le thread
+    insère les visites par lots (taille ou délai atteint). Quand la file est pleine,
+    la visite est abandonnée et comptée dans ``dropped``.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.dropped = 0
+        self.flushed = 0
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('PAGE_VISIT_BUFFER_ENABLED', True)
+        self.batch_size = app.config.get('PAGE_VISIT_BATCH_SIZE', 500)
+        self.flush_interval = app.config.get('PAGE_VISIT_FLUSH_INTERVAL', 2.0)
+        self._queue = queue.Queue(maxsize=app.config.get('PAGE_VISIT_BUFFER_SIZE', 10000))
+        app.extensions['page_visit_buffer'] = self
+
+    def record(self, path, user_id=None, user_type=None):
+        """Empile une visite sans toucher à la base de données"""
+        visit = {
+            'path': path,
+            'user_id': user_id,
+            'user_type': user_type,
+            'timestamp': datetime.utcnow()
+        }
+        if not self.enabled:
+            self._write([visit])
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(visit)
+        except queue.Full:
+            # Pas de contention sur le chemin de la requête : le compteur est approximatif
+            self.dropped += 1
+
+    def flush(self):
+        """Vide immédiatement la file (utilisé à l'arrêt du worker)"""
+        batch = self._drain(block=False)
+        while batch:
+            self._write(batch)
+            batch = self._drain(block=False)
+
+    def stop(self):
+        """Arrête le thread de fond puis écrit les visites restantes"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        if self.dropped:
+            logger.warning(f"Page visit buffer dropped {self.dropped} visits (queue full)")
+
+    def _ensure_worker(self):
+        # Démarrage paresseux : le thread doit appartenir au processus worker,
+        # pas au processus maître de gunicorn (--preload / fork)
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                atexit.register(self.stop)
+            self._pid = pid
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='page-visit-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._drain(block=True)
+            if batch:
+                self._write(batch)
+
+    def _drain(self, block):
+        """Récupère jusqu'à ``batch_size`` visites, en attendant au plus ``flush_interval``"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if block:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        from Models.page_visit import PageVisit
+        from Services.page_visit_rollup import count_visits, increment_rollup
+
+        with self.app.app_context():
+            try:
+                # Lignes brutes et cumul horaire dans la même transaction
+                db.session.execute(db.insert(PageVisit), [dict(visit, rolled_up=True) for visit in batch])
+                increment_rollup(count_visits(batch))
+                db.session.commit()
+                self.flushed += len(batch)
+            except Exception as e:
+                db.session.rollback()
+                self.dropped += len(batch)
+                logger.error(f"Error flushing {len(batch)} page visits: {e}")
+
+
+page_visit_buffer = PageVisitBuffer()
@@ -0,0 +1,102 @@
+# Services/page_visit_rollup.py
+from collections import Counter
+from datetime import datetime, timedelta
+
+from sqlalchemy import desc, func
+
+from extensions import db
+from Models.page_visit import PageVisit
+from Models.page_visit_hourly import PageVisitHourly
+from utils import dialect_insert
+
+ANONYMOUS = 'anonymous'
+
+
+def hour_bucket(timestamp):
+    """Tronque un horodatage au début de son heure"""
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def count_visits(visits):
+    """Agrège une liste de visites en compteurs (path, heure, type d'utilisateur)"""
+    return Counter(
+        (visit['path'], hour_bucket(visit['timestamp']), visit.get('user_type') or ANONYMOUS)
+        for visit in visits
+    )
+
+
+def increment_rollup(counts):
+    """Ajoute les compteurs à page_visit_hourly (upsert, sans commit)"""
+    if not counts:
+        return
+    rows = [
+        {'path': path, 'hour': hour, 'user_type': user_type, 'visit_count': count}
+        for (path, hour, user_type), count in counts.items()
+    ]
+    stmt = dialect_insert(PageVisitHourly)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['path', 'hour', 'user_type'],
+        set_={'visit_count': PageVisitHourly.visit_count + stmt.excluded.visit_count}
+    )
+    db.session.execute(stmt, rows)
+
+
+def _hour_expression():
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.date_trunc('hour', PageVisit.timestamp)
+    return func.strftime('%Y-%m-%d %H:00:00', PageVisit.timestamp)
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+
+
+def compact_page_visits(retention_days=30):
+    """Replie les visites brutes non comptées dans le cumul horaire puis purge les anciennes.
+
+    Retourne le nombre de visites repliées et le nombre de lignes brutes supprimées.
+    """
+    max_id = db.session.query(func.max(PageVisit.id)).filter(PageVisit.rolled_up.is_(False)).scalar()
+    folded = 0
+    if max_id is not None:
+        pending = (PageVisit.rolled_up.is_(False), PageVisit.id <= max_id)
+        hour = _hour_expression()
+        grouped = db.session.query(
+            PageVisit.path, hour, PageVisit.user_type, func.count(PageVisit.id)
+        ).filter(*pending).group_by(PageVisit.path, hour, PageVisit.user_type).all()
+
+        counts = Counter()
+        for path, visit_hour, user_type, count in grouped:
+            if visit_hour is None:
+                continue
+            counts[(path, _as_datetime(visit_hour), user_type or ANONYMOUS)] += count
+            folded += count
+        increment_rollup(counts)
+        PageVisit.query.filter(*pending).update({'rolled_up': True}, synchronize_session=False)
+
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    purged = PageVisit.query.filter(
+        PageVisit.rolled_up.is_(True),
+        PageVisit.timestamp < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return folded, purged
+
+
+def most_visited_paths(limit=3, since=None):
+    """Pages client les plus visitées, lues uniquement depuis le cumul horaire"""
+    query = db.session.query(
+        PageVisitHourly.path,
+        func.sum(PageVisitHourly.visit_count).label('visit_count')
+    ).filter(
+        ~PageVisitHourly.path.like('/admin/%')
+    ).filter(
+        PageVisitHourly.path != '/accounts/login'
+    )
+    if since is not None:
+        query = query.filter(PageVisitHourly.hour >= hour_bucket(since))
+    return query.group_by(PageVisitHourly.path).order_by(
+        desc(func.sum(PageVisitHourly.visit_count))
+    ).limit(limit).all()
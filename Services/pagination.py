@@ -0,0 +1,25 @@
+# Services/pagination.py
+import base64
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    """Curseur de pagination illisible ou falsifié"""
+
+
+def encode_cursor(*values):
+    """Curseur opaque (base64 url) portant la clé de tri de la dernière ligne servie"""
+    raw = '|'.join(value.isoformat() if isinstance(value, datetime) else str(value) for value in values)
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, *parsers):
+    """Valeurs du curseur, converties une à une par ``parsers`` ; InvalidCursor si illisible"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        parts = raw.split('|')
+        if len(parts) != len(parsers):
+            raise ValueError(f"expected {len(parsers)} values, got {len(parts)}")
+        return tuple(parse(part) for parse, part in zip(parsers, parts))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(str(e))
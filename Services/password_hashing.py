@@ -0,0 +1,131 @@
+# Services/password_hashing.py
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from werkzeug.security import check_password_hash
+
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+
+
+class PasswordHasherBusy(Exception):
+    """Trop de vérifications de mot de passe en attente : la requête doit être rejetée"""
+
+
+class PasswordHasher:
+    """Hachage et vérification bcrypt dans un pool de threads borné.
+
+    bcrypt libère le GIL : les calculs (~250 ms) tournent dans le pool pendant que les
+    autres threads du worker continuent de servir les requêtes. Au-delà de
+    ``max_pending`` vérifications en cours ou en file, ``PasswordHasherBusy`` est levée
+    au lieu d'allonger la file.
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self.pool_size = 4
+        self.max_pending = 16
+        self.timeout = 10
+        self._executor = None
+        self._pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rounds = app.config.get('BCRYPT_ROUNDS', 12)
+        self.pool_size = app.config.get('PASSWORD_POOL_SIZE', 4)
+        self.max_pending = app.config.get('PASSWORD_POOL_MAX_PENDING', 16)
+        self.timeout = app.config.get('PASSWORD_VERIFY_TIMEOUT', 10)
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        """Hash bcrypt au coût configuré"""
+        return self._run(_hash, password, self.rounds)
+
+    def verify(self, stored_hash, password):
+        """True si le mot de passe correspond (bcrypt ou ancien hash werkzeug)"""
+        if not stored_hash or password is None:
+            return False
+        return self._run(_verify, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True si le hash n'est pas un bcrypt au coût configuré"""
+        if not stored_hash or not stored_hash.startswith(BCRYPT_PREFIXES):
+            return True
+        try:
+            return int(stored_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def _run(self, fn, *args):
+        executor = self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result(timeout=self.timeout)
+
+    def _ensure_executor(self):
+        # Pool propre à chaque worker (les threads ne survivent pas au fork de gunicorn)
+        pid = os.getpid()
+        if self._pid == pid:
+            return self._executor
+        with self._lock:
+            if self._pid != pid:
+                self._executor = _executor_class()(max_workers=self.pool_size, thread_name_prefix='password-hasher')
+                self._slots = threading.BoundedSemaphore(self.max_pending)
+                self._pid = pid
+        return self._executor
+
+
+def _executor_class():
+    # Sous gevent, threading est patché : il faut le pool de vrais threads de gevent
+    # pour que bcrypt ne bloque pas la boucle d'événements du worker
+    try:
+        from gevent import monkey
+    except ImportError:
+        return ThreadPoolExecutor
+    if monkey.is_module_patched('threading'):
+        from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+        return GeventThreadPoolExecutor
+    return ThreadPoolExecutor
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(stored_hash, password):
+    if stored_hash.startswith(BCRYPT_PREFIXES):
+        return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
+    # Hashes werkzeug (pbkdf2/scrypt) écrits par les anciens scripts de données de test
+    return check_password_hash(stored_hash, password)
+
+
+def benchmark(rounds, samples=3):
+    """Durée moyenne (secondes) d'un hachage bcrypt au coût ``rounds``"""
+    started = time.perf_counter()
+    for _ in range(samples):
+        bcrypt.hashpw(b'calibration', bcrypt.gensalt(rounds))
+    return (time.perf_counter() - started) / samples
+
+
+def calibrate(target_seconds=0.25, min_rounds=10, max_rounds=16):
+    """Coût le plus élevé dont le hachage reste sous ``target_seconds`` sur cette machine"""
+    best = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        if benchmark(rounds) > target_seconds:
+            break
+        best = rounds
+    return best
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,113 @@
+# Services/referrals.py
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, select, tuple_
+
+from extensions import db
+from Models.mywitti_referral import MyWittiReferral
+from Models.mywitti_users import MyWittiUser
+from Services.pagination import decode_cursor, encode_cursor
+from utils import dialect_insert, validate_email
+
+INVITED = 'invited'
+ALREADY_INVITED = 'already_invited'
+DUPLICATE = 'duplicate'
+INVALID = 'invalid'
+
+
+def normalize_email(email):
+    """Adresse sans espaces et en casse repliée ; None si elle n'est pas valide"""
+    if not isinstance(email, str):
+        return None
+    email = email.strip().casefold()
+    return email if validate_email(email) else None
+
+
+def referral_link(referral_code):
+    return f"http://127.0.0.1:5000/accounts/refer/{referral_code}"
+
+
+def invite_emails(referrer_id, emails):
+    """Crée les parrainages des adresses ``emails`` en une seule instruction (sans commit).
+
+    INSERT ... ON CONFLICT DO NOTHING sur l'index unique de referred_email : une adresse
+    déjà invitée, même par une requête concurrente, est ignorée sans erreur. Retourne un
+    résultat par adresse reçue, dans l'ordre : email, status (invited, already_invited,
+    duplicate ou invalid) et referral_link pour les invitations créées.
+    """
+    results = []
+    rows = {}
+    for email in emails:
+        normalized = normalize_email(email)
+        if normalized is None:
+            results.append({'email': email, 'status': INVALID})
+        elif normalized in rows:
+            results.append({'email': email, 'status': DUPLICATE})
+        else:
+            rows[normalized] = {
+                'referrer_id': referrer_id,
+                'referred_email': normalized,
+                'referral_code': str(uuid.uuid4()),
+                'status': 'pending'
+            }
+            results.append({'email': email, 'normalized': normalized})
+
+    created = {}
+    if rows:
+        stmt = dialect_insert(MyWittiReferral).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_nothing(index_elements=['referred_email']).returning(
+            MyWittiReferral.referred_email, MyWittiReferral.referral_code
+        )
+        created = dict(db.session.execute(stmt).all())
+
+    for result in results:
+        normalized = result.pop('normalized', None)
+        if normalized is None:
+            continue
+        if normalized in created:
+            result['status'] = INVITED
+            result['referral_link'] = referral_link(created[normalized])
+        else:
+            result['status'] = ALREADY_INVITED
+    return results
+
+
+def referral_status_counts(referrer_id):
+    """Nombre de parrainages du parrain par statut, en une requête groupée"""
+    return dict(db.session.execute(
+        select(MyWittiReferral.status, func.count(MyWittiReferral.id)).where(
+            MyWittiReferral.referrer_id == referrer_id
+        ).group_by(MyWittiReferral.status)
+    ).all())
+
+
+def referral_page(limit, cursor=None, referrer_id=None, status=None):
+    """Page de parrainages (plus récents d'abord) et curseur de la page suivante (ou None).
+
+    Filtrée par parrain (liste client) et/ou par statut ; l'email du parrain est lu par
+    jointure pour la liste admin.
+    """
+    stmt = select(
+        MyWittiReferral.id,
+        MyWittiReferral.referrer_id,
+        MyWittiUser.email.label('referrer_email'),
+        MyWittiReferral.referred_email,
+        MyWittiReferral.referral_code,
+        MyWittiReferral.status,
+        MyWittiReferral.created_at
+    ).outerjoin(MyWittiUser, MyWittiUser.id == MyWittiReferral.referrer_id)
+    if referrer_id is not None:
+        stmt = stmt.where(MyWittiReferral.referrer_id == referrer_id)
+    if status:
+        stmt = stmt.where(MyWittiReferral.status == status)
+    if cursor:
+        stmt = stmt.where(
+            tuple_(MyWittiReferral.created_at, MyWittiReferral.id)
+            < decode_cursor(cursor, datetime.fromisoformat, int)
+        )
+    rows = db.session.execute(
+        stmt.order_by(MyWittiReferral.created_at.desc(), MyWittiReferral.id.desc()).limit(limit + 1)
+    ).all()
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return rows[:limit], next_cursor
@@ -0,0 +1,178 @@
+# Services/resource_versions.py
+import hashlib
+import time
+from functools import wraps
+
+from flask import Response, current_app, request
+from flask_restx.utils import unpack
+from sqlalchemy import event, inspect, or_, select
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from Models.mywitti_category import MyWittiCategory
+from Models.mywitti_client import MyWittiClient
+from Models.mywitti_faq import MyWittiFAQ
+from Models.mywitti_jetons_transactions import MyWittiJetonsTransactions
+from Models.mywitti_lots import MyWittiLot
+from Models.mywitti_lots_claims import MyWittiLotsClaims
+from Models.mywitti_lots_favoris import MyWittiLotsFavoris
+from Models.resource_version import ResourceVersion
+from Services.identity import current_identity
+from utils import dialect_insert
+
+CLIENT = 'client'
+FAVORITES = 'favorites'
+CART = 'cart'
+LOTS = 'lots'
+CATEGORIES = 'categories'
+FAQ = 'faq'
+
+GLOBAL = 0
+
+# À incrémenter quand le contenu d'une réponse servie avec ETag change de forme
+ETAG_GENERATION = 1
+
+
+def resource_versions(keys):
+    """Versions des ressources ``keys`` ((scope, entity_id), ...) en une requête ; 0 si jamais modifiée"""
+    rows = db.session.execute(
+        select(ResourceVersion.scope, ResourceVersion.entity_id, ResourceVersion.version).where(
+            or_(*(
+                (ResourceVersion.scope == scope) & (ResourceVersion.entity_id == entity_id)
+                for scope, entity_id in keys
+            ))
+        )
+    ).all()
+    found = {(row.scope, row.entity_id): row.version for row in rows}
+    return [found.get(key, 0) for key in keys]
+
+
+def compute_etag(keys):
+    """ETag (sans guillemets) dérivé des ressources, de leurs versions et de la fenêtre ETAG_MAX_AGE courante.
+
+    La fenêtre borne la durée de validité d'un ETag quand une ressource est modifiée
+    sans passer par l'ORM (UPDATE en masse, script de calcul des jetons).
+    """
+    max_age = current_app.config.get('ETAG_MAX_AGE', 300)
+    window = int(time.time() // max_age) if max_age else 0
+    versions = resource_versions(keys)
+    raw = f"{ETAG_GENERATION}|{window}|" + '|'.join(
+        f"{scope}:{entity_id}:{version}" for (scope, entity_id), version in zip(keys, versions)
+    )
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:24]
+
+
+def conditional(resource_keys):
+    """Décorateur GET : 304 Not Modified si If-None-Match correspond, sans exécuter la vue.
+
+    ``resource_keys(identity)`` retourne les (scope, entity_id) dont dépend la réponse
+    (None pour laisser la vue répondre, ex. client introuvable). À placer sous
+    ``jwt_required`` et au-dessus de ``marshal_with``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config.get('ETAG_ENABLED', True):
+                return view(*args, **kwargs)
+            keys = resource_keys(current_identity())
+            if not keys:
+                return view(*args, **kwargs)
+
+            # Version lue avant la vue : une modification concurrente change l'ETag suivant
+            etag = compute_etag(keys)
+            # Comparaison faible (RFC 9110) : un proxy qui compresse affaiblit l'ETag
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+
+            data, code, headers = unpack(view(*args, **kwargs))
+            if code == 200:
+                headers = dict(headers or {}, ETag=f'"{etag}"')
+                headers['Cache-Control'] = 'private, no-cache'
+            return data, code, headers
+        return wrapper
+    return decorator
+
+
+def client_resources(identity):
+    """Profil et tableau de bord : ligne du client, ses transactions et les paliers"""
+    return [(CLIENT, identity.client_id), (CATEGORIES, GLOBAL)] if identity.client_id else None
+
+
+def favorites_resources(identity):
+    return [(FAVORITES, identity.client_id), (LOTS, GLOBAL), (CATEGORIES, GLOBAL)] if identity.client_id else None
+
+
+def cart_resources(identity):
+    # Le panier affiche aussi les jetons disponibles du client
+    return [(CART, identity.client_id), (CLIENT, identity.client_id), (LOTS, GLOBAL)] if identity.client_id else None
+
+
+def faq_resources(identity):
+    return [(FAQ, GLOBAL)]
+
+
+def _bump(session, scope, entity_id):
+    if entity_id is not None:
+        session.info.setdefault('resource_versions', set()).add((scope, entity_id))
+
+
+def _bump_on_change(model, scope, entity_attr=None, fields=None):
+    # entity_attr : colonne portant l'id du client (None pour une ressource globale)
+    # fields : colonnes affichées ; une mise à jour des autres (stock) ne change pas la version
+    def listener(mapper, connection, target):
+        session = object_session(target)
+        if session is not None:
+            _bump(session, scope, getattr(target, entity_attr) if entity_attr else GLOBAL)
+
+    def update_listener(mapper, connection, target):
+        state = inspect(target)
+        if any(state.attrs[field].history.has_changes() for field in fields):
+            listener(mapper, connection, target)
+
+    event.listen(model, 'after_insert', listener)
+    event.listen(model, 'after_update', update_listener if fields else listener)
+    event.listen(model, 'after_delete', listener)
+
+
+_bump_on_change(MyWittiClient, CLIENT, 'id')
+_bump_on_change(MyWittiJetonsTransactions, CLIENT, 'client_id')
+_bump_on_change(MyWittiLotsFavoris, FAVORITES, 'client_id')
+_bump_on_change(MyWittiLotsClaims, CART, 'client_id')
+# Ressources globales : une seule ligne de version, verrouillée jusqu'au commit de chaque
+# écrivain ; seules les colonnes affichées par les réponses à ETag la font changer
+_bump_on_change(MyWittiLot, LOTS, fields=('libelle', 'jetons', 'recompense_image', 'category_id'))
+_bump_on_change(MyWittiCategory, CATEGORIES, fields=('category_name', 'level', 'min_jetons'))
+_bump_on_change(MyWittiFAQ, FAQ)
+
+
+def bump_resource_versions(connection, keys):
+    """Incrémente les versions des ressources ``keys`` dans la transaction de ``connection``.
+
+    À appeler après une écriture hors ORM (INSERT/DELETE direct) : les événements de
+    mapper ne la voient pas.
+    """
+    stmt = dialect_insert(ResourceVersion, connection.dialect.name)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['scope', 'entity_id'],
+        set_={'version': ResourceVersion.version + 1}
+    )
+    connection.execute(stmt, [
+        {'scope': scope, 'entity_id': entity_id, 'version': 1}
+        for scope, entity_id in sorted(keys)
+    ])
+
+
+@event.listens_for(Session, 'after_flush')
+def _write_resource_versions(session, flush_context):
+    """Incrémente une fois par flush chaque ressource modifiée (dans la transaction en cours)"""
+    keys = session.info.pop('resource_versions', None)
+    if keys:
+        bump_resource_versions(session.connection(), keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_resource_versions(session):
+    session.info.pop('resource_versions', None)
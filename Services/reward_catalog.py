@@ -0,0 +1,190 @@
+# Services/reward_catalog.py
+import hashlib
+import json
+import threading
+import time
+
+from sqlalchemy import event, func, literal_column, select, tuple_
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from Models.mywitti_category import MyWittiCategory
+from Models.mywitti_lots import MyWittiLot
+from Models.mywitti_order import MyWittiOrder
+from Models.mywitti_order_line import MyWittiOrderLine
+from Services.pagination import decode_cursor, encode_cursor
+
+
+class RewardCatalog:
+    """Catalogue des récompenses en stock (/lot/rewards), conservé en mémoire par worker.
+
+    Le catalogue est chargé en une requête (lots joints à leur catégorie) puis servi tel
+    quel, corps JSON et ETag compris. Chaque commit modifiant un lot ou une catégorie
+    incrémente la version et force un rechargement ; ``ttl`` borne la durée de vie d'un
+    catalogue modifié par un autre worker ou hors ORM.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 60
+        self.version = 0
+        self._snapshot = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('REWARD_CATALOG_TTL', 60)
+        app.extensions['reward_catalog'] = self
+
+    def get(self):
+        """Récompenses disponibles, corps JSON sérialisé et ETag (empreinte du contenu)"""
+        snapshot = self._fresh_snapshot()
+        if snapshot is None:
+            # Un seul chargement à la fois ; invalidate() attend sa fin puis l'écarte
+            with self._lock:
+                snapshot = self._fresh_snapshot()
+                if snapshot is None:
+                    rewards = load_available_rewards()
+                    body = json.dumps(rewards, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+                    # ETag dérivé du contenu : identique d'un worker à l'autre pour un même catalogue
+                    snapshot = (self.version, time.monotonic(), rewards, body, hashlib.sha1(body).hexdigest()[:24])
+                    self._snapshot = snapshot
+        return snapshot[2:]
+
+    def _fresh_snapshot(self):
+        # (version, chargé à, récompenses, corps, ETag) publié d'un bloc
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[0] == self.version and time.monotonic() - snapshot[1] < self.ttl:
+            return snapshot
+        return None
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._snapshot = None
+
+
+# Tris de /lot/rewards et sens du parcours de leur clé keyset
+REWARD_SORTS = {
+    'price': 'asc',
+    'price_desc': 'desc',
+    'newest': 'desc',
+    'popularity': 'desc'
+}
+
+
+def catalog_select(*columns):
+    return select(
+        MyWittiLot.id,
+        MyWittiLot.libelle,
+        MyWittiLot.jetons,
+        MyWittiLot.recompense_image,
+        MyWittiLot.stock,
+        MyWittiCategory.category_name,
+        *columns
+    ).outerjoin(
+        MyWittiCategory, MyWittiCategory.id == MyWittiLot.category_id
+    ).where(
+        # Prédicat littéral (non paramétré) : PostgreSQL peut retenir l'index partiel idx_lots_available
+        MyWittiLot.stock > literal_column('0')
+    )
+
+
+def format_reward(row):
+    return {
+        "id": row.id,
+        "title": row.libelle or "Sans titre",
+        "tokens_required": row.jetons or 0,
+        "image_url": row.recompense_image or None,
+        "category": row.category_name or "Sans catégorie",
+        "quantity_available": row.stock
+    }
+
+
+def load_available_rewards():
+    """Lots en stock et nom de leur catégorie en une seule requête"""
+    rows = db.session.execute(catalog_select().order_by(MyWittiLot.id)).all()
+    return [format_reward(row) for row in rows]
+
+
+def reward_page(limit, cursor=None, sort='price', category_id=None, min_jetons=None, max_jetons=None):
+    """Page du catalogue filtrée (catégorie, bornes de jetons) et triée, et curseur de la page suivante.
+
+    Tri par prix sur (jetons, id), nouveautés sur la clé primaire, popularité sur les
+    quantités commandées hors commandes annulées (idx_order_lines_lot). Un prix NULL compte pour 0, la valeur
+    tokens_required affichée : même ordre et mêmes bornes sous SQLite et PostgreSQL.
+    """
+    price = func.coalesce(MyWittiLot.jetons, 0)
+    if sort == 'popularity':
+        orders = select(
+            MyWittiOrderLine.lot_id,
+            func.sum(MyWittiOrderLine.quantity).label('orders')
+        ).join(
+            MyWittiOrder, MyWittiOrder.id == MyWittiOrderLine.order_id
+        ).where(
+            MyWittiOrder.statut != 'cancelled'
+        ).group_by(MyWittiOrderLine.lot_id).subquery()
+        popularity = func.coalesce(orders.c.orders, 0)
+        stmt = catalog_select(popularity.label('popularity')).outerjoin(orders, orders.c.lot_id == MyWittiLot.id)
+        key = (popularity, MyWittiLot.id)
+        parsers = (int, int)
+    elif sort == 'newest':
+        # L'id suit l'ordre de création : pas de tri sur created_at (nullable, non indexé)
+        stmt = catalog_select()
+        key = (MyWittiLot.id,)
+        parsers = (int,)
+    else:
+        stmt = catalog_select(price.label('price'))
+        key = (price, MyWittiLot.id)
+        parsers = (int, int)
+
+    if category_id is not None:
+        stmt = stmt.where(MyWittiLot.category_id == category_id)
+    if min_jetons is not None:
+        stmt = stmt.where(price >= min_jetons)
+    if max_jetons is not None:
+        stmt = stmt.where(price <= max_jetons)
+
+    descending = REWARD_SORTS[sort] == 'desc'
+    if cursor:
+        after = decode_cursor(cursor, *parsers)
+        stmt = stmt.where(tuple_(*key) < after if descending else tuple_(*key) > after)
+    order = [column.desc() if descending else column.asc() for column in key]
+    rows = db.session.execute(stmt.order_by(*order).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        if sort == 'popularity':
+            next_cursor = encode_cursor(last.popularity, last.id)
+        elif sort == 'newest':
+            next_cursor = encode_cursor(last.id)
+        else:
+            next_cursor = encode_cursor(last.price, last.id)
+    return [format_reward(row) for row in rows[:limit]], next_cursor
+
+
+@event.listens_for(MyWittiLot, 'after_insert')
+@event.listens_for(MyWittiLot, 'after_update')
+@event.listens_for(MyWittiLot, 'after_delete')
+@event.listens_for(MyWittiCategory, 'after_update')
+@event.listens_for(MyWittiCategory, 'after_delete')
+def _flag_catalog_change(mapper, connection, target):
+    # Ajout, modification et suppression de stock (admin) et décrément à la validation d'une commande
+    session = object_session(target)
+    if session is not None:
+        session.info['reward_catalog_stale'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_catalog(session):
+    if session.info.pop('reward_catalog_stale', False):
+        reward_catalog.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_changes(session):
+    session.info.pop('reward_catalog_stale', None)
+
+
+reward_catalog = RewardCatalog()
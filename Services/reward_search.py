@@ -0,0 +1,106 @@
+# Services/reward_search.py
+import re
+import threading
+
+from sqlalchemy import func, literal, or_
+
+from extensions import db
+from Models.mywitti_lots import MyWittiLot
+from Services.reward_catalog import catalog_select, format_reward, reward_catalog
+
+# Seuil de pg_trgm.word_similarity_threshold (défaut PostgreSQL), repris par l'index en mémoire
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+_WORD = re.compile(r'[^\W_]+')
+
+
+def trigrams(text):
+    """Trigrammes d'un texte à la manière de pg_trgm (mots en minuscules, bordés d'espaces)"""
+    grams = set()
+    for word in _WORD.findall((text or '').lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Index inversé trigramme → récompenses, construit sur le catalogue en mémoire.
+
+    Remplace le GIN pg_trgm hors PostgreSQL (SQLite en développement) : seules les
+    récompenses partageant un trigramme avec la recherche sont évaluées.
+    """
+
+    def __init__(self, rewards):
+        self.rewards = rewards
+        self._grams = [trigrams(reward['title']) for reward in rewards]
+        self._titles = [reward['title'].lower() for reward in rewards]
+        self._postings = {}
+        for position, grams in enumerate(self._grams):
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+
+    def search(self, query, limit):
+        """Récompenses triées par pertinence : (récompense, score) les plus proches d'abord"""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        needle = query.lower()
+        shared = {}
+        for gram in query_grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        matches = []
+        for position, count in shared.items():
+            # Part des trigrammes de la recherche présents dans le libellé (≈ word_similarity)
+            coverage = count / len(query_grams)
+            if coverage < WORD_SIMILARITY_THRESHOLD and needle not in self._titles[position]:
+                continue
+            similarity = count / len(query_grams | self._grams[position])
+            matches.append((coverage, similarity, position))
+        matches.sort(key=lambda match: (-match[0], -match[1], self.rewards[match[2]]['id']))
+        return [(self.rewards[position], round(coverage, 4)) for coverage, _, position in matches[:limit]]
+
+
+class RewardSearch:
+    """Recherche approximative dans le catalogue : pg_trgm sous PostgreSQL, index en mémoire sinon"""
+
+    def __init__(self):
+        self._index = None
+        self._lock = threading.Lock()
+
+    def search(self, query, limit):
+        if db.engine.dialect.name == 'postgresql':
+            return search_rewards_sql(query, limit)
+        return self._memory_index().search(query, limit)
+
+    def _memory_index(self):
+        # Reconstruit quand le catalogue en mémoire change (même liste de récompenses sinon)
+        rewards = reward_catalog.get()[0]
+        index = self._index
+        if index is None or index.rewards is not rewards:
+            with self._lock:
+                index = self._index
+                if index is None or index.rewards is not rewards:
+                    index = self._index = TrigramIndex(rewards)
+        return index
+
+
+def search_rewards_sql(query, limit):
+    """Recherche servie par idx_lots_libelle_trgm (GIN gin_trgm_ops), classée par similarité"""
+    pattern = '%' + re.sub(r'([\\%_])', r'\\\1', query) + '%'
+    score = func.word_similarity(query, MyWittiLot.libelle)
+    rows = db.session.execute(
+        catalog_select(score.label('score')).where(
+            or_(
+                literal(query).bool_op('<%')(MyWittiLot.libelle),
+                MyWittiLot.libelle.ilike(pattern, escape='\\')
+            )
+        ).order_by(
+            score.desc(), func.similarity(MyWittiLot.libelle, query).desc(), MyWittiLot.id
+        ).limit(limit)
+    ).all()
+    return [(format_reward(row), round(row.score, 4)) for row in rows]
+
+
+reward_search = RewardSearch()
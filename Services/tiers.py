@@ -0,0 +1,117 @@
+# Services/tiers.py
+import threading
+import time
+from bisect import bisect_right
+from collections import namedtuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from Models.mywitti_category import MyWittiCategory
+
+Tier = namedtuple('Tier', ['id', 'name', 'level', 'min_jetons', 'max_jetons'])
+TierProgress = namedtuple('TierProgress', ['tier', 'next_tier', 'percentage', 'tokens_to_next_tier'])
+
+NO_PROGRESS = TierProgress(None, None, 0, 0)
+
+
+class TierService:
+    """Paliers de fidélité lus dans mywitti_category et résolus par recherche dichotomique.
+
+    Les seuils (min_jetons) sont chargés une fois dans un tableau trié ; la table est
+    relue après un commit modifiant une catégorie, et au plus tard après ``ttl``
+    secondes pour les changements faits par un autre worker.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 300
+        self._tiers = ()
+        self._thresholds = ()
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('TIER_CACHE_TTL', 300)
+        app.extensions['tiers'] = self
+
+    def tiers(self):
+        """Paliers triés par seuil croissant"""
+        return self._snapshot()[0]
+
+    def resolve(self, jetons):
+        """Palier atteint, palier suivant, progression (%) et jetons manquants"""
+        tiers, thresholds = self._snapshot()
+        return _progress(tiers, thresholds, jetons or 0)
+
+    def resolve_many(self, jetons_list):
+        """Forme vectorisée de ``resolve`` : un seul instantané des seuils pour toute la liste"""
+        tiers, thresholds = self._snapshot()
+        return [_progress(tiers, thresholds, jetons or 0) for jetons in jetons_list]
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _snapshot(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= self.ttl:
+            with self._lock:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl:
+                    self._load()
+        return self._tiers, self._thresholds
+
+    def _load(self):
+        categories = db.session.query(
+            MyWittiCategory.id, MyWittiCategory.category_name, MyWittiCategory.level, MyWittiCategory.min_jetons
+        ).order_by(MyWittiCategory.min_jetons, MyWittiCategory.level).all()
+        tiers = tuple(
+            Tier(
+                category.id,
+                category.category_name,
+                category.level,
+                category.min_jetons or 0,
+                categories[i + 1].min_jetons if i + 1 < len(categories) else None
+            )
+            for i, category in enumerate(categories)
+        )
+        # Publication atomique : les lecteurs voient l'ancien ou le nouveau couple complet
+        self._tiers, self._thresholds = tiers, tuple(tier.min_jetons for tier in tiers)
+        self._loaded_at = time.monotonic()
+
+
+def _progress(tiers, thresholds, jetons):
+    index = bisect_right(thresholds, jetons) - 1
+    if index < 0:
+        return NO_PROGRESS
+    tier = tiers[index]
+    if tier.max_jetons is None:
+        # Palier le plus élevé : pas de palier suivant
+        return TierProgress(tier, None, 0, 0)
+    range_width = tier.max_jetons - tier.min_jetons
+    percentage = (jetons - tier.min_jetons) / range_width * 100 if range_width > 0 else 0
+    return TierProgress(tier, tiers[index + 1], percentage, tier.max_jetons - jetons)
+
+
+@event.listens_for(MyWittiCategory, 'after_insert')
+@event.listens_for(MyWittiCategory, 'after_update')
+@event.listens_for(MyWittiCategory, 'after_delete')
+def _flag_tier_change(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['tiers_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_tiers(session):
+    if session.info.pop('tiers_changed', False):
+        tier_service.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_tier_change(session):
+    session.info.pop('tiers_changed', None)
+
+
+tier_service = TierService()
@@ -0,0 +1,319 @@
+# Services/token_revocation.py
+import hashlib
+import logging
+import math
+import os
+import select
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, inspect, or_, text
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from Models.token_blacklist import TokenBlacklist
+from Models.mywitti_users import MyWittiUser
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'token_revoked'
+VERSION_PREFIX = 'tv:'
+
+
+class BloomFilter:
+    """Filtre de Bloom minimal : aucun faux négatif, faux positifs au taux ``error_rate``"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenRevocationCache:
+    """Cache par worker des jetons JWT révoqués.
+
+    Un filtre de Bloom contient les JTI révoqués non expirés : un JTI absent du filtre
+    n'est pas révoqué, sans requête. Seul un résultat « peut-être présent » est vérifié
+    en base. Le filtre est complété par un rattrapage incrémental (id > dernier id lu)
+    toutes les ``sync_interval`` secondes et, sous PostgreSQL, par LISTEN/NOTIFY pour
+    propager immédiatement les déconnexions faites par les autres workers.
+
+    Les id sont attribués à l'insertion mais visibles au commit : une ligne peut
+    apparaître après une ligne d'id supérieur. Le dernier id lu ne dépasse donc jamais
+    les lignes créées depuis moins de ``sync_overlap`` secondes, relues à chaque rattrapage.
+
+    Le cache garde aussi les ``token_version`` non nulles des utilisateurs : un jeton
+    dont le claim ``tv`` est inférieur est refusé (mot de passe ou rôle changé). Elles
+    sont relues à chaque reconstruction ; entre deux, les notifications ``tv:`` suffisent
+    et la relecture à chaque rattrapage n'a lieu que sans écoute LISTEN active.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._bloom = None
+        self._revoked = set()
+        self._not_revoked = set()
+        self._versions = {}
+        self._watermark = 0
+        self._last_sync = 0.0
+        self._last_rebuild = 0.0
+        self._listener = None
+        self._listener_pid = None
+        self._sync_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('TOKEN_REVOCATION_CACHE_ENABLED', True)
+        self.sync_interval = app.config.get('TOKEN_REVOCATION_SYNC_INTERVAL', 30)
+        self.rebuild_interval = app.config.get('TOKEN_REVOCATION_REBUILD_INTERVAL', 3600)
+        self.sync_overlap = app.config.get('TOKEN_REVOCATION_SYNC_OVERLAP', 120)
+        self.capacity = app.config.get('TOKEN_REVOCATION_BLOOM_CAPACITY', 100000)
+        self.error_rate = app.config.get('TOKEN_REVOCATION_BLOOM_ERROR_RATE', 0.001)
+        self.listen = app.config.get('TOKEN_REVOCATION_LISTEN', True)
+        app.extensions['token_revocation'] = self
+
+    def is_revoked(self, jti):
+        """True si le jeton a été révoqué (appelé à chaque requête protégée)"""
+        if not self.enabled:
+            return self._query(jti)
+
+        self._ensure_listener()
+        self._sync_if_stale()
+        if jti in self._revoked:
+            return True
+        if jti not in self._bloom or jti in self._not_revoked:
+            return False
+
+        # Présence possible (ou faux positif) : la base tranche, une seule fois par JTI
+        revoked = self._query(jti)
+        if revoked:
+            self._revoked.add(jti)
+        elif len(self._not_revoked) < self.capacity:
+            self._not_revoked.add(jti)
+        return revoked
+
+    def is_stale(self, jwt_payload):
+        """True si le jeton a été émis avant la dernière incrémentation de token_version"""
+        uid = jwt_payload.get('uid')
+        if uid is None:
+            return False
+        if not self.enabled:
+            current = db.session.query(MyWittiUser.token_version).filter_by(id=uid).scalar()
+        else:
+            self._sync_if_stale()
+            current = self._versions.get(uid, 0)
+        return jwt_payload.get('tv', 0) < (current or 0)
+
+    def revoke(self, jwt_payload):
+        """Révoque le jeton courant et publie la révocation aux autres workers (commit inclus)"""
+        jti = jwt_payload['jti']
+        exp = jwt_payload.get('exp')
+        expires_at = datetime.utcfromtimestamp(exp) if exp else None
+        db.session.add(TokenBlacklist(jti=jti, expires_at=expires_at))
+        if self._is_postgresql():
+            # Délivré aux autres workers au commit de la transaction
+            db.session.execute(text("SELECT pg_notify(:channel, :jti)"), {'channel': CHANNEL, 'jti': jti})
+        db.session.commit()
+        self._note_revoked(jti)
+
+    def prune(self, now=None):
+        """Supprime les révocations de jetons déjà expirés ; retourne le nombre de lignes supprimées"""
+        now = now or datetime.utcnow()
+        legacy_cutoff = now - self.app.config['JWT_ACCESS_TOKEN_EXPIRES']
+        purged = TokenBlacklist.query.filter(or_(
+            TokenBlacklist.expires_at < now,
+            # Lignes antérieures à expires_at : expirées au plus tard JWT_ACCESS_TOKEN_EXPIRES après création
+            (TokenBlacklist.expires_at.is_(None)) & (TokenBlacklist.created_at < legacy_cutoff)
+        )).delete(synchronize_session=False)
+        db.session.commit()
+        return purged
+
+    def _note_revoked(self, jti):
+        if self._bloom is not None:
+            self._bloom.add(jti)
+        self._revoked.add(jti)
+        self._not_revoked.discard(jti)
+
+    def _note_token_version(self, user_id, version):
+        if version > self._versions.get(user_id, 0):
+            self._versions[user_id] = version
+
+    def _load_versions(self):
+        # Index partiel idx_users_token_version : seuls les comptes concernés sont lus
+        versions = dict(db.session.query(MyWittiUser.id, MyWittiUser.token_version).filter(
+            MyWittiUser.token_version > 0
+        ).all())
+        # token_version ne fait que croître : une notification reçue pendant la lecture est conservée
+        for user_id, version in self._versions.items():
+            if version > versions.get(user_id, 0):
+                versions[user_id] = version
+        self._versions = versions
+
+    def _is_listening(self):
+        return (
+            self._listener is not None
+            and self._listener_pid == os.getpid()
+            and self._listener.is_alive()
+        )
+
+    def _query(self, jti):
+        return db.session.query(TokenBlacklist.id).filter_by(jti=jti).first() is not None
+
+    def _is_postgresql(self):
+        return db.session.get_bind().dialect.name == 'postgresql'
+
+    def _sync_if_stale(self):
+        now = time.monotonic()
+        if self._bloom is not None and now - self._last_sync < self.sync_interval:
+            return
+        # Un seul thread synchronise ; les autres continuent avec l'état courant
+        if not self._sync_lock.acquire(blocking=self._bloom is None):
+            return
+        try:
+            if self._bloom is None or now - self._last_rebuild >= self.rebuild_interval:
+                self._rebuild()
+            else:
+                self._catch_up()
+            self._last_sync = time.monotonic()
+        except Exception as e:
+            logger.error(f"Error syncing revoked tokens: {e}")
+            if self._bloom is None:
+                raise
+        finally:
+            self._sync_lock.release()
+
+    def _rebuild(self):
+        """Recharge le filtre avec les révocations non expirées (les lignes purgées en sortent)"""
+        cutoff = self._overlap_cutoff()
+        rows = db.session.query(TokenBlacklist.id, TokenBlacklist.jti, TokenBlacklist.created_at).filter(
+            or_(TokenBlacklist.expires_at.is_(None), TokenBlacklist.expires_at >= datetime.utcnow())
+        ).order_by(TokenBlacklist.id).all()
+        bloom = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+        for _, jti, _ in rows:
+            bloom.add(jti)
+        self._advance_watermark(rows, cutoff)
+        self._bloom = bloom
+        self._load_versions()
+        self._revoked = set()
+        self._not_revoked = set()
+        self._last_rebuild = time.monotonic()
+
+    def _catch_up(self):
+        cutoff = self._overlap_cutoff()
+        rows = db.session.query(TokenBlacklist.id, TokenBlacklist.jti, TokenBlacklist.created_at).filter(
+            TokenBlacklist.id > self._watermark
+        ).order_by(TokenBlacklist.id).all()
+        for _, jti, _ in rows:
+            # Les lignes de la fenêtre sont relues : pas de double comptage dans le filtre
+            if jti not in self._bloom:
+                self._bloom.add(jti)
+            self._not_revoked.discard(jti)
+        self._advance_watermark(rows, cutoff)
+        if not self._is_listening():
+            # Sans LISTEN (SQLite, écoute désactivée), seules les relectures propagent les versions
+            self._load_versions()
+        if self._bloom.count > self._bloom.capacity:
+            # Filtre trop chargé : le taux de faux positifs dérive, on le reconstruit
+            self._last_rebuild = 0.0
+
+    def _overlap_cutoff(self):
+        return datetime.utcnow() - timedelta(seconds=self.sync_overlap)
+
+    def _advance_watermark(self, rows, cutoff):
+        # rows triées par id : on s'arrête à la première ligne récente, dont les id voisins
+        # peuvent encore appartenir à des transactions non validées
+        for row_id, _, created_at in rows:
+            if created_at is not None and created_at >= cutoff:
+                break
+            self._watermark = max(self._watermark, row_id)
+
+    def _on_notify(self, payload):
+        if payload.startswith(VERSION_PREFIX):
+            user_id, version = payload[len(VERSION_PREFIX):].split(':')
+            self._note_token_version(int(user_id), int(version))
+        else:
+            self._note_revoked(payload)
+
+    def _ensure_listener(self):
+        # Thread LISTEN propre à chaque worker (démarré après le fork de gunicorn)
+        if not self.listen or self._listener_pid == os.getpid():
+            return
+        with self._sync_lock:
+            if self._listener_pid == os.getpid() or not self._is_postgresql():
+                self._listener_pid = os.getpid()
+                return
+            self._listener_pid = os.getpid()
+            self._listener = threading.Thread(target=self._listen, name='token-revocation-listener', daemon=True)
+            self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    connection = db.engine.raw_connection()
+                try:
+                    pg = connection.driver_connection
+                    pg.set_session(autocommit=True)
+                    pg.cursor().execute(f"LISTEN {CHANNEL}")
+                    while True:
+                        if select.select([pg], [], [], 60) == ([], [], []):
+                            continue
+                        pg.poll()
+                        while pg.notifies:
+                            self._on_notify(pg.notifies.pop(0).payload)
+                finally:
+                    connection.invalidate()
+            except Exception as e:
+                # Des notifications ont pu être perdues : rattrapage complet au prochain contrôle
+                logger.error(f"Token revocation listener error: {e}")
+                self._last_rebuild = 0.0
+                self._last_sync = 0.0
+                time.sleep(5)
+
+
+token_revocation = TokenRevocationCache()
+
+
+@event.listens_for(MyWittiUser, 'after_update')
+def publish_token_version(mapper, connection, target):
+    """Publie l'incrémentation de token_version (appliquée localement au commit)"""
+    if not inspect(target).attrs.token_version.history.has_changes():
+        return
+    if connection.dialect.name == 'postgresql':
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {'channel': CHANNEL, 'payload': f"{VERSION_PREFIX}{target.id}:{target.token_version}"}
+        )
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('token_versions', {})[target.id] = target.token_version
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_token_versions(session):
+    for user_id, version in session.info.pop('token_versions', {}).items():
+        token_revocation._note_token_version(user_id, version)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_token_versions(session):
+    session.info.pop('token_versions', None)
@@ -0,0 +1,34 @@
+# Services/transaction_classification.py
+import re
+
+DEFAULT_CLASSIFICATION = 'Transaction'
+
+# Mots-clés du motif par type, dans l'ordre de priorité (premier type reconnu retenu)
+CLASSIFICATION_KEYWORDS = (
+    ('Deposit', ('DEPOSIT', 'DÉPÔT', 'AJOUT')),
+    ('Withdrawal', ('WITHDRAWAL', 'RETRAIT', 'SORTIE')),
+    ('Purchase', ('PURCHASE', 'ACHAT', 'COMMANDE')),
+    ('Reward', ('REWARD', 'RÉCOMPENSE', 'BONUS')),
+)
+CLASSIFICATIONS = tuple(name for name, _ in CLASSIFICATION_KEYWORDS) + (DEFAULT_CLASSIFICATION,)
+
+_PRIORITY = {name: rank for rank, name in enumerate(CLASSIFICATIONS)}
+
+# Une seule expression pour tous les mots-clés : un groupe nommé par type
+_MATCHER = re.compile(
+    '|'.join(
+        f"(?P<{name}>{'|'.join(re.escape(keyword) for keyword in keywords)})"
+        for name, keywords in CLASSIFICATION_KEYWORDS
+    ),
+    re.IGNORECASE
+)
+
+
+def classify_motif(motif):
+    """Type de la transaction (Deposit, Withdrawal, Purchase, Reward ou Transaction) d'après son motif"""
+    if not motif:
+        return DEFAULT_CLASSIFICATION
+    found = {match.lastgroup for match in _MATCHER.finditer(motif)}
+    if not found:
+        return DEFAULT_CLASSIFICATION
+    return min(found, key=_PRIORITY.__getitem__)
@@ -0,0 +1,147 @@
+# Services/transaction_history.py
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import case, func, select, tuple_, update
+
+from extensions import db
+from Models.mywitti_jetons_transactions import MyWittiJetonsTransactions
+from Services.pagination import decode_cursor, encode_cursor
+from Services.transaction_classification import classify_motif
+
+STREAM_BATCH_SIZE = 500
+CSV_COLUMNS = ('date', 'amount', 'type')
+
+
+def format_transaction(row):
+    return {
+        'date': row.date_transaction.strftime('%Y-%m-%d %H:%M:%S') if row.date_transaction else "Unknown",
+        'amount': str(row.montant) if row.montant else "0",
+        'type': row.classification or classify_motif(row.motif)
+    }
+
+
+def _period_filter(client_id, period_start, period_end):
+    return (
+        MyWittiJetonsTransactions.client_id == client_id,
+        MyWittiJetonsTransactions.date_transaction >= period_start,
+        MyWittiJetonsTransactions.date_transaction <= period_end
+    )
+
+
+def _ordered_rows(client_id, period_start, period_end):
+    # (client_id, date_transaction) : parcours de idx_transactions_client_date_montant
+    return select(
+        MyWittiJetonsTransactions.id,
+        MyWittiJetonsTransactions.date_transaction,
+        MyWittiJetonsTransactions.montant,
+        MyWittiJetonsTransactions.motif,
+        MyWittiJetonsTransactions.classification
+    ).where(
+        *_period_filter(client_id, period_start, period_end)
+    ).order_by(
+        MyWittiJetonsTransactions.date_transaction.desc(),
+        MyWittiJetonsTransactions.id.desc()
+    )
+
+
+def transaction_page(client_id, period_start, period_end, limit, cursor=None):
+    """Page de transactions (plus récentes d'abord) et curseur de la page suivante (ou None)"""
+    stmt = _ordered_rows(client_id, period_start, period_end)
+    if cursor:
+        # Pagination par clé : reprise strictement après la dernière ligne servie
+        stmt = stmt.where(
+            tuple_(MyWittiJetonsTransactions.date_transaction, MyWittiJetonsTransactions.id)
+            < decode_cursor(cursor, datetime.fromisoformat, int)
+        )
+    rows = db.session.execute(stmt.limit(limit + 1)).all()
+    next_cursor = encode_cursor(rows[limit - 1].date_transaction, rows[limit - 1].id) if len(rows) > limit else None
+    return [format_transaction(row) for row in rows[:limit]], next_cursor
+
+
+def transaction_trends(client_id, period_start, period_end):
+    """Nombre total de transactions et tendances dépôt/retrait sur toute la période.
+
+    Un GROUP BY sur la classification renvoie au plus un compteur par type ; seules les
+    lignes pas encore classées (avant classify_transactions.py) sont regroupées par motif.
+    """
+    unclassified_motif = case(
+        (MyWittiJetonsTransactions.classification.is_(None), MyWittiJetonsTransactions.motif)
+    )
+    counts = db.session.execute(
+        select(
+            MyWittiJetonsTransactions.classification,
+            unclassified_motif,
+            func.count(MyWittiJetonsTransactions.id)
+        ).where(
+            *_period_filter(client_id, period_start, period_end)
+        ).group_by(MyWittiJetonsTransactions.classification, unclassified_motif)
+    ).all()
+    total = sum(count for _, _, count in counts)
+    by_type = {}
+    for classification, motif, count in counts:
+        transaction_type = classification or classify_motif(motif)
+        by_type[transaction_type] = by_type.get(transaction_type, 0) + count
+
+    deposit_percentage = (by_type.get('Deposit', 0) / total * 100) if total > 0 else 0
+    withdrawal_percentage = (by_type.get('Withdrawal', 0) / total * 100) if total > 0 else 0
+    return total, {
+        "deposit_percentage": round(deposit_percentage, 2),
+        "withdrawal_percentage": round(withdrawal_percentage, 2)
+    }
+
+
+def backfill_classifications(batch_size=1000, reclassify=False):
+    """Classe par lots (ordre des id) les transactions sans classification, ou toutes si ``reclassify``.
+
+    Un commit par lot ; retourne le nombre de lignes mises à jour.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        stmt = select(MyWittiJetonsTransactions.id, MyWittiJetonsTransactions.motif).where(
+            MyWittiJetonsTransactions.id > last_id
+        )
+        if not reclassify:
+            stmt = stmt.where(MyWittiJetonsTransactions.classification.is_(None))
+        rows = db.session.execute(stmt.order_by(MyWittiJetonsTransactions.id).limit(batch_size)).all()
+        if not rows:
+            return updated
+
+        ids_by_classification = {}
+        for row in rows:
+            ids_by_classification.setdefault(classify_motif(row.motif), []).append(row.id)
+        # Une instruction UPDATE par type plutôt qu'une par ligne
+        for classification, ids in ids_by_classification.items():
+            db.session.execute(
+                update(MyWittiJetonsTransactions).where(
+                    MyWittiJetonsTransactions.id.in_(ids)
+                ).values(classification=classification).execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+def stream_transactions(client_id, period_start, period_end, export_format='ndjson'):
+    """Générateur de lignes NDJSON ou CSV lues par un curseur côté serveur (yield_per)"""
+    result = db.session.execute(
+        _ordered_rows(client_id, period_start, period_end),
+        execution_options={'yield_per': STREAM_BATCH_SIZE}
+    )
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for row in result:
+            writer.writerow(format_transaction(row))
+            if buffer.tell() >= 8192:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    else:
+        for row in result:
+            yield json.dumps(format_transaction(row), ensure_ascii=False) + "\n"
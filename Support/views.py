@@ -1,9 +1,9 @@
 from flask import Blueprint, current_app, request
 from flask_restx import Api, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
+from flask_jwt_extended import jwt_required
 from Models.mywitti_support_request import MyWittiSupportRequest
 from extensions import db
+from Services.identity import current_identity
 from datetime import datetime
 
 support_bp = Blueprint('support', __name__)
@@ -43,8 +43,9 @@ class SupportContact(Resource):
     @api.marshal_with(support_contact_model)
     def get(self):
         try:
-            identifiant = get_jwt_identity()
-            user = db.session.query(MyWittiUser).filter_by(user_id=identifiant).first()
+            identity = current_identity()
+            identifiant = identity.identifiant
+            user = identity.user
             
             if not user:
                 current_app.logger.warning(f"Support contact failed: User with identifiant {identifiant} not found")
@@ -71,8 +72,9 @@ class CreateSupportRequest(Resource):
     @api.expect(support_request_input_model)
     def post(self):
         try:
-            identifiant = get_jwt_identity()
-            user = db.session.query(MyWittiUser).filter_by(user_id=identifiant).first()
+            identity = current_identity()
+            identifiant = identity.identifiant
+            user = identity.user
             
             if not user:
                 current_app.logger.warning(f"Support request failed: User with identifiant {identifiant} not found")
@@ -1,10 +1,9 @@
 from flask import Blueprint, current_app, request
 from flask_restx import Api, Resource, fields
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from Models.mywitti_users import MyWittiUser
-from Models.mywitti_client import MyWittiClient
+from flask_jwt_extended import jwt_required
 from Models.mywitti_survey import MyWittiSurvey, MyWittiSurveyOption, MyWittiSurveyResponse
 from extensions import db
+from Services.identity import current_identity
 from datetime import datetime
 
 survey_bp = Blueprint('survey', __name__)
@@ -111,17 +110,18 @@ class SurveyResponse(Resource):
     def post(self, survey_id):
         try:
             # Récupération sécurisée de l'utilisateur
-            user_identifiant = get_jwt_identity()
+            identity = current_identity()
+            user_identifiant = identity.identifiant
             current_app.logger.info(f"Tentative de réponse au sondage {survey_id} par {user_identifiant}")
             
             # Vérification que l'utilisateur existe et est actif
-            user = MyWittiUser.query.filter_by(user_id=user_identifiant).first()
+            user = identity.user
             if not user or not user.is_active:
                 current_app.logger.error(f"Utilisateur {user_identifiant} non trouvé ou inactif")
                 return {"message": "Utilisateur non trouvé ou inactif"}, 404
             
             # Vérification que le client existe
-            customer = MyWittiClient.query.filter_by(customer_code=user_identifiant).first()
+            customer = identity.client
             if not customer:
                 current_app.logger.error(f"Client non trouvé pour identifiant {user_identifiant}")
                 return {"message": "Client non trouvé"}, 404
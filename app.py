@@ -3,12 +3,27 @@ import logging
 import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from flask import Flask, request, send_from_directory
+from flask import Flask, g, request, send_from_directory
 from flask_cors import CORS
-from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 from Models.page_visit import PageVisit
+from Models.page_visit_hourly import PageVisitHourly
+from Models.resource_version import ResourceVersion
+from Models.order_idempotency import OrderIdempotency
+from Models.mywitti_order import MyWittiOrder
+from Models.mywitti_order_line import MyWittiOrderLine
+from Models.mywitti_jetons_holds import MyWittiJetonsHold
 from config import config
 from extensions import db, ma, jwt, migrate
+from Services.page_visit_buffer import page_visit_buffer
+from Services.identity import identity_from_token, load_identity  # enregistre le chargeur d'identité JWT
+from Services.token_revocation import token_revocation
+from Services.password_hashing import password_hasher
+from Services.tiers import tier_service
+from Services.customer_dashboard import customer_dashboard
+from Services.notification_stream import notification_stream
+from Services.jetons_history import jetons_history
+from Services.reward_catalog import reward_catalog
+from Services.cart import cart_cache
 
 # Importation des modèles
 from Models.mywitti_survey import MyWittiSurvey, MyWittiSurveyOption, MyWittiSurveyResponse
@@ -34,9 +49,9 @@ from Models.mywitti_advertisement import MyWittiAdvertisement
 
 @jwt.token_in_blocklist_loader
 def check_if_token_is_revoked(jwt_header, jwt_payload):
-    jti = jwt_payload['jti']
-    token = db.session.query(TokenBlacklist).filter_by(jti=jti).first()
-    return token is not None
+    # Filtre de Bloom en mémoire : la base n'est consultée qu'en cas de présence possible.
+    # Jetons révoqués à la déconnexion, ou émis avant un changement de mot de passe/rôle
+    return token_revocation.is_revoked(jwt_payload['jti']) or token_revocation.is_stale(jwt_payload)
 
 def create_app(config_name=None):
     # Déterminer la configuration à utiliser - forcer le développement par défaut
@@ -50,7 +65,8 @@ def create_app(config_name=None):
     app.config.from_object(config[config_name])
     
     # Configuration CORS
-    CORS(app, origins=app.config.get('CORS_ORIGINS', '*'))
+    # En-têtes lisibles par les clients navigateur (pagination admin, requêtes conditionnelles)
+    CORS(app, origins=app.config.get('CORS_ORIGINS', '*'), expose_headers=['X-Next-Cursor', 'ETag', 'Idempotent-Replayed'])
     
     # Configuration du logging
     logging.basicConfig(
@@ -69,6 +85,15 @@ def create_app(config_name=None):
     ma.init_app(app)
     jwt.init_app(app)
     migrate.init_app(app, db)
+    page_visit_buffer.init_app(app)
+    token_revocation.init_app(app)
+    password_hasher.init_app(app)
+    tier_service.init_app(app)
+    customer_dashboard.init_app(app)
+    notification_stream.init_app(app)
+    jetons_history.init_app(app)
+    reward_catalog.init_app(app)
+    cart_cache.init_app(app)
 
     # Importation des blueprints après l'initialisation
     from Account.views import accounts_bp
@@ -106,33 +131,23 @@ def create_app(config_name=None):
         return {"error": "Erreur interne du serveur"}, 500
 
     # Enregistrer les visites de pages
-    @app.before_request
-    def track_page_visit():
+    @app.after_request
+    def track_page_visit(response):
         # Ignorer les requêtes OPTIONS (CORS preflight)
         if request.method == 'OPTIONS':
-            return
-
-        path = request.path
-        user_id = None
-        
-        try:
-            # Vérifier si un jeton est présent avant de récupérer l'identité
-            if 'Authorization' in request.headers:
-                verify_jwt_in_request()  # Vérifie le jeton sans exiger @jwt_required
-                identifiant = get_jwt_identity()
-                if identifiant:
-                    user = MyWittiUser.query.filter_by(user_id=identifiant).first()
-                    user_id = user.id if user else None
-        except Exception as e:
-            app.logger.warning(f"Erreur lors de la récupération de l'identité : {e}")
-        
-        try:
-            page_visit = PageVisit(path=path, user_id=user_id)
-            db.session.add(page_visit)
-            db.session.commit()
-        except Exception as e:
-            app.logger.error(f"Erreur lors de l'enregistrement de la visite : {e}")
-            db.session.rollback()
+            return response
+
+        # L'identité a déjà été résolue par @jwt_required (g.identity) ; ailleurs, un
+        # jeton présent est attribué par ses claims, sans requête supplémentaire
+        identity = g.get('identity') or identity_from_token()
+        user_id = identity.user_id if identity else None
+        user_type = None
+        if identity and identity.role:
+            user_type = 'admin' if identity.is_admin else 'customer'
+
+        # Écriture différée : la visite est insérée par lots hors du chemin de la requête
+        page_visit_buffer.record(request.path, user_id, user_type)
+        return response
 
     return app
 
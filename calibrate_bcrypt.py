@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+Script de calibrage du coût bcrypt.
+Mesure la durée d'un hachage pour chaque coût sur la machine courante et recommande
+le coût le plus élevé qui reste sous la durée cible (250 ms par défaut).
+À lancer sur la machine de production, puis reporter la valeur dans BCRYPT_ROUNDS.
+Usage : python calibrate_bcrypt.py [durée_cible_ms]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from Services.password_hashing import benchmark, calibrate
+
+def main():
+    """Affiche les mesures et le coût recommandé"""
+    target_ms = float(sys.argv[1]) if len(sys.argv) > 1 else 250
+    for rounds in range(10, 15):
+        print(f"  coût {rounds} : {benchmark(rounds) * 1000:.0f} ms")
+    rounds = calibrate(target_seconds=target_ms / 1000)
+    print(f"✓ Coût recommandé pour {target_ms:.0f} ms : BCRYPT_ROUNDS={rounds}")
+    print("  Les hashes existants seront réécrits à ce coût à la prochaine connexion")
+
+if __name__ == "__main__":
+    main()
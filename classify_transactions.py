@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Script de classification des transactions de jetons existantes.
+Renseigne par lots la colonne classification des transactions antérieures à son ajout
+(les nouvelles transactions sont classées à l'écriture).
+Avec --all, reclasse toutes les transactions (après modification des mots-clés).
+Usage : python classify_transactions.py [--all] [taille_lot]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from Services.transaction_history import backfill_classifications
+
+def main():
+    """Lance la classification dans le contexte de l'application"""
+    args = sys.argv[1:]
+    reclassify = '--all' in args
+    if reclassify:
+        args.remove('--all')
+    batch_size = int(args[0]) if args else 1000
+    with app.app_context():
+        updated = backfill_classifications(batch_size=batch_size, reclassify=reclassify)
+        print(f"✓ {updated} transaction(s) classée(s)")
+
+if __name__ == "__main__":
+    main()
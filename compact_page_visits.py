@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Script de compaction des visites de pages.
+Replie les visites brutes non encore comptées dans page_visit_hourly, puis supprime
+les visites brutes plus anciennes que PAGE_VISIT_RETENTION_DAYS.
+À planifier périodiquement (ex: cron Render toutes les heures).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from Services.page_visit_rollup import compact_page_visits
+
+def main():
+    """Lance la compaction dans le contexte de l'application"""
+    with app.app_context():
+        retention_days = app.config.get('PAGE_VISIT_RETENTION_DAYS', 30)
+        folded, purged = compact_page_visits(retention_days=retention_days)
+        print(f"✓ {folded} visite(s) repliée(s) dans page_visit_hourly")
+        print(f"✓ {purged} visite(s) brute(s) de plus de {retention_days} jours supprimée(s)")
+
+if __name__ == "__main__":
+    main()
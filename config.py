@@ -36,6 +36,91 @@ class Config:
     # Configuration des logs
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     
+    # Configuration du suivi des visites (écriture différée par lots)
+    PAGE_VISIT_BUFFER_ENABLED = os.environ.get('PAGE_VISIT_BUFFER_ENABLED', 'true').lower() == 'true'
+    PAGE_VISIT_BUFFER_SIZE = int(os.environ.get('PAGE_VISIT_BUFFER_SIZE', 10000))
+    PAGE_VISIT_BATCH_SIZE = int(os.environ.get('PAGE_VISIT_BATCH_SIZE', 500))
+    PAGE_VISIT_FLUSH_INTERVAL = float(os.environ.get('PAGE_VISIT_FLUSH_INTERVAL', 2.0))
+    PAGE_VISIT_RETENTION_DAYS = int(os.environ.get('PAGE_VISIT_RETENTION_DAYS', 30))
+    
+    # Configuration du cache des jetons révoqués (filtre de Bloom par worker)
+    TOKEN_REVOCATION_CACHE_ENABLED = os.environ.get('TOKEN_REVOCATION_CACHE_ENABLED', 'true').lower() == 'true'
+    TOKEN_REVOCATION_SYNC_INTERVAL = float(os.environ.get('TOKEN_REVOCATION_SYNC_INTERVAL', 30))
+    TOKEN_REVOCATION_REBUILD_INTERVAL = float(os.environ.get('TOKEN_REVOCATION_REBUILD_INTERVAL', 3600))
+    TOKEN_REVOCATION_SYNC_OVERLAP = float(os.environ.get('TOKEN_REVOCATION_SYNC_OVERLAP', 120))
+    TOKEN_REVOCATION_BLOOM_CAPACITY = int(os.environ.get('TOKEN_REVOCATION_BLOOM_CAPACITY', 100000))
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE = float(os.environ.get('TOKEN_REVOCATION_BLOOM_ERROR_RATE', 0.001))
+    TOKEN_REVOCATION_LISTEN = os.environ.get('TOKEN_REVOCATION_LISTEN', 'true').lower() == 'true'
+    
+    # Configuration du hachage des mots de passe (coût à calibrer avec calibrate_bcrypt.py)
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+    PASSWORD_POOL_SIZE = int(os.environ.get('PASSWORD_POOL_SIZE', 4))
+    PASSWORD_POOL_MAX_PENDING = int(os.environ.get('PASSWORD_POOL_MAX_PENDING', 16))
+    PASSWORD_VERIFY_TIMEOUT = float(os.environ.get('PASSWORD_VERIFY_TIMEOUT', 10))
+    
+    # Durée de vie du cache des paliers (mywitti_category) pour les changements faits par un autre worker
+    TIER_CACHE_TTL = float(os.environ.get('TIER_CACHE_TTL', 300))
+    
+    # Cache du tableau de bord client (invalidé à chaque transaction de jetons)
+    DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', 300))
+    DASHBOARD_CACHE_SIZE = int(os.environ.get('DASHBOARD_CACHE_SIZE', 10000))
+    
+    # Pagination de l'historique des transactions (curseur)
+    TRANSACTIONS_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_PAGE_SIZE', 100))
+    TRANSACTIONS_MAX_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_MAX_PAGE_SIZE', 500))
+    
+    # Pagination des notifications client (curseur)
+    NOTIFICATIONS_PAGE_SIZE = int(os.environ.get('NOTIFICATIONS_PAGE_SIZE', 50))
+    NOTIFICATIONS_MAX_PAGE_SIZE = int(os.environ.get('NOTIFICATIONS_MAX_PAGE_SIZE', 200))
+    
+    # Flux SSE des notifications (/customer/notifications/stream, /admin/notifications/stream)
+    NOTIFICATION_STREAM_HEARTBEAT = float(os.environ.get('NOTIFICATION_STREAM_HEARTBEAT', 15))
+    NOTIFICATION_STREAM_QUEUE_SIZE = int(os.environ.get('NOTIFICATION_STREAM_QUEUE_SIZE', 100))
+    NOTIFICATION_STREAM_RETRY_MS = int(os.environ.get('NOTIFICATION_STREAM_RETRY_MS', 5000))
+    NOTIFICATION_STREAM_LISTEN = os.environ.get('NOTIFICATION_STREAM_LISTEN', 'true').lower() == 'true'
+    
+    # Requêtes conditionnelles (ETag / If-None-Match) des ressources client
+    ETAG_ENABLED = os.environ.get('ETAG_ENABLED', 'true').lower() == 'true'
+    ETAG_MAX_AGE = int(os.environ.get('ETAG_MAX_AGE', 300))
+    
+    # Nombre maximal d'emails par invitation groupée (/customer/invite/batch)
+    REFERRAL_INVITE_MAX_BATCH = int(os.environ.get('REFERRAL_INVITE_MAX_BATCH', 100))
+    
+    # Pagination des parrainages (/customer/my-referrals, /admin/referrals)
+    REFERRALS_PAGE_SIZE = int(os.environ.get('REFERRALS_PAGE_SIZE', 50))
+    REFERRALS_MAX_PAGE_SIZE = int(os.environ.get('REFERRALS_MAX_PAGE_SIZE', 200))
+    
+    # Durée de vie du catalogue des récompenses (/lot/rewards) pour les changements faits par un autre worker
+    REWARD_CATALOG_TTL = float(os.environ.get('REWARD_CATALOG_TTL', 60))
+    
+    # Pagination des requêtes filtrées du catalogue (/lot/rewards?sort=...&limit=...)
+    REWARDS_PAGE_SIZE = int(os.environ.get('REWARDS_PAGE_SIZE', 50))
+    REWARDS_MAX_PAGE_SIZE = int(os.environ.get('REWARDS_MAX_PAGE_SIZE', 200))
+    
+    # Recherche approximative dans le catalogue (/lot/rewards/search)
+    REWARD_SEARCH_LIMIT = int(os.environ.get('REWARD_SEARCH_LIMIT', 20))
+    REWARD_SEARCH_MAX_LIMIT = int(os.environ.get('REWARD_SEARCH_MAX_LIMIT', 50))
+    
+    # Nombre maximal d'articles par mise à jour du panier (PUT /lot/cart)
+    CART_MAX_ITEMS = int(os.environ.get('CART_MAX_ITEMS', 100))
+    
+    # Durée de conservation des réponses rejouées par Idempotency-Key (/lot/place-order, secondes)
+    IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 86400))
+    
+    # Durée de réservation des jetons d'une commande en attente (secondes) ; passée ce délai,
+    # expire_jetons_holds.py annule la commande et libère les jetons
+    JETONS_HOLD_TTL = int(os.environ.get('JETONS_HOLD_TTL', 604800))
+    
+    # Cache des paniers (invalidé à chaque modification du panier ou d'un lot)
+    CART_CACHE_TTL = float(os.environ.get('CART_CACHE_TTL', 300))
+    CART_CACHE_SIZE = int(os.environ.get('CART_CACHE_SIZE', 10000))
+    
+    # Courbe du solde de jetons (/customer/jetons-history) : nombre de points et cache des séries réduites
+    JETONS_HISTORY_POINTS = int(os.environ.get('JETONS_HISTORY_POINTS', 300))
+    JETONS_HISTORY_MAX_POINTS = int(os.environ.get('JETONS_HISTORY_MAX_POINTS', 1000))
+    JETONS_HISTORY_CACHE_TTL = float(os.environ.get('JETONS_HISTORY_CACHE_TTL', 900))
+    JETONS_HISTORY_CACHE_SIZE = int(os.environ.get('JETONS_HISTORY_CACHE_SIZE', 2000))
+    
     # Liste des pays
     COUNTRY_LIST = {
         1: "Côte d'Ivoire",
@@ -59,6 +144,10 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # Écriture synchrone pour que les tests voient les visites immédiatement
+    PAGE_VISIT_BUFFER_ENABLED = False
+    # Coût minimal : les tests créent et vérifient beaucoup de mots de passe
+    BCRYPT_ROUNDS = 4
 
 # Configuration par défaut selon l'environnement
 config = {
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Script d'expiration des réservations de jetons.
+Annule en masse les commandes restées en attente au-delà de JETONS_HOLD_TTL et
+libère les jetons qu'elles réservaient (le client est notifié).
+À planifier périodiquement (ex: cron Render toutes les heures).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from extensions import db
+from Services.orders import expire_orders
+
+def main():
+    """Lance l'expiration dans le contexte de l'application"""
+    with app.app_context():
+        try:
+            expired = expire_orders()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        print(f"✓ {expired} commande(s) expirée(s), jetons réservés libérés")
+
+if __name__ == "__main__":
+    main()
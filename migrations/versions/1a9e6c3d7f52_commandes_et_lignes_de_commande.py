@@ -0,0 +1,146 @@
+"""commandes et lignes de commande
+
+Revision ID: 1a9e6c3d7f52
+Revises: f7b2d4e8c136
+Create Date: 2026-10-18 23:52:06.184377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1a9e6c3d7f52'
+down_revision = 'f7b2d4e8c136'
+branch_labels = None
+depends_on = None
+
+
+# Lignes commandées du même client, au même statut et au même instant : une commande
+# (place-order date toutes les lignes d'une commande du même instant ; les lignes plus
+# anciennes, datées à l'ajout au panier, deviennent chacune une commande)
+SAME_ORDER = (
+    "commande.client_id = mywitti_lots_claims.client_id "
+    "AND commande.statut = mywitti_lots_claims.statut "
+    "AND (commande.date_reclamation = mywitti_lots_claims.date_reclamation "
+    "OR (commande.date_reclamation IS NULL AND mywitti_lots_claims.date_reclamation IS NULL))"
+)
+# 'en_attente' : réclamations antérieures au panier (statut par défaut), encore à valider
+ORDERED = "mywitti_lots_claims.statut IN ('en_attente', 'pending', 'validated', 'cancelled')"
+ORDER_STATUT = "CASE WHEN mywitti_lots_claims.statut = 'en_attente' THEN 'pending' ELSE mywitti_lots_claims.statut END"
+
+
+def upgrade():
+    op.create_table('mywitti_order',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.BigInteger(), nullable=False),
+    sa.Column('statut', sa.String(length=50), nullable=False),
+    sa.Column('amount', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('processed_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['mywitti_client.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('mywitti_order', schema=None) as batch_op:
+        batch_op.create_index('idx_orders_client', ['client_id', 'statut'], unique=False)
+        batch_op.create_index('idx_orders_statut_date', ['statut', 'created_at'], unique=False)
+
+    op.create_table('mywitti_order_line',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('lot_id', sa.Integer(), nullable=True),
+    sa.Column('libelle', sa.String(length=100), nullable=False),
+    sa.Column('jetons', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['lot_id'], ['mywitti_lots.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['order_id'], ['mywitti_order.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('mywitti_order_line', schema=None) as batch_op:
+        batch_op.create_index('idx_order_lines_lot', ['lot_id'], unique=False)
+        batch_op.create_index('idx_order_lines_order', ['order_id'], unique=False)
+
+    # Commandes existantes : id de leur plus ancienne ligne, montant réservé s'il existe ;
+    # les réclamations en_attente deviennent des commandes en attente (sans réservation,
+    # validate_order vérifie alors le solde disponible)
+    op.execute(
+        "INSERT INTO mywitti_order (id, client_id, statut, amount, created_at) "
+        f"SELECT min(mywitti_lots_claims.id), mywitti_lots_claims.client_id, {ORDER_STATUT}, "
+        "sum(coalesce(mywitti_jetons_holds.amount, coalesce(mywitti_lots.jetons, 0) * mywitti_lots_claims.quantity)), "
+        "coalesce(mywitti_lots_claims.date_reclamation, CURRENT_TIMESTAMP) "
+        "FROM mywitti_lots_claims "
+        "JOIN mywitti_lots ON mywitti_lots.id = mywitti_lots_claims.lot_id "
+        "LEFT JOIN mywitti_jetons_holds ON mywitti_jetons_holds.claim_id = mywitti_lots_claims.id "
+        f"WHERE {ORDERED} "
+        "GROUP BY mywitti_lots_claims.client_id, mywitti_lots_claims.statut, mywitti_lots_claims.date_reclamation"
+    )
+    # Lignes : id de la ligne du panier d'origine (référencée par les réservations)
+    op.execute(
+        "INSERT INTO mywitti_order_line (id, order_id, lot_id, libelle, jetons, quantity) "
+        "SELECT mywitti_lots_claims.id, "
+        f"(SELECT min(commande.id) FROM mywitti_lots_claims AS commande WHERE {SAME_ORDER}), "
+        "mywitti_lots_claims.lot_id, mywitti_lots.libelle, coalesce(mywitti_lots.jetons, 0), mywitti_lots_claims.quantity "
+        "FROM mywitti_lots_claims "
+        "JOIN mywitti_lots ON mywitti_lots.id = mywitti_lots_claims.lot_id "
+        f"WHERE {ORDERED}"
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in ('mywitti_order', 'mywitti_order_line'):
+            op.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"coalesce((SELECT max(id) FROM {table}), 0) + 1, false)"
+            )
+
+    # Réservations rattachées à la commande plutôt qu'à la ligne
+    with op.batch_alter_table('mywitti_jetons_holds', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('order_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE mywitti_jetons_holds SET order_id = ("
+        "SELECT order_id FROM mywitti_order_line WHERE mywitti_order_line.id = mywitti_jetons_holds.claim_id)"
+    )
+    with op.batch_alter_table('mywitti_jetons_holds', schema=None) as batch_op:
+        # Contrainte d'unicité et clé étrangère de claim_id supprimées avec la colonne
+        batch_op.drop_column('claim_id')
+        batch_op.create_foreign_key(
+            'mywitti_jetons_holds_order_id_fkey', 'mywitti_order', ['order_id'], ['id'], ondelete='SET NULL'
+        )
+        batch_op.create_index('idx_holds_order', ['order_id'], unique=False)
+
+    # La table des réclamations ne porte plus que les paniers
+    op.execute(f"DELETE FROM mywitti_lots_claims WHERE {ORDERED}")
+    with op.batch_alter_table('mywitti_lots_claims', schema=None) as batch_op:
+        batch_op.drop_index('idx_claims_lot')
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_lots_claims', schema=None) as batch_op:
+        batch_op.create_index('idx_claims_lot', ['lot_id', 'statut'], unique=False)
+    # Une réclamation par ligne ; les réservations perdent leur lien (libérées à l'expiration)
+    op.execute(
+        "INSERT INTO mywitti_lots_claims (client_id, lot_id, date_reclamation, statut, quantity) "
+        "SELECT mywitti_order.client_id, mywitti_order_line.lot_id, mywitti_order.created_at, "
+        "mywitti_order.statut, mywitti_order_line.quantity "
+        "FROM mywitti_order_line JOIN mywitti_order ON mywitti_order.id = mywitti_order_line.order_id "
+        "WHERE mywitti_order_line.lot_id IS NOT NULL"
+    )
+
+    with op.batch_alter_table('mywitti_jetons_holds', schema=None) as batch_op:
+        batch_op.drop_index('idx_holds_order')
+        batch_op.drop_constraint('mywitti_jetons_holds_order_id_fkey', type_='foreignkey')
+        batch_op.drop_column('order_id')
+        batch_op.add_column(sa.Column('claim_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'mywitti_jetons_holds_claim_id_fkey', 'mywitti_lots_claims', ['claim_id'], ['id'], ondelete='SET NULL'
+        )
+        batch_op.create_unique_constraint('mywitti_jetons_holds_claim_id_key', ['claim_id'])
+
+    with op.batch_alter_table('mywitti_order_line', schema=None) as batch_op:
+        batch_op.drop_index('idx_order_lines_order')
+        batch_op.drop_index('idx_order_lines_lot')
+
+    op.drop_table('mywitti_order_line')
+    with op.batch_alter_table('mywitti_order', schema=None) as batch_op:
+        batch_op.drop_index('idx_orders_statut_date')
+        batch_op.drop_index('idx_orders_client')
+
+    op.drop_table('mywitti_order')
@@ -0,0 +1,29 @@
+"""expiration des jetons révoqués
+
+Revision ID: 3c5e0f9a7d21
+Revises: 8611bbccf8a7
+Create Date: 2026-10-18 11:03:27.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c5e0f9a7d21'
+down_revision = '8611bbccf8a7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Les lignes existantes gardent expires_at à NULL : purgées d'après created_at
+    with op.batch_alter_table('token_blacklist', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('expires_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_token_blacklist_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('token_blacklist', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_token_blacklist_expires_at'))
+        batch_op.drop_column('expires_at')
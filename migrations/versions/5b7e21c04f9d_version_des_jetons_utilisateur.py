@@ -0,0 +1,28 @@
+"""version des jetons utilisateur
+
+Revision ID: 5b7e21c04f9d
+Revises: 3c5e0f9a7d21
+Create Date: 2026-10-18 13:26:52.640175
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7e21c04f9d'
+down_revision = '3c5e0f9a7d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mywitti_users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('idx_users_token_version', ['id', 'token_version'], unique=False, postgresql_where=sa.text('token_version > 0'))
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_users', schema=None) as batch_op:
+        batch_op.drop_index('idx_users_token_version')
+        batch_op.drop_column('token_version')
@@ -0,0 +1,48 @@
+"""cumul horaire des visites
+
+Revision ID: 8611bbccf8a7
+Revises: 76a92ea6abbe
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8611bbccf8a7'
+down_revision = '76a92ea6abbe'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('page_visit_hourly',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(length=255), nullable=False),
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('user_type', sa.String(length=50), nullable=False),
+    sa.Column('visit_count', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('path', 'hour', 'user_type', name='page_visit_hourly_ukey')
+    )
+    with op.batch_alter_table('page_visit_hourly', schema=None) as batch_op:
+        batch_op.create_index('idx_page_visit_hourly_hour', ['hour'], unique=False)
+
+    # Les visites existantes restent à replier par compact_page_visits.py
+    with op.batch_alter_table('page_visit', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rolled_up', sa.Boolean(), server_default=sa.false(), nullable=False))
+        batch_op.create_index('idx_page_visit_not_rolled_up', ['id'], unique=False, postgresql_where=sa.text('rolled_up = false'))
+        batch_op.create_index('idx_page_visit_timestamp', ['timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('page_visit', schema=None) as batch_op:
+        batch_op.drop_index('idx_page_visit_timestamp')
+        batch_op.drop_index('idx_page_visit_not_rolled_up')
+        batch_op.drop_column('rolled_up')
+
+    with op.batch_alter_table('page_visit_hourly', schema=None) as batch_op:
+        batch_op.drop_index('idx_page_visit_hourly_hour')
+
+    op.drop_table('page_visit_hourly')
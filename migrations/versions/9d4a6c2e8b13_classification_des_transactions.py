@@ -0,0 +1,29 @@
+"""classification des transactions
+
+Revision ID: 9d4a6c2e8b13
+Revises: 5b7e21c04f9d
+Create Date: 2026-10-18 15:12:08.402217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a6c2e8b13'
+down_revision = '5b7e21c04f9d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Les transactions existantes restent à NULL : classées par classify_transactions.py
+    with op.batch_alter_table('mywitti_jetons_transactions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('classification', sa.String(length=20), nullable=True))
+        batch_op.create_index('idx_transactions_client_date_classification', ['client_id', 'date_transaction', 'classification'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_jetons_transactions', schema=None) as batch_op:
+        batch_op.drop_index('idx_transactions_client_date_classification')
+        batch_op.drop_column('classification')
@@ -0,0 +1,32 @@
+"""index des parrainages
+
+Revision ID: a4d19e7c3b58
+Revises: f3a9c0d57e12
+Create Date: 2026-10-18 18:40:12.361078
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4d19e7c3b58'
+down_revision = 'f3a9c0d57e12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mywitti_referral', schema=None) as batch_op:
+        batch_op.create_index('idx_referral_created', ['created_at', 'id'], unique=False)
+        batch_op.create_index('idx_referral_referrer_created', ['referrer_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('idx_referral_referrer_status', ['referrer_id', 'status'], unique=False)
+        batch_op.create_index('idx_referral_status_created', ['status', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_referral', schema=None) as batch_op:
+        batch_op.drop_index('idx_referral_status_created')
+        batch_op.drop_index('idx_referral_referrer_status')
+        batch_op.drop_index('idx_referral_referrer_created')
+        batch_op.drop_index('idx_referral_created')
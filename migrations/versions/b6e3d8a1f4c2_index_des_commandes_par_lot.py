@@ -0,0 +1,26 @@
+"""index des commandes par lot
+
+Revision ID: b6e3d8a1f4c2
+Revises: a4d19e7c3b58
+Create Date: 2026-10-18 19:52:37.204815
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e3d8a1f4c2'
+down_revision = 'a4d19e7c3b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mywitti_lots_claims', schema=None) as batch_op:
+        batch_op.create_index('idx_claims_lot', ['lot_id', 'statut'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_lots_claims', schema=None) as batch_op:
+        batch_op.drop_index('idx_claims_lot')
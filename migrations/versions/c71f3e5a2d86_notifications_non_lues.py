@@ -0,0 +1,45 @@
+"""notifications non lues
+
+Revision ID: c71f3e5a2d86
+Revises: 9d4a6c2e8b13
+Create Date: 2026-10-18 16:04:51.730912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c71f3e5a2d86'
+down_revision = '9d4a6c2e8b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # is_read NULL était affiché comme non lu
+    op.execute("UPDATE mywitti_notification SET is_read = false WHERE is_read IS NULL")
+    with op.batch_alter_table('mywitti_notification', schema=None) as batch_op:
+        batch_op.alter_column('is_read', existing_type=sa.Boolean(), nullable=False, server_default=sa.false())
+        batch_op.create_index('idx_notification_user_id', ['user_id', 'id'], unique=False)
+        batch_op.create_index('idx_notification_user_unread', ['user_id'], unique=False, postgresql_where=sa.text('is_read = false'))
+
+    with op.batch_alter_table('mywitti_users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False))
+
+    # Compteur initial, ensuite tenu à jour par l'application
+    op.execute(
+        "UPDATE mywitti_users SET unread_notifications = ("
+        "SELECT count(*) FROM mywitti_notification "
+        "WHERE mywitti_notification.user_id = mywitti_users.id AND mywitti_notification.is_read = false)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_users', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications')
+
+    with op.batch_alter_table('mywitti_notification', schema=None) as batch_op:
+        batch_op.drop_index('idx_notification_user_unread')
+        batch_op.drop_index('idx_notification_user_id')
+        batch_op.alter_column('is_read', existing_type=sa.Boolean(), nullable=True, server_default=None)
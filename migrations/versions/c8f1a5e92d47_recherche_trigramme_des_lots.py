@@ -0,0 +1,35 @@
+"""recherche trigramme des lots
+
+Revision ID: c8f1a5e92d47
+Revises: b6e3d8a1f4c2
+Create Date: 2026-10-18 20:31:04.518392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c8f1a5e92d47'
+down_revision = 'b6e3d8a1f4c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.batch_alter_table('mywitti_lots', schema=None) as batch_op:
+        batch_op.create_index(
+            'idx_lots_libelle_trgm',
+            ['libelle'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'libelle': 'gin_trgm_ops'}
+        )
+
+
+def downgrade():
+    # L'extension pg_trgm est conservée : d'autres objets de la base peuvent en dépendre
+    with op.batch_alter_table('mywitti_lots', schema=None) as batch_op:
+        batch_op.drop_index('idx_lots_libelle_trgm', postgresql_using='gin')
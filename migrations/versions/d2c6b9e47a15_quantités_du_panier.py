@@ -0,0 +1,49 @@
+"""quantités du panier
+
+Revision ID: d2c6b9e47a15
+Revises: c8f1a5e92d47
+Create Date: 2026-10-18 21:14:48.730261
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2c6b9e47a15'
+down_revision = 'c8f1a5e92d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mywitti_lots_claims', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('quantity', sa.Integer(), server_default='1', nullable=False))
+
+    # Lignes de panier en double (ajouts concurrents) : regroupées sur la plus ancienne
+    op.execute(
+        "UPDATE mywitti_lots_claims SET quantity = ("
+        "SELECT count(*) FROM mywitti_lots_claims AS doublon "
+        "WHERE doublon.client_id = mywitti_lots_claims.client_id "
+        "AND doublon.lot_id = mywitti_lots_claims.lot_id AND doublon.statut = 'cart') "
+        "WHERE statut = 'cart'"
+    )
+    op.execute(
+        "DELETE FROM mywitti_lots_claims WHERE statut = 'cart' AND id NOT IN ("
+        "SELECT min(id) FROM mywitti_lots_claims WHERE statut = 'cart' GROUP BY client_id, lot_id)"
+    )
+
+    with op.batch_alter_table('mywitti_lots_claims', schema=None) as batch_op:
+        batch_op.create_index(
+            'idx_claims_cart_unique',
+            ['client_id', 'lot_id'],
+            unique=True,
+            postgresql_where=sa.text("statut = 'cart'"),
+            sqlite_where=sa.text("statut = 'cart'")
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_lots_claims', schema=None) as batch_op:
+        batch_op.drop_index('idx_claims_cart_unique')
+        batch_op.drop_column('quantity')
@@ -0,0 +1,29 @@
+"""versions des ressources
+
+Revision ID: e2b84d1f6a37
+Revises: c71f3e5a2d86
+Create Date: 2026-10-18 17:21:36.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b84d1f6a37'
+down_revision = 'c71f3e5a2d86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('resource_version',
+    sa.Column('scope', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.BigInteger(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('scope', 'entity_id')
+    )
+
+
+def downgrade():
+    op.drop_table('resource_version')
@@ -0,0 +1,32 @@
+"""idempotence des commandes
+
+Revision ID: e5a7c3f19b64
+Revises: d2c6b9e47a15
+Create Date: 2026-10-18 22:02:19.648203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c3f19b64'
+down_revision = 'd2c6b9e47a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('order_idempotency',
+    sa.Column('client_id', sa.BigInteger(), nullable=False),
+    sa.Column('idempotency_key', sa.String(length=255), nullable=False),
+    sa.Column('status_code', sa.Integer(), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['client_id'], ['mywitti_client.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('client_id', 'idempotency_key')
+    )
+
+
+def downgrade():
+    op.drop_table('order_idempotency')
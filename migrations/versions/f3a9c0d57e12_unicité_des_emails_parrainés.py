@@ -0,0 +1,61 @@
+"""unicité des emails parrainés
+
+Revision ID: f3a9c0d57e12
+Revises: e2b84d1f6a37
+Create Date: 2026-10-18 18:02:44.905163
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c0d57e12'
+down_revision = 'e2b84d1f6a37'
+branch_labels = None
+depends_on = None
+
+
+# Rang des statuts (deux vocabulaires coexistent : seed/API et administration)
+STATUS_RANK = {
+    'pending': 1, 'En cours': 1,
+    'accepted': 2, 'Accepté': 2,
+    'rewarded': 3, 'Récompensé': 3,
+}
+
+
+def upgrade():
+    referrals = sa.table(
+        'mywitti_referral',
+        sa.column('id', sa.Integer),
+        sa.column('referred_email', sa.String),
+        sa.column('status', sa.String),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(referrals.c.id, referrals.c.referred_email, referrals.c.status)).all()
+
+    # Emails normalisés en Python comme à l'insertion (normalize_email : strip + casefold),
+    # lower()/trim() SQL ne repliant pas la casse de la même façon
+    kept = {}
+    for row in rows:
+        email = (row.referred_email or '').strip().casefold()
+        rank = (-STATUS_RANK.get(row.status, 0), row.id)
+        if email not in kept or rank < kept[email][0]:
+            kept[email] = (rank, row)
+
+    # Doublons (casse différente ou insertions concurrentes) : on garde le statut le plus
+    # avancé, puis le premier parrainage
+    kept_ids = {row.id for _, row in kept.values()}
+    duplicates = [row.id for row in rows if row.id not in kept_ids]
+    if duplicates:
+        bind.execute(referrals.delete().where(referrals.c.id.in_(duplicates)))
+    for email, (_, row) in kept.items():
+        if row.referred_email != email:
+            bind.execute(referrals.update().where(referrals.c.id == row.id).values(referred_email=email))
+    with op.batch_alter_table('mywitti_referral', schema=None) as batch_op:
+        batch_op.create_index('idx_referral_referred_email', ['referred_email'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_referral', schema=None) as batch_op:
+        batch_op.drop_index('idx_referral_referred_email')
@@ -0,0 +1,51 @@
+"""réservation des jetons
+
+Revision ID: f7b2d4e8c136
+Revises: e5a7c3f19b64
+Create Date: 2026-10-18 23:14:37.520914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7b2d4e8c136'
+down_revision = 'e5a7c3f19b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('mywitti_client', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('jetons_reserves', sa.BigInteger(), server_default='0', nullable=False))
+
+    # Les commandes déjà en attente n'ont pas de réservation : la validation vérifie
+    # alors le solde disponible, comme avant
+    op.create_table('mywitti_jetons_holds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('client_id', sa.BigInteger(), nullable=False),
+    sa.Column('claim_id', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.BigInteger(), nullable=False),
+    sa.Column('statut', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('settled_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['claim_id'], ['mywitti_lots_claims.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['client_id'], ['mywitti_client.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('claim_id')
+    )
+    with op.batch_alter_table('mywitti_jetons_holds', schema=None) as batch_op:
+        batch_op.create_index('idx_holds_client', ['client_id', 'statut'], unique=False)
+        batch_op.create_index('idx_holds_expiry', ['expires_at'], unique=False, postgresql_where=sa.text("statut = 'held'"), sqlite_where=sa.text("statut = 'held'"))
+
+
+def downgrade():
+    with op.batch_alter_table('mywitti_jetons_holds', schema=None) as batch_op:
+        batch_op.drop_index('idx_holds_expiry')
+        batch_op.drop_index('idx_holds_client')
+
+    op.drop_table('mywitti_jetons_holds')
+    with op.batch_alter_table('mywitti_client', schema=None) as batch_op:
+        batch_op.drop_column('jetons_reserves')
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Script de purge de la liste noire des jetons JWT.
+Supprime les révocations de jetons déjà expirés : un jeton expiré est refusé
+par flask_jwt_extended avant même la vérification de la liste noire.
+À planifier périodiquement (ex: cron Render une fois par jour).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+from Services.token_revocation import token_revocation
+
+def main():
+    """Lance la purge dans le contexte de l'application"""
+    with app.app_context():
+        purged = token_revocation.prune()
+        print(f"✓ {purged} jeton(s) révoqué(s) expiré(s) supprimé(s)")
+
+if __name__ == "__main__":
+    main()
@@ -64,4 +64,5 @@ fi
 
 # Démarrage de Gunicorn
 echo "🚀 Démarrage de Gunicorn..."
-exec gunicorn wsgi:app --bind 0.0.0.0:$PORT --timeout 120 --workers 1 
\ No newline at end of file
+# gevent : les flux SSE inactifs ne coûtent qu'une greenlet ; bcrypt tourne dans de vrais threads
+exec gunicorn wsgi:app --bind 0.0.0.0:$PORT --timeout 120 --workers 1 --worker-class gevent --worker-connections ${GUNICORN_WORKER_CONNECTIONS:-1000} 
\ No newline at end of file
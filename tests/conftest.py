@@ -0,0 +1,81 @@
+# tests/conftest.py
+import os
+import sys
+
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+
+# Variables exigées par config.py à l'import (valeurs propres aux tests)
+os.environ.setdefault('SECRET_KEY', 'tests-secret-key')
+os.environ.setdefault('JWT_SECRET_KEY', 'tests-jwt-secret-key-0123456789abcdef')
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from extensions import db  # noqa: E402
+from Models.mywitti_client import MyWittiClient  # noqa: E402
+from Models.mywitti_lots import MyWittiLot  # noqa: E402
+from Models.mywitti_users import MyWittiUser  # noqa: E402
+from Services.cart import cart_cache  # noqa: E402
+from Services.identity import identity_claims  # noqa: E402
+from Services.token_revocation import token_revocation  # noqa: E402
+
+
+@compiles(BigInteger, 'sqlite')
+def _sqlite_big_integer(type_, compiler, **kw):
+    # Seule une clé INTEGER PRIMARY KEY est auto-incrémentée par SQLite (ex. mywitti_referral.id)
+    return 'INTEGER'
+
+
+ADMIN_USER_ID = 1
+CUSTOMER_USER_ID = 2
+CLIENT_ID = 1
+
+
+@pytest.fixture
+def app():
+    """Application TestingConfig sur une base SQLite en mémoire, recréée à chaque test"""
+    app = create_app('testing')
+    # Caches par processus : rien ne doit survivre à la base du test précédent
+    cart_cache.invalidate()
+    token_revocation._bloom = None
+    token_revocation._watermark = 0
+    token_revocation._versions = {}
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def customer(app):
+    """Client de 500 jetons ; récompenses 1, 2 et 3 à 100, 150 et 200 jetons, 5 en stock"""
+    db.session.add_all([
+        MyWittiUser(id=ADMIN_USER_ID, user_id='superadmin', password='x', user_type='superadmin'),
+        MyWittiUser(id=CUSTOMER_USER_ID, user_id='user_test', password='x', user_type='client'),
+        MyWittiClient(id=CLIENT_ID, customer_code='user_test', first_name='User', short_name='Test',
+                      jetons=500, user_id=CUSTOMER_USER_ID),
+    ])
+    for lot_id, jetons in ((1, 100), (2, 150), (3, 200)):
+        db.session.add(MyWittiLot(id=lot_id, libelle=f'Lot {lot_id}', slug=f'lot-{lot_id}', jetons=jetons, stock=5))
+    db.session.commit()
+    return db.session.get(MyWittiClient, CLIENT_ID)
+
+
+def bearer(user, client=None):
+    """En-tête Authorization d'un jeton d'accès tel qu'émis à la connexion"""
+    token = create_access_token(identity=user.user_id, additional_claims=identity_claims(user, client))
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def customer_headers(customer):
+    return bearer(db.session.get(MyWittiUser, CUSTOMER_USER_ID), customer)
+
+
+@pytest.fixture
+def admin_headers(customer):
+    return bearer(db.session.get(MyWittiUser, ADMIN_USER_ID))
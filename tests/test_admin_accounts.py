@@ -0,0 +1,28 @@
+# tests/test_admin_accounts.py
+from extensions import db
+from Models.mywitti_users import MyWittiUser
+
+
+def test_admin_passwords_are_hashed_through_the_bcrypt_pool(app, admin_headers):
+    client = app.test_client()
+    created = client.post('/admin/admins', headers=admin_headers, json={
+        'first_name': 'Ada', 'last_name': 'Admin', 'email': 'ada@example.com',
+        'user_id': 'ada', 'password': 'secret1'
+    })
+    assert created.status_code == 201
+
+    admin = db.session.get(MyWittiUser, created.get_json()['admin_id'])
+    assert admin.user_type == 'admin'
+    assert admin.password.startswith('$2b$04$')  # BCRYPT_ROUNDS de TestingConfig
+    assert admin.check_password('secret1')
+
+    updated = client.put('/admin/admins', headers=admin_headers, json={
+        'id': admin.id, 'first_name': 'Ada', 'last_name': 'Admin', 'email': 'ada@example.com',
+        'user_id': 'ada', 'password': 'secret2', 'is_superuser': True
+    })
+    assert updated.status_code == 200
+
+    admin = db.session.get(MyWittiUser, admin.id, populate_existing=True)
+    assert admin.user_type == 'superadmin'
+    assert admin.check_password('secret2') and not admin.check_password('secret1')
+    assert admin.token_version == 1
@@ -0,0 +1,114 @@
+# tests/test_cart.py
+from sqlalchemy.dialects import postgresql
+
+import utils
+from extensions import db
+from Services import cart
+from Models.mywitti_lots import MyWittiLot
+from Models.mywitti_lots_claims import MyWittiLotsClaims
+from Services.cart import _cart_upsert, add_to_cart, load_cart
+from tests.conftest import CLIENT_ID
+
+
+def cart_lines():
+    return [(claim.lot_id, claim.quantity) for claim in MyWittiLotsClaims.query.filter_by(
+        client_id=CLIENT_ID, statut='cart'
+    ).order_by(MyWittiLotsClaims.lot_id)]
+
+
+def put_cart(client, headers, items, mode=None):
+    body = {'items': [{'reward_id': lot_id, 'quantity': quantity} for lot_id, quantity in items]}
+    if mode:
+        body['mode'] = mode
+    return client.put('/lot/cart', headers=headers, json=body)
+
+
+def test_add_to_cart_increments_the_cart_line(app, customer_headers):
+    client = app.test_client()
+    client.post('/lot/cart', headers=customer_headers, json={'reward_id': 1, 'quantity': 1})
+    response = client.post('/lot/cart', headers=customer_headers, json={'reward_id': 1, 'quantity': 2})
+
+    assert response.status_code == 200
+    assert (response.get_json()['quantity'], response.get_json()['total_tokens']) == (3, 300)
+    assert cart_lines() == [(1, 3)]
+
+
+def test_add_to_cart_refuses_quantity_beyond_stock(app, customer_headers):
+    client = app.test_client()
+    client.post('/lot/cart', headers=customer_headers, json={'reward_id': 1, 'quantity': 4})
+    response = client.post('/lot/cart', headers=customer_headers, json={'reward_id': 1, 'quantity': 2})
+
+    assert response.status_code == 400
+    assert cart_lines() == [(1, 4)]
+
+
+def test_cart_upsert_ignores_lines_outside_the_cart(customer):
+    # Réclamation hors panier sur la même récompense : hors de l'index partiel, pas de conflit
+    db.session.add(MyWittiLotsClaims(client_id=CLIENT_ID, lot_id=1, statut='en_attente', quantity=5))
+    db.session.commit()
+
+    assert add_to_cart(CLIENT_ID, 1, 2) == 2
+    db.session.commit()
+
+    assert cart_lines() == [(1, 2)]
+    assert MyWittiLotsClaims.query.filter_by(client_id=CLIENT_ID, statut='en_attente').one().quantity == 5
+
+
+def test_cart_upsert_targets_the_partial_index_on_postgresql(customer, monkeypatch):
+    monkeypatch.setattr(cart, 'dialect_insert', lambda model, _: utils.dialect_insert(model, 'postgresql'))
+    sql = str(_cart_upsert(CLIENT_ID, {1: 2}, increment=True).compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (client_id, lot_id) WHERE statut = 'cart' DO UPDATE" in sql
+    assert 'quantity = (mywitti_lots_claims.quantity + excluded.quantity)' in sql
+
+
+def test_put_cart_replace_keeps_only_the_received_lines(app, customer_headers):
+    client = app.test_client()
+    put_cart(client, customer_headers, [(1, 2), (2, 1)])
+    response = put_cart(client, customer_headers, [(2, 3)], mode='replace')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [(line['title'], line['quantity'], line['total_tokens']) for line in body['transactions']] == [('Lot 2', 3, 450)]
+    assert (body['jetons_requis'], body['achat_possible']) == (450, True)
+    assert cart_lines() == [(2, 3)]
+
+
+def test_put_cart_merge_updates_received_lines_only(app, customer_headers):
+    client = app.test_client()
+    put_cart(client, customer_headers, [(1, 2), (2, 1)])
+    # Quantité nulle : ligne retirée ; doublons de la liste cumulés
+    response = put_cart(client, customer_headers, [(2, 0), (3, 1), (1, 1), (1, 2)], mode='merge')
+
+    assert response.status_code == 200
+    assert cart_lines() == [(1, 3), (3, 1)]
+    body = response.get_json()
+    assert (body['jetons_requis'], body['achat_possible']) == (500, True)
+
+
+def test_put_cart_checks_stock_and_unknown_rewards(app, customer_headers):
+    client = app.test_client()
+    put_cart(client, customer_headers, [(1, 1)])
+
+    short = put_cart(client, customer_headers, [(2, 6)])
+    missing = put_cart(client, customer_headers, [(99, 1)], mode='merge')
+
+    assert (short.status_code, short.get_json()['message']) == (400, 'Quantité insuffisante en stock : 2')
+    assert (missing.status_code, missing.get_json()['message']) == (404, 'Récompenses non trouvées : 99')
+    assert cart_lines() == [(1, 1)]
+
+
+def test_load_cart_totals_lines_with_window_sum(customer):
+    assert load_cart(CLIENT_ID) == ((), 0)
+
+    db.session.add(MyWittiLot(id=4, libelle='Lot sans prix', slug='lot-4', jetons=None, stock=5))
+    for lot_id, quantity in ((1, 2), (3, 1), (4, 3)):
+        add_to_cart(CLIENT_ID, lot_id, quantity)
+    db.session.commit()
+
+    lines, total = load_cart(CLIENT_ID)
+
+    assert [(line['title'], line['tokens_required_per_item'], line['total_tokens']) for line in lines] == [
+        ('Lot 1', 100, 200), ('Lot 3', 200, 200), ('Lot sans prix', 0, 0)
+    ]
+    assert total == 400
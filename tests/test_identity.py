@@ -0,0 +1,48 @@
+# tests/test_identity.py
+import pytest
+from flask_jwt_extended import create_access_token
+
+from extensions import db
+from Models.mywitti_client import MyWittiClient
+from Models.mywitti_users import MyWittiUser
+from Models.page_visit import PageVisit
+from Services.identity import find_user_and_client, identity_claims
+from tests.conftest import CLIENT_ID, CUSTOMER_USER_ID
+
+
+@pytest.mark.parametrize('linked_first', [True, False])
+def test_user_resolves_to_linked_client_before_customer_code_match(customer, linked_first):
+    # Deux clients : l'un lié par user_id, l'autre retrouvé par customer_code, dans les deux ordres d'id
+    other = MyWittiClient(id=CLIENT_ID + 1, customer_code='autre', jetons=0)
+    db.session.add(other)
+    if linked_first:
+        customer.customer_code, other.customer_code = 'autre-code', 'user_test'
+        linked = customer
+    else:
+        customer.user_id, other.user_id = None, CUSTOMER_USER_ID
+        linked = other
+    db.session.commit()
+
+    for _ in range(3):
+        user, client = find_user_and_client(MyWittiUser.user_id == 'user_test')
+        assert (user.id, client.id) == (CUSTOMER_USER_ID, linked.id)
+
+
+def test_user_falls_back_to_customer_code_match(customer):
+    customer.user_id = None
+    db.session.commit()
+
+    user, client = find_user_and_client(MyWittiUser.user_id == 'user_test')
+
+    assert (user.id, client.id) == (CUSTOMER_USER_ID, CLIENT_ID)
+
+
+def test_visit_without_jwt_required_is_attributed_from_token_claims(app, customer):
+    user = db.session.get(MyWittiUser, CUSTOMER_USER_ID)
+    token = create_access_token(identity=user.user_id, additional_claims=identity_claims(user, customer))
+
+    app.test_client().get('/route-publique', headers={'Authorization': f'Bearer {token}'})
+    app.test_client().get('/route-publique', headers={'Authorization': 'Bearer invalide'})
+
+    visits = [(visit.path, visit.user_id, visit.user_type) for visit in PageVisit.query.order_by(PageVisit.id)]
+    assert visits == [('/route-publique', CUSTOMER_USER_ID, 'customer'), ('/route-publique', None, None)]
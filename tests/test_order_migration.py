@@ -0,0 +1,81 @@
+# tests/test_order_migration.py
+import importlib.util
+import os
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+MIGRATION = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'migrations', 'versions', '1a9e6c3d7f52_commandes_et_lignes_de_commande.py'
+)
+
+# Schéma de la révision f7b2d4e8c136, limité aux tables lues par la migration
+PREVIOUS_SCHEMA = (
+    "CREATE TABLE mywitti_client (id BIGINT PRIMARY KEY, jetons BIGINT, jetons_reserves BIGINT NOT NULL DEFAULT 0)",
+    "CREATE TABLE mywitti_lots (id INTEGER PRIMARY KEY, libelle VARCHAR(100) NOT NULL, jetons INTEGER)",
+    "CREATE TABLE mywitti_lots_claims ("
+    "id INTEGER PRIMARY KEY, client_id BIGINT NOT NULL REFERENCES mywitti_client (id), "
+    "lot_id INTEGER NOT NULL REFERENCES mywitti_lots (id), date_reclamation DATETIME, "
+    "statut VARCHAR(50), quantity INTEGER NOT NULL DEFAULT 1)",
+    "CREATE INDEX idx_claims_lot ON mywitti_lots_claims (lot_id, statut)",
+    "CREATE TABLE mywitti_jetons_holds ("
+    "id INTEGER PRIMARY KEY, client_id BIGINT NOT NULL REFERENCES mywitti_client (id), "
+    "claim_id INTEGER UNIQUE REFERENCES mywitti_lots_claims (id) ON DELETE SET NULL, "
+    "amount BIGINT NOT NULL, statut VARCHAR(20) NOT NULL, created_at DATETIME NOT NULL, "
+    "expires_at DATETIME NOT NULL, settled_at DATETIME)",
+)
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location('commandes_et_lignes_de_commande', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_migration_groups_claims_into_orders_and_reattaches_holds():
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as connection:
+        for statement in PREVIOUS_SCHEMA:
+            connection.exec_driver_sql(statement)
+        connection.exec_driver_sql("INSERT INTO mywitti_client (id, jetons, jetons_reserves) VALUES (1, 1000, 250)")
+        connection.exec_driver_sql("INSERT INTO mywitti_lots (id, libelle, jetons) VALUES (1, 'Lot 1', 100), (2, 'Lot 2', 50)")
+        connection.exec_driver_sql(
+            "INSERT INTO mywitti_lots_claims (id, client_id, lot_id, date_reclamation, statut, quantity) VALUES "
+            # Deux lignes commandées au même instant : une seule commande
+            "(1, 1, 1, '2026-10-01 10:00:00', 'pending', 2), "
+            "(2, 1, 2, '2026-10-01 10:00:00', 'pending', 1), "
+            "(3, 1, 1, '2026-09-01 09:00:00', 'validated', 1), "
+            "(4, 1, 2, '2026-08-01 08:00:00', 'en_attente', 1), "
+            "(5, 1, 2, '2026-10-02 11:00:00', 'cart', 3)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO mywitti_jetons_holds (id, client_id, claim_id, amount, statut, created_at, expires_at) VALUES "
+            "(1, 1, 1, 200, 'held', '2026-10-01 10:00:00', '2026-10-08 10:00:00'), "
+            "(2, 1, 2, 50, 'held', '2026-10-01 10:00:00', '2026-10-08 10:00:00')"
+        )
+
+        with Operations.context(MigrationContext.configure(connection)):
+            load_migration().upgrade()
+
+        orders = connection.exec_driver_sql(
+            "SELECT id, client_id, statut, amount FROM mywitti_order ORDER BY id"
+        ).all()
+        assert orders == [(1, 1, 'pending', 250), (3, 1, 'validated', 100), (4, 1, 'pending', 50)]
+
+        lines = connection.exec_driver_sql(
+            "SELECT id, order_id, lot_id, jetons, quantity FROM mywitti_order_line ORDER BY id"
+        ).all()
+        assert lines == [(1, 1, 1, 100, 2), (2, 1, 2, 50, 1), (3, 3, 1, 100, 1), (4, 4, 2, 50, 1)]
+
+        holds = connection.exec_driver_sql(
+            "SELECT id, order_id, amount, statut FROM mywitti_jetons_holds ORDER BY id"
+        ).all()
+        assert holds == [(1, 1, 200, 'held'), (2, 1, 50, 'held')]
+        assert 'claim_id' not in {column['name'] for column in sa.inspect(connection).get_columns('mywitti_jetons_holds')}
+
+        # Seul le panier reste dans la table des réclamations
+        claims = connection.exec_driver_sql("SELECT id, statut FROM mywitti_lots_claims").all()
+        assert claims == [(5, 'cart')]
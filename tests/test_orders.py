@@ -0,0 +1,116 @@
+# tests/test_orders.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from Models.mywitti_client import MyWittiClient
+from Models.mywitti_jetons_holds import MyWittiJetonsHold
+from Models.mywitti_lots import MyWittiLot
+from Models.mywitti_lots_claims import MyWittiLotsClaims
+from Models.mywitti_order import MyWittiOrder
+from Models.order_idempotency import OrderIdempotency
+from Services.cart import add_to_cart
+from Services.jetons_holds import DEBITED, EXPIRED, HELD, RELEASED
+from Services.orders import (
+    CANCELLED_STATUS, VALIDATED_STATUS, OrderError, cancel_order, expire_orders, place_order,
+    stored_order_response, validate_order
+)
+from tests.conftest import ADMIN_USER_ID, CLIENT_ID, CUSTOMER_USER_ID
+
+
+def order_cart(quantities, idempotency_key=None):
+    for lot_id, quantity in quantities.items():
+        add_to_cart(CLIENT_ID, lot_id, quantity)
+    db.session.commit()
+    return place_order(CUSTOMER_USER_ID, CLIENT_ID, idempotency_key)
+
+
+def client_state():
+    client = db.session.get(MyWittiClient, CLIENT_ID, populate_existing=True)
+    return client.jetons, client.jetons_reserves
+
+
+def hold_statuses():
+    return [(hold.order_id, hold.amount, hold.statut)
+            for hold in MyWittiJetonsHold.query.order_by(MyWittiJetonsHold.id)]
+
+
+def test_repeated_idempotency_key_replays_without_new_hold(customer):
+    body, code, replayed = order_cart({1: 2}, 'cle-1')
+    assert (code, replayed, body['amount']) == (200, False, 200)
+
+    # Nouveau panier, même clé : la réponse est rejouée et rien n'est commandé ni réservé
+    add_to_cart(CLIENT_ID, 2, 1)
+    db.session.commit()
+    replay_body, replay_code, replayed = place_order(CUSTOMER_USER_ID, CLIENT_ID, 'cle-1')
+
+    assert (replay_body, replay_code, replayed) == (body, 200, True)
+    assert MyWittiOrder.query.count() == 1
+    assert hold_statuses() == [(int(body['id']), 200, HELD)]
+    assert client_state() == (500, 200)
+    assert MyWittiLotsClaims.query.filter_by(client_id=CLIENT_ID, lot_id=2).count() == 1
+
+
+def test_expired_idempotency_key_is_not_replayed(customer):
+    body, _, _ = order_cart({1: 1}, 'cle-1')
+    stored = db.session.get(OrderIdempotency, (CLIENT_ID, 'cle-1'))
+    stored.created_at = datetime.utcnow() - timedelta(days=2)
+    db.session.commit()
+
+    # Clé échue mais pas encore purgée : ni rejouée avant le verrou, ni sous le verrou
+    assert stored_order_response(CLIENT_ID, 'cle-1', 86400) is None
+    new_body, code, replayed = order_cart({2: 1}, 'cle-1')
+
+    assert (code, replayed) == (200, False)
+    assert new_body['id'] != body['id']
+    assert MyWittiOrder.query.count() == 2
+    assert stored_order_response(CLIENT_ID, 'cle-1', 86400) == (new_body, 200)
+
+
+def test_second_order_over_available_balance_is_refused(customer):
+    order_cart({3: 2})
+
+    with pytest.raises(OrderError) as refused:
+        order_cart({1: 2})
+
+    assert refused.value.message == "Jetons insuffisants pour cette commande"
+    assert MyWittiOrder.query.count() == 1
+    assert client_state() == (500, 400)
+    # Refus annulé en entier : le panier est conservé
+    assert MyWittiLotsClaims.query.filter_by(client_id=CLIENT_ID).count() == 1
+
+
+def test_validate_order_debits_order_amount_and_decrements_stock(customer):
+    body, _, _ = order_cart({1: 2, 2: 1})
+    # Le prix courant ne compte plus : le montant de la commande est figé
+    db.session.get(MyWittiLot, 1).jetons = 999
+    db.session.commit()
+
+    order = validate_order(int(body['id']), ADMIN_USER_ID)
+
+    assert (order.statut, order.amount) == (VALIDATED_STATUS, 350)
+    assert client_state() == (150, 0)
+    assert [(lot.id, lot.stock) for lot in MyWittiLot.query.order_by(MyWittiLot.id)] == [(1, 3), (2, 4), (3, 5)]
+    assert hold_statuses() == [(order.id, 350, DEBITED)]
+
+
+def test_cancel_order_releases_hold(customer):
+    body, _, _ = order_cart({3: 1})
+
+    order = cancel_order(int(body['id']), ADMIN_USER_ID)
+
+    assert order.statut == CANCELLED_STATUS
+    assert client_state() == (500, 0)
+    assert hold_statuses() == [(order.id, 200, RELEASED)]
+
+
+def test_expire_orders_releases_hold(customer):
+    body, _, _ = order_cart({3: 1})
+
+    assert expire_orders(now=datetime.utcnow() + timedelta(days=8)) == 1
+    db.session.commit()
+
+    assert db.session.get(MyWittiOrder, int(body['id'])).statut == CANCELLED_STATUS
+    assert client_state() == (500, 0)
+    assert hold_statuses() == [(int(body['id']), 200, EXPIRED)]
@@ -0,0 +1,89 @@
+# tests/test_referrals.py
+import importlib.util
+import os
+
+import sqlalchemy as sa
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+
+from extensions import db
+from Models.mywitti_referral import MyWittiReferral
+from Services.referrals import ALREADY_INVITED, DUPLICATE, INVALID, INVITED, invite_emails, normalize_email
+from tests.conftest import CUSTOMER_USER_ID
+
+MIGRATION = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'migrations', 'versions', 'f3a9c0d57e12_unicité_des_emails_parrainés.py'
+)
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location('unicite_des_emails_parraines', MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_normalize_email_strips_and_folds_case():
+    assert normalize_email('  Jean.Dupont@Example.COM ') == 'jean.dupont@example.com'
+    assert normalize_email('pas-un-email') is None
+    assert normalize_email(None) is None
+
+
+def test_invite_emails_reports_one_result_per_address(customer):
+    db.session.add(MyWittiReferral(
+        referrer_id=CUSTOMER_USER_ID, referred_email='deja@example.com', referral_code='code-existant'
+    ))
+    db.session.commit()
+
+    results = invite_emails(CUSTOMER_USER_ID, [
+        'Nouveau@Example.com', ' nouveau@example.com', 'DEJA@example.com', 'invalide', 'autre@example.com'
+    ])
+    db.session.commit()
+
+    assert [(result['email'], result['status']) for result in results] == [
+        ('Nouveau@Example.com', INVITED),
+        (' nouveau@example.com', DUPLICATE),
+        ('DEJA@example.com', ALREADY_INVITED),
+        ('invalide', INVALID),
+        ('autre@example.com', INVITED),
+    ]
+    created = {referral.referred_email: referral.referral_code for referral in MyWittiReferral.query}
+    assert set(created) == {'deja@example.com', 'nouveau@example.com', 'autre@example.com'}
+    assert results[0]['referral_link'].endswith(created['nouveau@example.com'])
+    assert 'referral_link' not in results[2]
+
+
+def test_migration_dedupes_referrals_by_status_then_id():
+    engine = sa.create_engine('sqlite://')
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE mywitti_referral (id INTEGER PRIMARY KEY, referred_email VARCHAR(255) NOT NULL, "
+            "status VARCHAR(20) NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO mywitti_referral (id, referred_email, status) VALUES "
+            # Statut le plus avancé conservé, quel que soit l'id ; vocabulaire admin compris
+            "(1, ' Foo@X.com', 'pending'), (2, 'foo@x.com', 'Récompensé'), (3, 'FOO@x.com ', 'accepted'), "
+            # Statuts de même rang : le plus ancien ; statut inconnu classé en dernier
+            "(4, 'Bar@x.com', 'inconnu'), (5, 'bar@x.com', 'En cours'), (6, 'BAR@x.com', 'pending'), "
+            # Casse repliée comme normalize_email (casefold : ß = ss)
+            "(7, 'Straße@x.com', 'pending'), (8, 'strasse@x.com', 'accepted'), "
+            # Adresses vides : une seule ligne possible sous l'index unique
+            "(9, '', 'pending'), (10, '  ', 'accepted'), "
+            "(11, 'seul@x.com', 'pending')"
+        )
+
+        with Operations.context(MigrationContext.configure(connection)):
+            load_migration().upgrade()
+
+        rows = connection.exec_driver_sql("SELECT id, referred_email, status FROM mywitti_referral ORDER BY id").all()
+        assert rows == [
+            (2, 'foo@x.com', 'Récompensé'),
+            (5, 'bar@x.com', 'En cours'),
+            (8, 'strasse@x.com', 'accepted'),
+            (10, '', 'accepted'),
+            (11, 'seul@x.com', 'pending'),
+        ]
+        indexes = {index['name']: index['unique'] for index in sa.inspect(connection).get_indexes('mywitti_referral')}
+        assert indexes['idx_referral_referred_email']
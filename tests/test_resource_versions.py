@@ -0,0 +1,44 @@
+# tests/test_resource_versions.py
+from extensions import db
+from Models.mywitti_lots import MyWittiLot
+from Services.cart import add_to_cart
+from tests.conftest import CLIENT_ID
+
+
+def get_favorites(client, headers, etag=None):
+    if etag:
+        headers = dict(headers, **{'If-None-Match': etag})
+    return client.get('/lot/favorites', headers=headers)
+
+
+def test_etag_round_trip_follows_displayed_lot_columns(app, customer_headers):
+    client = app.test_client()
+    first = get_favorites(client, customer_headers)
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+
+    assert get_favorites(client, customer_headers, etag).status_code == 304
+
+    # Stock non affiché : la version des lots ne change pas
+    db.session.get(MyWittiLot, 1).stock = 2
+    db.session.commit()
+    assert get_favorites(client, customer_headers, etag).status_code == 304
+
+    db.session.get(MyWittiLot, 1).jetons = 120
+    db.session.commit()
+    changed = get_favorites(client, customer_headers, etag)
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert get_favorites(client, customer_headers, changed.headers['ETag']).status_code == 304
+
+
+def test_cart_etag_changes_after_core_cart_write(app, customer_headers):
+    client = app.test_client()
+    etag = client.get('/lot/cart', headers=customer_headers).headers['ETag']
+
+    add_to_cart(CLIENT_ID, 1, 1)
+    db.session.commit()
+
+    response = client.get('/lot/cart', headers=dict(customer_headers, **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.get_json()['jetons_requis'] == 100
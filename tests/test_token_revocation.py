@@ -0,0 +1,71 @@
+# tests/test_token_revocation.py
+from datetime import datetime, timedelta
+
+from extensions import db
+from Models.token_blacklist import TokenBlacklist
+from Services.token_revocation import token_revocation
+
+
+def revoked_elsewhere(jti, row_id=None, created_at=None, expires_at=None):
+    """Révocation écrite par un autre processus : seule la base la connaît"""
+    db.session.add(TokenBlacklist(id=row_id, jti=jti, created_at=created_at or datetime.utcnow(), expires_at=expires_at))
+    db.session.commit()
+
+
+def sync_now():
+    token_revocation._last_sync = 0.0
+
+
+def test_revoke_is_seen_by_is_revoked(app):
+    assert not token_revocation.is_revoked('jti-1')
+
+    token_revocation.revoke({'jti': 'jti-1', 'exp': int((datetime.utcnow() + timedelta(hours=1)).timestamp())})
+
+    assert token_revocation.is_revoked('jti-1')
+    assert TokenBlacklist.query.filter_by(jti='jti-1').count() == 1
+
+
+def test_catch_up_sees_revocations_from_other_processes(app):
+    assert not token_revocation.is_revoked('jti-1')
+    # Faux positif du filtre tranché par la base : mémorisé comme non révoqué
+    token_revocation._bloom.add('jti-2')
+    assert not token_revocation.is_revoked('jti-2')
+    assert 'jti-2' in token_revocation._not_revoked
+
+    revoked_elsewhere('jti-1')
+    revoked_elsewhere('jti-2')
+    sync_now()
+
+    assert token_revocation.is_revoked('jti-1')
+    assert token_revocation.is_revoked('jti-2')
+
+
+def test_catch_up_sees_rows_committed_out_of_id_order(app):
+    old = datetime.utcnow() - timedelta(hours=1)
+    revoked_elsewhere('jti-1', row_id=1, created_at=old)
+    token_revocation.is_revoked('jti-1')
+    revoked_elsewhere('jti-3', row_id=3)
+    sync_now()
+    assert token_revocation.is_revoked('jti-3')
+
+    # Id inférieur validé après coup : relu dans la fenêtre de recouvrement
+    revoked_elsewhere('jti-2', row_id=2)
+    sync_now()
+
+    assert token_revocation.is_revoked('jti-2')
+    assert token_revocation._watermark == 1
+    assert token_revocation._bloom.count == 3
+
+
+def test_rebuild_excludes_expired_revocations(app):
+    now = datetime.utcnow()
+    revoked_elsewhere('expire', expires_at=now - timedelta(minutes=1))
+    revoked_elsewhere('valide', expires_at=now + timedelta(hours=1))
+    revoked_elsewhere('sans-expiration')
+
+    token_revocation._rebuild()
+
+    assert 'expire' not in token_revocation._bloom
+    assert token_revocation.is_revoked('valide')
+    assert token_revocation.is_revoked('sans-expiration')
+    assert token_revocation._bloom.count == 2
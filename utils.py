@@ -75,4 +75,15 @@ def error_response(message="Erreur", status_code=400, details=None):
     response = {"error": message}
     if details:
         response["details"] = details
-    return response, status_code 
\ No newline at end of file
+    return response, status_code 
+
+def dialect_insert(model, dialect_name=None):
+    """Retourne un INSERT propre au dialecte (PostgreSQL ou SQLite) supportant ON CONFLICT"""
+    if dialect_name is None:
+        from extensions import db
+        dialect_name = db.session.get_bind().dialect.name
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
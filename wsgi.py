@@ -17,6 +17,16 @@ for root, dirs, files in os.walk(current_dir):
         if dir_path not in sys.path:
             sys.path.insert(0, dir_path)
 
+# Under the gevent worker (sockets already monkey-patched by gunicorn), make psycopg2
+# cooperative so that database calls yield to other greenlets
+try:
+    from gevent import monkey
+    if monkey.is_module_patched('socket'):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+except ImportError:
+    pass
+
 # Import the Flask app from application.py to avoid conflict with gunicorn.app
 from application import app
 